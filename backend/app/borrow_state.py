@@ -0,0 +1,169 @@
+# State machine peminjaman: menunggu -> dipinjam -> dikembalikan, atau menunggu -> ditolak.
+# Perpindahan status adalah compare-and-set (UPDATE ... WHERE status = <status lama>) dan
+# perubahan stok adalah UPDATE bersyarat (amount = amount - 1 WHERE amount > 0), keduanya
+# dicek lewat jumlah baris yang berubah. Dua admin yang menyetujui bersamaan tidak bisa
+# memakai eksemplar terakhir yang sama, tanpa SELECT ... FOR UPDATE atau lock di aplikasi.
+# Counter, versi katalog, rollup, dan leaderboard (baris yang ikut ditulis hampir semua
+# transaksi) diperbarui paling akhir agar lock-nya ditahan sesingkat mungkin sebelum commit.
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app import models, counters, rollups, leaderboard
+
+# Status tujuan yang boleh dicapai dari setiap status
+TRANSITIONS = {
+    "menunggu": ("dipinjam", "ditolak"),
+    "dipinjam": ("dikembalikan",),
+}
+
+# Perubahan stok buku untuk setiap transisi
+STOCK_CHANGES = {
+    ("menunggu", "dipinjam"): -1,
+    ("dipinjam", "dikembalikan"): 1,
+}
+
+class OutOfStock(ValueError):
+    """Stok buku habis saat peminjaman akan disetujui. Transaksi harus di-rollback."""
+
+def can_transition(old_status: str, new_status: str) -> bool:
+    return new_status in TRANSITIONS.get(old_status, ())
+
+def _compare_and_set(db: Session, borrow_id: int, old_status: str, new_status: str, user_id: Optional[int], values: dict) -> Optional[int]:
+    """Mengubah status hanya jika status saat ini masih old_status. Mengembalikan book_id, atau None."""
+    stmt = update(models.Borrow).where(models.Borrow.id == borrow_id, models.Borrow.status == old_status)
+    if user_id is not None:
+        stmt = stmt.where(models.Borrow.user_id == user_id)
+    stmt = stmt.values(status=new_status, **values).returning(models.Borrow.book_id)
+    return db.execute(stmt, execution_options={"synchronize_session": False}).scalar()
+
+def _change_stock(db: Session, book_id: int, delta: int) -> bool:
+    """Menambah/mengurangi stok dalam satu UPDATE; pengurangan gagal jika stok tidak cukup."""
+    stmt = update(models.Book).where(models.Book.id == book_id)
+    if delta < 0:
+        stmt = stmt.where(models.Book.amount >= -delta, models.Book.is_deleted == False)
+    stmt = stmt.values(amount=models.Book.amount + delta, updated_at=datetime.utcnow())
+    result = db.execute(stmt, execution_options={"synchronize_session": False})
+    return result.rowcount == 1
+
+def _bump_book_version(db: Session, book_id: int):
+    """Sama seperti crud._touch_book, untuk buku yang tidak dimuat ke session."""
+    db.execute(
+        update(models.Book).where(models.Book.id == book_id).values(version=counters.bump_catalog_version(db)),
+        execution_options={"synchronize_session": False},
+    )
+
+def transition(
+    db: Session,
+    borrow_id: int,
+    old_status: str,
+    new_status: str,
+    moment: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+) -> bool:
+    """
+    Memindahkan peminjaman dari old_status ke new_status beserta efeknya (belum commit).
+    moment adalah tanggal pinjam/kembali (default sekarang), user_id membatasi ke pemilik peminjaman.
+    Mengembalikan False jika peminjaman tidak ada atau statusnya sudah diubah request lain.
+    Melempar OutOfStock jika stok habis; perubahan status sebelumnya harus di-rollback pemanggil.
+    """
+    if not can_transition(old_status, new_status):
+        raise ValueError(f"Status peminjaman tidak bisa diubah dari {old_status} ke {new_status}")
+    moment = moment or datetime.now()
+    values = {}
+    if new_status == "dipinjam":
+        values["borrow_date"] = moment
+    elif new_status == "dikembalikan":
+        values["return_date"] = moment
+
+    book_id = _compare_and_set(db, borrow_id, old_status, new_status, user_id, values)
+    if book_id is None:
+        return False
+    delta = STOCK_CHANGES.get((old_status, new_status))
+    if delta and not _change_stock(db, book_id, delta):
+        raise OutOfStock("Stok buku habis")
+
+    if delta:
+        _bump_book_version(db, book_id)
+    counters.record_borrow_transition(db, old_status, new_status)
+    if new_status in rollups.ROLLUP_STATUSES:
+        rollups.record_transition(db, new_status, moment)
+    if new_status == "dipinjam":
+        leaderboard.record_borrow(db, book_id, moment)
+    return True
+
+def _reserve_stock(db: Session, book_id: int, wanted: int) -> int:
+    """
+    Mengambil sampai `wanted` eksemplar dengan UPDATE bersyarat. Jika stok kurang, stok yang
+    tersisa dibaca lalu diambil dengan syarat yang sama (diulang jika didahului request lain).
+    Mengembalikan jumlah eksemplar yang didapat.
+    """
+    while wanted > 0:
+        if _change_stock(db, book_id, -wanted):
+            return wanted
+        available = db.query(models.Book.amount)\
+            .filter(models.Book.id == book_id, models.Book.is_deleted == False).scalar() or 0
+        wanted = min(wanted, available)
+    return 0
+
+def _claim(db: Session, borrow_ids: List[int], new_status: str, values: dict) -> List[Tuple[int, int]]:
+    """Compare-and-set massal dari "menunggu". Mengembalikan [(borrow_id, book_id)] yang berhasil diubah."""
+    if not borrow_ids:
+        return []
+    stmt = update(models.Borrow)\
+        .where(models.Borrow.id.in_(borrow_ids), models.Borrow.status == "menunggu")\
+        .values(status=new_status, **values)\
+        .returning(models.Borrow.id, models.Borrow.book_id)
+    return [tuple(row) for row in db.execute(stmt, execution_options={"synchronize_session": False})]
+
+def decide_many(db: Session, decisions: Dict[int, str]) -> Dict[int, str]:
+    """
+    Memproses banyak keputusan admin sekaligus ({borrow_id: "approve"/"decline"}), belum commit.
+    Stok dikurangi sekali per buku. Jika stok tidak cukup, peminjaman yang diajukan lebih dulu
+    (id terkecil) yang mendapat eksemplar dan sisanya ditolak.
+    Mengembalikan {borrow_id: "approved"/"declined"/"out_of_stock"}; peminjaman yang tidak ada
+    atau sudah tidak menunggu tidak ikut dikembalikan.
+    """
+    moment = datetime.now()
+    outcomes = {}
+    declined = _claim(db, [borrow_id for borrow_id, action in decisions.items() if action == "decline"], "ditolak", {})
+    for borrow_id, _ in declined:
+        outcomes[borrow_id] = "declined"
+
+    claimed = _claim(
+        db, [borrow_id for borrow_id, action in decisions.items() if action == "approve"], "dipinjam", {"borrow_date": moment}
+    )
+    by_book = defaultdict(list)
+    for borrow_id, book_id in sorted(claimed):
+        by_book[book_id].append(borrow_id)
+    book_counts = {}
+    out_of_stock = []
+    # Urutan buku tetap (id naik) agar dua request massal tidak saling deadlock di PostgreSQL
+    for book_id, borrow_ids in sorted(by_book.items()):
+        granted = _reserve_stock(db, book_id, len(borrow_ids))
+        if granted:
+            book_counts[book_id] = granted
+        for borrow_id in borrow_ids[:granted]:
+            outcomes[borrow_id] = "approved"
+        for borrow_id in borrow_ids[granted:]:
+            outcomes[borrow_id] = "out_of_stock"
+            out_of_stock.append(borrow_id)
+    if out_of_stock:
+        db.execute(
+            update(models.Borrow).where(models.Borrow.id.in_(out_of_stock)).values(status="ditolak", borrow_date=None),
+            execution_options={"synchronize_session": False},
+        )
+
+    approved = sum(book_counts.values())
+    if book_counts:
+        version = counters.bump_catalog_version(db)
+        db.execute(
+            update(models.Book).where(models.Book.id.in_(list(book_counts))).values(version=version),
+            execution_options={"synchronize_session": False},
+        )
+        leaderboard.record_borrows(db, book_counts, moment)
+    counters.record_borrow_transition(db, "menunggu", "dipinjam", approved)
+    counters.record_borrow_transition(db, "menunggu", "ditolak", len(declined) + len(out_of_stock))
+    rollups.record_transition(db, "dipinjam", moment, approved)
+    return outcomes
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+from app.core.metrics import registry
+
+# Semua cache in-process terdaftar di sini agar statistiknya bisa dilihat dari satu tempat
+_registry: List["LRUCache"] = []
+
+class LRUCache:
+    """
+    Cache in-process dengan batas ukuran (LRU) dan TTL opsional.
+    Aman dipakai dari threadpool FastAPI. Setiap worker uvicorn punya cache sendiri,
+    jadi TTL membatasi berapa lama data basi bisa bertahan di worker lain.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+def cache_stats() -> List[Dict[str, Any]]:
+    """Statistik hit/miss semua cache yang terdaftar."""
+    return [cache.stats() for cache in _registry]
+
+# Hit/miss semua cache terdaftar ikut diekspor di GET /metrics dengan label nama cache
+registry.counter(
+    "cache_hits_total", "Jumlah cache hit per cache in-process.",
+    lambda: [({"cache": cache.name}, cache.hits) for cache in _registry],
+)
+registry.counter(
+    "cache_misses_total", "Jumlah cache miss per cache in-process.",
+    lambda: [({"cache": cache.name}, cache.misses) for cache in _registry],
+)
+registry.gauge(
+    "cache_entries", "Jumlah entri yang sedang disimpan per cache in-process.",
+    lambda: [({"cache": cache.name}, len(cache._data)) for cache in _registry],
+)
@@ -0,0 +1,95 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Mapping, Optional, Tuple
+from fastapi import Request, Response
+
+# Data yang bisa berubah kapan saja: browser boleh menyimpan, tapi wajib revalidasi dengan ETag
+CACHE_REVALIDATE = "no-cache"
+
+def quote_etag(value: str) -> str:
+    """Membungkus nilai ETag dengan tanda kutip sesuai format header HTTP."""
+    return f'"{value}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Mengecek apakah header If-None-Match cocok dengan ETag (perbandingan lemah)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+def http_date(moment: datetime) -> str:
+    """Format tanggal HTTP (Last-Modified) dari datetime UTC tanpa timezone."""
+    return format_datetime(moment.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+def is_not_modified(headers: Mapping[str, str], etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    Menentukan apakah response 304 boleh dikirim. If-None-Match diutamakan;
+    If-Modified-Since hanya dipakai jika client tidak mengirim If-None-Match.
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = headers.get("if-modified-since")
+    if not (if_modified_since and last_modified):
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+def not_modified_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    cache_control: str = CACHE_REVALIDATE,
+) -> Optional[Response]:
+    """
+    Memasang header ETag/Last-Modified pada response. Mengembalikan response 304
+    jika versi milik client masih sama, sehingga endpoint tidak perlu query data.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+    if is_not_modified(request.headers, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Mem-parsing header Range satu rentang (bytes=start-end).
+    Mengembalikan (start, end) inklusif, None jika header diabaikan,
+    atau melempar ValueError jika rentang tidak bisa dipenuhi.
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        # Multi-range tidak didukung, kirim seluruh konten
+        return None
+    start_str, _, end_str = spec.strip().partition("-")
+    if not (start_str or end_str) or not (start_str + end_str).isdigit():
+        # Header tidak valid diabaikan
+        return None
+    if start_str == "":
+        # Suffix range: N byte terakhir
+        length = int(end_str)
+        if length == 0:
+            raise ValueError("Unsatisfiable range")
+        start, end = max(size - length, 0), size - 1
+    else:
+        start = int(start_str)
+        end = int(end_str) if end_str else size - 1
+    end = min(end, size - 1)
+    if start < 0 or start >= size or start > end:
+        raise ValueError("Unsatisfiable range")
+    return start, end
@@ -0,0 +1,105 @@
+import asyncio
+import hashlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Literal, Optional, Tuple
+from dotenv import load_dotenv
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+load_dotenv()
+
+# Konfigurasi pemrosesan gambar cover
+MAX_UPLOAD_BYTES = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+IMAGE_PROCESS_WORKERS = int(os.getenv("IMAGE_PROCESS_WORKERS", 2))
+# Jumlah maksimal upload yang boleh diproses/antri bersamaan
+IMAGE_PROCESS_MAX_PENDING = int(os.getenv("IMAGE_PROCESS_MAX_PENDING", 8))
+IMAGE_OUTPUT_FORMAT = "WEBP"
+IMAGE_OUTPUT_CONTENT_TYPE = "image/webp"
+
+ImageSize = Literal["thumb", "medium", "full"]
+
+# Varian yang dihasilkan: nama -> (sisi terpanjang dalam pixel, kualitas WebP)
+IMAGE_VARIANTS: Dict[str, Tuple[int, int]] = {
+    "thumb": (200, 70),
+    "medium": (480, 78),
+    "full": (1200, 82),
+}
+ALLOWED_FORMATS = {"JPEG", "PNG", "WEBP", "GIF"}
+
+# Batas pixel untuk mencegah decompression bomb
+Image.MAX_IMAGE_PIXELS = 40_000_000
+
+class InvalidImageError(ValueError):
+    pass
+
+# Signature (magic bytes) untuk mengenali format gambar lama yang disimpan apa adanya
+_IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+def detect_content_type(data: bytes) -> str:
+    """Menebak content type gambar dari beberapa byte pertamanya."""
+    for signature, content_type in _IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return content_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+def compute_etag(data: bytes) -> str:
+    """Menghasilkan ETag kuat (hash SHA-256) dari isi gambar."""
+    return hashlib.sha256(data).hexdigest()
+
+def process_image(data: bytes) -> Dict[str, Tuple[bytes, int, int]]:
+    """
+    Memvalidasi gambar upload lalu meng-encode ulang ke WebP dalam beberapa ukuran.
+    Dijalankan di process pool, mengembalikan {varian: (bytes, lebar, tinggi)}.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as probe:
+            if probe.format not in ALLOWED_FORMATS:
+                raise InvalidImageError(f"Unsupported image format: {probe.format}")
+            probe.verify()
+        # verify() membuat objek tidak bisa dipakai lagi, jadi buka ulang
+        with Image.open(io.BytesIO(data)) as source:
+            image = ImageOps.exif_transpose(source)
+            image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        raise InvalidImageError("Invalid or corrupted image file")
+
+    variants = {}
+    for name, (max_side, quality) in IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((max_side, max_side), Image.LANCZOS)
+        buffer = io.BytesIO()
+        resized.save(buffer, IMAGE_OUTPUT_FORMAT, quality=quality, method=4)
+        variants[name] = (buffer.getvalue(), resized.width, resized.height)
+    return variants
+
+_executor: Optional[ProcessPoolExecutor] = None
+_pending: Optional[asyncio.Semaphore] = None
+
+def get_image_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=IMAGE_PROCESS_WORKERS)
+    return _executor
+
+def shutdown_image_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+async def process_upload(data: bytes) -> Dict[str, Tuple[bytes, int, int]]:
+    """Memproses gambar upload di process pool tanpa memblokir event loop."""
+    global _pending
+    if _pending is None:
+        _pending = asyncio.Semaphore(IMAGE_PROCESS_MAX_PENDING)
+    async with _pending:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_image_executor(), process_image, data)
@@ -0,0 +1,143 @@
+# Registry metrik in-process dengan format teks Prometheus (GET /metrics).
+# Histogram latency diisi oleh MetricsMiddleware; gauge/counter lain dibaca lewat callback
+# saat /metrics diminta, jadi tidak ada biaya apa pun di jalur request biasa.
+import bisect
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Batas bucket latency dalam detik
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Dict[str, str]
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    """
+    Histogram berlabel. observe() hanya dipanggil dari event loop (middleware),
+    jadi cukup satu bisect dan beberapa penjumlahan tanpa lock.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...], buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # label values -> [jumlah per bucket (tidak kumulatif, terakhir untuk +Inf), total nilai]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, labelvalues: tuple, value: float):
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def counts(self) -> Iterable[Tuple[Labels, int]]:
+        """Jumlah observasi per kombinasi label (untuk counter *_total turunan)."""
+        for labelvalues, (bucket_counts, _) in list(self._series.items()):
+            yield dict(zip(self.labelnames, labelvalues)), sum(bucket_counts)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labelvalues, (bucket_counts, total) in list(self._series.items()):
+            labels = dict(zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += count
+                bucket_labels = _format_labels({**labels, "le": _format_value(float(bound))})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+class CallbackMetric:
+    """Gauge atau counter yang nilainya dibaca dari callback saat /metrics diminta."""
+
+    def __init__(self, name: str, kind: str, documentation: str, callback: Callable[[], Iterable[Tuple[Labels, float]]]):
+        self.name = name
+        self.kind = kind
+        self.documentation = documentation
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in self.callback():
+            lines.append(f"{self.name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        """Mendaftarkan metrik; nama yang sama menggantikan pendaftaran sebelumnya."""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def gauge(self, name: str, documentation: str, callback) -> CallbackMetric:
+        return self.register(CallbackMetric(name, "gauge", documentation, callback))
+
+    def counter(self, name: str, documentation: str, callback) -> CallbackMetric:
+        return self.register(CallbackMetric(name, "counter", documentation, callback))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "Latency request HTTP per route template, method, dan status.",
+    ("route", "method", "status"),
+))
+registry.counter(
+    "http_requests_total",
+    "Jumlah request HTTP per route template, method, dan status.",
+    REQUEST_DURATION.counts,
+)
+
+class MetricsMiddleware:
+    """Middleware ASGI yang mencatat latency setiap request HTTP ke REQUEST_DURATION."""
+
+    def __init__(self, app, histogram: Histogram = REQUEST_DURATION):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            # Request yang tidak cocok dengan route mana pun digabung agar label tidak meledak
+            template = route.path if route is not None else "unmatched"
+            self.histogram.observe((template, scope["method"], str(status_code)), time.perf_counter() - started)
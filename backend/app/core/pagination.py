@@ -0,0 +1,30 @@
+import base64
+import json
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Batas ukuran halaman untuk endpoint list dengan pagination
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", 24))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 100))
+
+def clamp_page_size(limit: int) -> int:
+    """Membatasi ukuran halaman yang diminta client ke MAX_PAGE_SIZE."""
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def encode_cursor(values: dict) -> str:
+    """Membuat cursor opaque (base64 URL-safe) dari posisi terakhir halaman."""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> dict:
+    """Membaca kembali cursor dari client. Melempar ValueError jika cursor tidak valid."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, dict):
+        raise ValueError("Invalid cursor")
+    return values
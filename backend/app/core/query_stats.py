@@ -0,0 +1,161 @@
+# Statistik SQL per request: jumlah statement, total waktu database, statement paling lambat,
+# dan (opsional) deteksi N+1. Hook cursor dipasang pada engine oleh app/database.py; middleware
+# ASGI di bawah membuka pencatatan per request lalu menulis hasilnya ke header Server-Timing dan log.
+# Log ditulis ke child logger "uvicorn.error", jadi ikut keluar lewat handler uvicorn tanpa konfigurasi
+# logging tambahan (dan tetap propagate ke root logger saat uvicorn tidak dipakai, misal di test).
+import logging
+import os
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+load_dotenv()
+
+logger = logging.getLogger("uvicorn.error").getChild("sql_stats")
+# INFO: satu baris per request; WARNING: hanya request lambat dan dugaan N+1
+logger.setLevel(os.getenv("SQL_STATS_LOG_LEVEL", "INFO").upper())
+
+SQL_STATS_ENABLED = os.getenv("SQL_STATS_ENABLED", "1") == "1"
+# Statement identik yang muncul sebanyak ini dalam satu request dicatat sebagai dugaan N+1 (0 = mati)
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", 0))
+# Request yang lebih lama dari ini (milidetik) dicatat sebagai WARNING (0 = mati)
+SQL_SLOW_REQUEST_MS = float(os.getenv("SQL_SLOW_REQUEST_MS", 1000))
+# Panjang maksimum teks statement yang ditulis ke log
+STATEMENT_LOG_LENGTH = 300
+# Execution option untuk statement yang memang sengaja diulang dalam satu request (counter
+# statistik, upsert rollup/leaderboard): tetap dihitung jumlah dan waktunya, tapi tidak ikut deteksi N+1.
+# Pemakaian: db.execute(stmt, execution_options=query_stats.REPEATED_BY_DESIGN)
+REPEATED_OPTION = "sql_stats_repeated"
+REPEATED_BY_DESIGN = {REPEATED_OPTION: True}
+
+class RequestStats:
+    """Akumulator statistik SQL untuk satu request."""
+    __slots__ = ("count", "total", "slowest", "slowest_statement", "shapes")
+
+    def __init__(self, track_shapes: bool = False):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_statement: Optional[str] = None
+        # Statement dengan placeholder parameter, jadi teks yang sama berarti bentuk query yang sama
+        self.shapes: Optional[Counter] = Counter() if track_shapes else None
+
+    def record(self, statement: str, elapsed: float, track_shape: bool = True):
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.slowest:
+            self.slowest = elapsed
+            self.slowest_statement = statement
+        if self.shapes is not None and track_shape:
+            self.shapes[statement] += 1
+
+    def n_plus_one_suspects(self, threshold: int) -> List[Tuple[str, int]]:
+        if self.shapes is None or threshold <= 0:
+            return []
+        return [(statement, count) for statement, count in self.shapes.most_common() if count >= threshold]
+
+    def server_timing(self, elapsed: float) -> str:
+        """Nilai header Server-Timing (durasi dalam milidetik)."""
+        return (
+            f'db;desc="{self.count} queries";dur={self.total * 1000:.2f}, '
+            f"db-slowest;dur={self.slowest * 1000:.2f}, "
+            f"app;dur={elapsed * 1000:.2f}"
+        )
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar("sql_request_stats", default=None)
+
+def current_stats() -> Optional[RequestStats]:
+    return _current_stats.get()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info["query_started"] = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    started = conn.info.pop("query_started", None)
+    if stats is not None and started is not None:
+        repeated = context is not None and context.execution_options.get(REPEATED_OPTION, False)
+        stats.record(statement, time.perf_counter() - started, track_shape=not repeated)
+
+def instrument_engine(engine: Engine):
+    """Memasang hook pencatatan statement pada engine sync (atau async_engine.sync_engine)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+def _shorten(statement: Optional[str]) -> Optional[str]:
+    if statement is None:
+        return None
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= STATEMENT_LOG_LENGTH else statement[:STATEMENT_LOG_LENGTH] + "..."
+
+class QueryStatsMiddleware:
+    """
+    Middleware ASGI: mencatat statistik SQL setiap request HTTP, menambahkan header
+    Server-Timing (db, db-slowest, app), dan menulis satu baris log terstruktur per request
+    (WARNING jika request lambat).
+    """
+
+    def __init__(self, app, n_plus_one_threshold: int = SQL_N_PLUS_ONE_THRESHOLD, slow_request_ms: float = SQL_SLOW_REQUEST_MS):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not SQL_STATS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(track_shapes=self.n_plus_one_threshold > 0)
+        token = _current_stats.set(stats)
+        started = time.perf_counter()
+        status_code = None
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                MutableHeaders(scope=message).append(
+                    "Server-Timing", stats.server_timing(time.perf_counter() - started)
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+            self._log(scope, status_code, stats, time.perf_counter() - started)
+
+    def _log(self, scope, status_code: Optional[int], stats: RequestStats, elapsed: float):
+        route = scope.get("route")
+        fields = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": getattr(route, "path", None),
+            "status": status_code,
+            "queries": stats.count,
+            "db_ms": round(stats.total * 1000, 2),
+            "slowest_ms": round(stats.slowest * 1000, 2),
+            "duration_ms": round(elapsed * 1000, 2),
+        }
+        slow = 0 < self.slow_request_ms <= fields["duration_ms"]
+        level = logging.WARNING if slow else logging.INFO
+        if logger.isEnabledFor(level):
+            slowest_statement = _shorten(stats.slowest_statement)
+            summary = " ".join(f"{key}={value}" for key, value in fields.items())
+            if slow:
+                summary += f" slowest_statement={slowest_statement}"
+            logger.log(
+                level, "%s %s", "sql_slow_request" if slow else "sql_stats", summary,
+                extra={"sql_stats": {**fields, "slow": slow, "slowest_statement": slowest_statement}},
+            )
+        for statement, count in stats.n_plus_one_suspects(self.n_plus_one_threshold):
+            logger.warning(
+                "sql_n_plus_one route=%s count=%d statement=%s", fields["route"], count, _shorten(statement),
+                extra={"sql_n_plus_one": {"route": fields["route"], "count": count, "statement": _shorten(statement)}},
+            )
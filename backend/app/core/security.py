@@ -1,14 +1,30 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+import asyncio
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # Konfigurasi Hashing Password
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Work factor bcrypt bisa diubah lewat env. Hash dengan rounds berbeda dianggap perlu
+# di-update dan akan di-hash ulang secara otomatis saat user berhasil login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# Pool khusus untuk bcrypt agar lonjakan login tidak menghabiskan threadpool FastAPI.
+# Jika antrian penuh, request langsung ditolak (503) daripada menunggu lama.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", PASSWORD_HASH_WORKERS * 4))
 
 # Konfigurasi JWT
 # Ambil dari environment variables
@@ -24,6 +40,47 @@ def get_password_hash(password: str) -> str:
     """Menghasilkan hash dari password."""
     return pwd_context.hash(password)
 
+class PasswordHasherBusy(Exception):
+    """Antrian pool bcrypt sudah penuh."""
+    pass
+
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_hash_pending = 0
+
+def password_hash_pending() -> int:
+    """Jumlah pekerjaan bcrypt yang sedang berjalan atau mengantri."""
+    return _hash_pending
+
+async def _run_in_hash_pool(func, *args):
+    # Hanya dipanggil dari event loop, jadi counter tidak butuh lock
+    global _hash_executor, _hash_pending
+    if _hash_pending >= PASSWORD_HASH_MAX_PENDING:
+        raise PasswordHasherBusy()
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+    _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_pending -= 1
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Memverifikasi password di pool bcrypt.
+    Mengembalikan (valid, hash_baru); hash_baru terisi jika work factor hash lama sudah tidak sesuai.
+    """
+    return await _run_in_hash_pool(pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Menghasilkan hash password di pool bcrypt."""
+    return await _run_in_hash_pool(pwd_context.hash, password)
+
+def shutdown_password_executor():
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Membuat JWT access token baru."""
     to_encode = data.copy()
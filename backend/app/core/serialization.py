@@ -0,0 +1,36 @@
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+from fastapi import Response
+from pydantic import TypeAdapter
+
+# Jalur serialisasi cepat untuk endpoint list.
+# Jalur bawaan FastAPI memvalidasi objek ORM ke response_model, mengubahnya menjadi dict
+# (jsonable_encoder/serialize), lalu meng-encode dict itu ke JSON. Di sini objek ORM divalidasi
+# sekali menjadi model Pydantic dan langsung di-dump ke bytes JSON oleh pydantic-core.
+
+@lru_cache(maxsize=None)
+def type_adapter(schema: Any) -> TypeAdapter:
+    """TypeAdapter per tipe (misal List[schemas.Book]) dibuat sekali lalu dipakai ulang."""
+    return TypeAdapter(schema)
+
+def dump_json(schema: Any, value: Any) -> bytes:
+    """Memvalidasi value (boleh berisi objek ORM) ke tipe schema lalu menghasilkan bytes JSON."""
+    adapter = type_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+def model_response(
+    schema: Any,
+    value: Any,
+    status_code: int = 200,
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    """
+    Response JSON yang sudah diserialisasi. FastAPI tidak memvalidasi ulang objek Response,
+    jadi response_model di decorator hanya dipakai untuk dokumentasi OpenAPI.
+    """
+    return Response(
+        content=dump_json(schema, value),
+        status_code=status_code,
+        media_type="application/json",
+        headers=dict(headers) if headers else None,
+    )
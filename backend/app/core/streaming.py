@@ -0,0 +1,93 @@
+import codecs
+import csv
+import io
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Optional, Tuple
+
+# Pembaca body request per baris untuk import data besar (CSV/NDJSON) tanpa
+# menampung seluruh body di memori.
+
+class InvalidEncodingError(ValueError):
+    """Body import bukan UTF-8 (misal CSV Windows-1252 dari Excel)."""
+
+    def __init__(self, line: int, offset: int):
+        super().__init__(f"Invalid UTF-8 at line {line} (byte offset {offset}); save the file as UTF-8")
+        self.line = line
+        self.offset = offset
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """
+    Memecah aliran bytes UTF-8 menjadi baris (termasuk karakter newline-nya).
+    Byte yang bukan UTF-8 menghasilkan InvalidEncodingError dengan nomor baris dan offset byte-nya.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    line_number = 1
+    consumed = 0
+
+    def decode(chunk: bytes, final: bool = False) -> Tuple[str, Optional[InvalidEncodingError]]:
+        try:
+            return decoder.decode(chunk, final=final), None
+        except UnicodeDecodeError as e:
+            # e.object berisi sisa byte dari chunk sebelumnya yang masih ditahan decoder ditambah chunk ini;
+            # bagian sebelum byte yang rusak tetap dikembalikan agar baris-baris utuhnya bisa diproses
+            valid = e.object[:e.start].decode("utf-8")
+            offset = consumed - (len(e.object) - len(chunk)) + e.start
+            return valid, InvalidEncodingError(line_number + valid.count("\n"), offset)
+
+    async for chunk in chunks:
+        text, error = decode(chunk)
+        pending += text
+        consumed += len(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            line_number += 1
+            yield line + "\n"
+        if error:
+            raise error
+    text, error = decode(b"", final=True)
+    pending += text
+    if error:
+        raise error
+    if pending:
+        yield pending
+
+async def iter_ndjson(chunks: AsyncIterable[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Menghasilkan (nomor_baris, objek) untuk setiap baris JSON yang tidak kosong.
+    Baris yang bukan JSON valid dihasilkan sebagai ValueError agar bisa dilaporkan per baris.
+    """
+    line_number = 0
+    async for line in iter_lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e}")
+
+async def iter_csv(chunks: AsyncIterable[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Menghasilkan (nomor_record, dict) untuk setiap record CSV; baris pertama adalah header.
+    Record dengan field berkutip yang berisi newline digabung sampai tanda kutipnya seimbang.
+    """
+    header = None
+    record_number = 0
+    pending = ""
+    async for line in iter_lines(chunks):
+        pending += line
+        if pending.count('"') % 2:
+            continue
+        record, pending = pending, ""
+        if not record.strip():
+            continue
+        values = next(csv.reader(io.StringIO(record)))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        record_number += 1
+        yield record_number, dict(zip(header, values))
+    if pending.strip():
+        record_number += 1
+        yield record_number, ValueError("Unterminated quoted field")
@@ -0,0 +1,107 @@
+# Counter statistik untuk dashboard admin.
+# Setiap perubahan buku, user, atau status peminjaman di app/crud.py memanggil fungsi
+# di sini sebelum commit, sehingga GET /statistics/summary cukup membaca tabel stat_counters.
+# Tabel yang sama menyimpan versi katalog untuk ETag endpoint buku dan kategori.
+import time
+from typing import Dict, Optional
+from sqlalchemy import func, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app import models
+from app.core.query_stats import REPEATED_BY_DESIGN
+
+BORROW_STATUSES = models.Borrow.__table__.c.status.type.enums
+
+def borrow_status_counter(status: str) -> str:
+    return f"borrows_{status}"
+
+COUNTER_NAMES = ["total_books", "total_users", "total_borrows"] + [
+    borrow_status_counter(status) for status in BORROW_STATUSES
+]
+
+# Versi katalog naik setiap ada perubahan buku (termasuk stok). Nilai awalnya diambil dari
+# waktu saat dibuat agar ETag lama tidak cocok lagi setelah database dibuat ulang.
+CATALOG_VERSION = "catalog_version"
+# Versi principal naik setiap data user berubah; dipakai crud.get_principal untuk
+# membuang cache user yang basi di semua worker.
+PRINCIPAL_VERSION = "principal_version"
+
+def bump(db: Session, name: str, delta: int = 1):
+    """Menambah counter secara atomik (UPDATE ... SET value = value + delta)."""
+    db.execute(
+        update(models.StatCounter)
+        .where(models.StatCounter.name == name)
+        .values(value=models.StatCounter.value + delta),
+        execution_options=REPEATED_BY_DESIGN,
+    )
+
+def record_borrow_transition(db: Session, old_status: Optional[str], new_status: str, count: int = 1):
+    """Mencatat peminjaman baru (old_status None) atau perpindahan status count peminjaman."""
+    if old_status == new_status or count <= 0:
+        return
+    if old_status is None:
+        bump(db, "total_borrows", count)
+    else:
+        bump(db, borrow_status_counter(old_status), -count)
+    bump(db, borrow_status_counter(new_status), count)
+
+def bump_version(db: Session, name: str) -> int:
+    """Menaikkan counter versi secara atomik dan mengembalikan nilai barunya (belum commit)."""
+    version = db.execute(
+        update(models.StatCounter)
+        .where(models.StatCounter.name == name)
+        .values(value=models.StatCounter.value + 1)
+        .returning(models.StatCounter.value),
+        execution_options=REPEATED_BY_DESIGN,
+    ).scalar()
+    if version is None:
+        version = int(time.time())
+        db.add(models.StatCounter(name=name, value=version))
+        db.flush()
+    return version
+
+def read_version(db: Session, name: str) -> int:
+    version = db.query(models.StatCounter.value).filter(models.StatCounter.name == name).scalar()
+    return version or 0
+
+def bump_catalog_version(db: Session) -> int:
+    """Menaikkan versi katalog secara atomik dan mengembalikan nilai barunya (belum commit)."""
+    return bump_version(db, CATALOG_VERSION)
+
+def read_catalog_version(db: Session) -> int:
+    return read_version(db, CATALOG_VERSION)
+
+def read_counters(db: Session) -> Dict[str, int]:
+    rows = db.query(models.StatCounter.name, models.StatCounter.value).all()
+    counters = {name: 0 for name in COUNTER_NAMES}
+    counters.update({row.name: row.value for row in rows})
+    return counters
+
+def reconcile(db: Session) -> Dict[str, int]:
+    """Menghitung ulang semua counter dari tabel sumber (belum commit)."""
+    values = {name: 0 for name in COUNTER_NAMES}
+    values["total_books"] = db.query(func.count(models.Book.id)).filter(models.Book.is_deleted == False).scalar()
+    values["total_users"] = db.query(func.count(models.User.id)).scalar()
+    values["total_borrows"] = db.query(func.count(models.Borrow.id)).scalar()
+    for status, count in db.query(models.Borrow.status, func.count(models.Borrow.id)).group_by(models.Borrow.status):
+        values[borrow_status_counter(status)] = count
+
+    existing = {counter.name: counter for counter in db.query(models.StatCounter).all()}
+    for name, value in values.items():
+        if name in existing:
+            existing[name].value = value
+        else:
+            db.add(models.StatCounter(name=name, value=value))
+    db.flush()
+    return values
+
+def ensure_counters(engine: Engine):
+    """Dipanggil saat startup: membangun counter jika tabelnya belum lengkap (misal setelah seeding)."""
+    with Session(bind=engine) as db:
+        names = {name for (name,) in db.query(models.StatCounter.name)}
+        if not set(COUNTER_NAMES) <= names:
+            reconcile(db)
+        for name in (CATALOG_VERSION, PRINCIPAL_VERSION):
+            if name not in names:
+                db.add(models.StatCounter(name=name, value=int(time.time())))
+        db.commit()
@@ -1,8 +1,25 @@
-from sqlalchemy.orm import Session, joinedload
-from app import models, schemas
-from typing import Optional, List
+from sqlalchemy.orm import Session, joinedload, selectinload, load_only, make_transient_to_detached
+from app import models, schemas, search, counters, borrow_state, ratings
+from sqlalchemy import and_, insert, literal, or_, select
+from app.database import dialect_insert
+from typing import Optional, List, Dict, Tuple
 from app.core.security import get_password_hash
+from app.core.images import compute_etag, IMAGE_OUTPUT_CONTENT_TYPE
+from app.core.cache import LRUCache
 from datetime import datetime
+import os
+import time
+
+# Kolom buku yang dibutuhkan schemas.BookInList saat ditampilkan di dalam listing lain
+def _book_in_list_option(relationship):
+    return joinedload(relationship).options(
+        load_only(
+            models.Book.id, models.Book.title, models.Book.image, models.Book.amount,
+            models.Book.rating_avg, models.Book.rating_count,
+        ),
+        selectinload(models.Book.authors),
+        selectinload(models.Book.categories),
+    )
 
 # --- User CRUD ---
 def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
@@ -14,6 +31,46 @@ def get_user_by_nim(db: Session, nim: str) -> Optional[models.User]:
 def get_user_by_id(db: Session, user_id: int) -> Optional[models.User]:
     return db.query(models.User).filter(models.User.id == user_id).first()
 
+# Cache snapshot user yang sedang login (per user id), supaya setiap request
+# terautentikasi tidak perlu SELECT ke tabel users. Setiap entri disimpan bersama versi
+# principal (counters.PRINCIPAL_VERSION) yang naik di update/delete user. Setiap worker membaca
+# versi itu paling sering sekali per PRINCIPAL_VERSION_CHECK_SECONDS, jadi perubahan role atau
+# status aktif dari worker lain terlihat paling lambat setelah interval itu (bukan setelah TTL).
+principal_cache = LRUCache(
+    "principals",
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_SIZE", 4096)),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 60)),
+)
+PRINCIPAL_VERSION_CHECK_SECONDS = float(os.getenv("PRINCIPAL_VERSION_CHECK_SECONDS", 1))
+_principal_version = {"value": 0, "checked_at": 0.0}
+
+def _current_principal_version(db: Session) -> int:
+    """Versi principal terakhir, dibaca ulang dari database jika interval pengecekan sudah lewat."""
+    now = time.monotonic()
+    if now - _principal_version["checked_at"] >= PRINCIPAL_VERSION_CHECK_SECONDS:
+        _principal_version["value"] = counters.read_version(db, counters.PRINCIPAL_VERSION)
+        _principal_version["checked_at"] = now
+    return _principal_version["value"]
+
+def _invalidate_principal(user_id: int):
+    """Dipanggil setelah commit perubahan user; versi baru langsung dibaca ulang di worker ini."""
+    principal_cache.invalidate(user_id)
+    _principal_version["checked_at"] = 0.0
+
+def get_principal(db: Session, user_id: int) -> Optional[schemas.User]:
+    """Mengambil data user yang login dari cache, atau dari database jika belum ada atau sudah basi."""
+    version = _current_principal_version(db)
+    entry = principal_cache.get(user_id)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    db_user = get_user_by_id(db, user_id=user_id)
+    if db_user is None:
+        principal_cache.invalidate(user_id)
+        return None
+    principal = schemas.User.model_validate(db_user)
+    principal_cache.set(user_id, (version, principal))
+    return principal
+
 def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[models.User]:
     return db.query(models.User).offset(skip).limit(limit).all()
 
@@ -21,8 +78,10 @@ def get_admin_count(db: Session) -> int:
     """Menghitung jumlah admin dalam sistem."""
     return db.query(models.User).filter(models.User.role == "admin").count()
 
-def create_user(db: Session, user: schemas.UserCreate) -> models.User:
-    hashed_password = get_password_hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None) -> models.User:
+    # Router menghitung hash di pool bcrypt; script tetap bisa memanggil tanpa hash
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = models.User(
         email=user.email,
         nim=user.nim,
@@ -31,6 +90,7 @@ def create_user(db: Session, user: schemas.UserCreate) -> models.User:
         role=user.role
     )
     db.add(db_user)
+    counters.bump(db, "total_users")
     db.commit()
     db.refresh(db_user)
     return db_user
@@ -55,10 +115,17 @@ def update_user(db: Session, db_user: models.User, user_in: schemas.UserUpdate)
     for field, value in update_data.items():
         setattr(db_user, field, value)
     
+    counters.bump_version(db, counters.PRINCIPAL_VERSION)
     db.commit()
+    _invalidate_principal(db_user.id)
     db.refresh(db_user)
     return db_user
 
+def update_user_password_hash(db: Session, db_user: models.User, hashed_password: str) -> models.User:
+    db_user.hashed_password = hashed_password
+    db.commit()
+    return db_user
+
 def delete_user(db: Session, user_id: int):
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
     if db_user:
@@ -67,91 +134,268 @@ def delete_user(db: Session, user_id: int):
             raise ValueError("Tidak dapat menghapus admin. Sistem harus memiliki minimal 1 admin.")
         
         db.delete(db_user)
+        counters.bump(db, "total_users", -1)
+        counters.bump_version(db, counters.PRINCIPAL_VERSION)
         db.commit()
+        _invalidate_principal(user_id)
     return db_user
 
 # --- Book, Author, Category CRUD ---
 def get_book(db: Session, book_id: int) -> Optional[models.Book]:
     return db.query(models.Book).options(
-        joinedload(models.Book.authors),
-        joinedload(models.Book.categories)
+        selectinload(models.Book.authors),
+        selectinload(models.Book.categories)
     ).filter(models.Book.id == book_id, models.Book.is_deleted == False).first()
 
-def get_books(db: Session, skip: int = 0, limit: Optional[int] = None) -> List[models.Book]:
+def get_books(
+    db: Session,
+    before_id: Optional[int] = None,
+    limit: int = 24,
+    sort: str = "newest",
+    min_rating: Optional[float] = None,
+    before_rating: Optional[float] = None,
+) -> List[models.Book]:
+    """
+    Keyset pagination berdasarkan Book.id (terbaru dulu), atau (rating_avg, id) jika sort="rating".
+    before_id/before_rating adalah posisi terakhir dari halaman sebelumnya, sehingga tidak ada OFFSET scan.
+    """
     query = db.query(models.Book).options(
-        joinedload(models.Book.authors),
-        joinedload(models.Book.categories)
-    ).filter(models.Book.is_deleted == False).order_by(models.Book.id.desc())
-    
-    if limit:
-        return query.offset(skip).limit(limit).all()
-    else:
-        return query.offset(skip).all()
+        selectinload(models.Book.authors),
+        selectinload(models.Book.categories)
+    ).filter(models.Book.is_deleted == False)
+    if min_rating is not None:
+        query = query.filter(models.Book.rating_avg >= min_rating)
+
+    if sort == "rating":
+        if before_id is not None:
+            query = query.filter(or_(
+                models.Book.rating_avg < before_rating,
+                and_(models.Book.rating_avg == before_rating, models.Book.id < before_id)
+            ))
+        return query.order_by(models.Book.rating_avg.desc(), models.Book.id.desc()).limit(limit).all()
+
+    if before_id is not None:
+        query = query.filter(models.Book.id < before_id)
+    return query.order_by(models.Book.id.desc()).limit(limit).all()
+
+def get_book_version(db: Session, book_id: int):
+    """Versi dan waktu perubahan terakhir buku, untuk conditional GET tanpa memuat bukunya."""
+    return db.query(models.Book.version, models.Book.updated_at).filter(
+        models.Book.id == book_id, models.Book.is_deleted == False
+    ).first()
 
-def create_book(db: Session, book: schemas.BookCreate, image_blob: Optional[bytes] = None) -> models.Book:
+def get_books_by_ids(db: Session, book_ids: List[int]) -> List[models.Book]:
+    """Mengambil beberapa buku sekaligus dengan urutan sesuai book_ids."""
+    if not book_ids:
+        return []
+    books = db.query(models.Book).options(
+        selectinload(models.Book.authors),
+        selectinload(models.Book.categories)
+    ).filter(models.Book.id.in_(book_ids), models.Book.is_deleted == False).all()
+    by_id = {book.id: book for book in books}
+    return [by_id[book_id] for book_id in book_ids if book_id in by_id]
+
+def get_book_cover_meta(db: Session, book_id: int, size: str = "full"):
+    """
+    Mengambil ETag, content type, dan versi cover tanpa memuat isi gambarnya.
+    Jika varian yang diminta belum ada (gambar lama), fallback ke varian full.
+    """
+    if size != "full":
+        variant = db.query(
+            models.BookImage.etag,
+            models.BookImage.content_type,
+            models.Book.image_etag.label("version"),
+            literal(size).label("variant"),
+        ).join(models.Book).filter(
+            models.BookImage.book_id == book_id,
+            models.BookImage.variant == size,
+            models.Book.is_deleted == False
+        ).first()
+        if variant:
+            return variant
+    return db.query(
+        models.Book.image_etag.label("etag"),
+        models.Book.image_content_type.label("content_type"),
+        models.Book.image_etag.label("version"),
+        literal("full").label("variant"),
+    ).filter(models.Book.id == book_id, models.Book.is_deleted == False).first()
+
+def get_book_cover_blob(db: Session, book_id: int, variant: str = "full") -> Optional[bytes]:
+    """Satu-satunya jalur untuk memuat isi gambar (kolom BLOB di-defer di model)."""
+    if variant != "full":
+        return db.query(models.BookImage.data).filter(
+            models.BookImage.book_id == book_id, models.BookImage.variant == variant
+        ).scalar()
+    return db.query(models.Book.image_blob).filter(
+        models.Book.id == book_id, models.Book.is_deleted == False
+    ).scalar()
+
+def _set_book_image(db_book: models.Book, image_variants: Dict[str, Tuple[bytes, int, int]]):
+    # Varian full disimpan langsung di tabel books, sisanya di book_images
+    full_data = image_variants["full"][0]
+    db_book.image_blob = full_data
+    db_book.image_content_type = IMAGE_OUTPUT_CONTENT_TYPE
+    db_book.image_etag = compute_etag(full_data)
+
+    # Update baris yang sudah ada agar tidak bentrok dengan unique constraint (book_id, variant)
+    existing = {image.variant: image for image in db_book.image_variants}
+    for name, (data, width, height) in image_variants.items():
+        if name == "full":
+            continue
+        db_image = existing.get(name)
+        if db_image is None:
+            db_image = models.BookImage(variant=name)
+            db_book.image_variants.append(db_image)
+        db_image.data = data
+        db_image.content_type = IMAGE_OUTPUT_CONTENT_TYPE
+        db_image.etag = compute_etag(data)
+        db_image.width = width
+        db_image.height = height
+
+def _touch_book(db: Session, db_book: models.Book):
+    """Menandai buku berubah: versi katalog naik dan dipakai sebagai versi buku (untuk ETag)."""
+    db_book.version = counters.bump_catalog_version(db)
+    db_book.updated_at = datetime.utcnow()
+
+def create_book(db: Session, book: schemas.BookCreate, image_variants: Optional[Dict[str, Tuple[bytes, int, int]]] = None) -> models.Book:
     # 1. Menyiapkan data buku dasar
     book_data = book.dict(exclude={"authors", "categories"})
-    db_book = models.Book(**book_data, image_blob=image_blob)
-
-    # 2. Mengelola Penulis (Author)
-    author_objects = []
-    for name in book.authors:
-        db_author = db.query(models.Author).filter(models.Author.name == name).first()
-        if not db_author:
-            db_author = models.Author(name=name)
-            db.add(db_author)
-        author_objects.append(db_author)
-    db_book.authors = author_objects
+    db_book = models.Book(**book_data)
+    if image_variants:
+        _set_book_image(db_book, image_variants)
+
+    # 2. Mengelola Penulis (Author) dan Kategori: semua nama di-resolve sekaligus
+    db_book.authors = _resolve_related(db, models.Author, book.authors)
 
     # 3. Mengelola Kategori
-    category_objects = []
-    for name in book.categories:
-        db_category = db.query(models.Category).filter(models.Category.name == name).first()
-        if not db_category:
-            db_category = models.Category(name=name)
-            db.add(db_category)
-        category_objects.append(db_category)
-    db_book.categories = category_objects
+    db_book.categories = _resolve_related(db, models.Category, book.categories)
     
-    # 4. Menyimpan ke database
+    # 4. Menyimpan ke database (indeks pencarian ikut dalam transaksi yang sama)
+    _touch_book(db, db_book)
     db.add(db_book)
+    db.flush()
+    search.index_book(db, db_book)
+    counters.bump(db, "total_books")
     db.commit()
-    db.refresh(db_book)
     return db_book
 
-def update_book(db: Session, db_book: models.Book, book_in: schemas.BookUpdate, image_blob: Optional[bytes] = None) -> models.Book:
+# Cache nama -> id penulis dan kategori. Nama bersifat unik dan tidak pernah dihapus,
+# jadi hanya id yang sudah ter-commit yang disimpan; nama yang baru disisipkan di-invalidate
+# dan baru masuk cache saat dibaca lagi di transaksi berikutnya.
+author_id_cache = LRUCache("author_ids", maxsize=int(os.getenv("NAME_ID_CACHE_SIZE", 10000)))
+category_id_cache = LRUCache("category_ids", maxsize=int(os.getenv("NAME_ID_CACHE_SIZE", 10000)))
+_name_id_caches = {models.Author: author_id_cache, models.Category: category_id_cache}
+
+def _resolve_names(db: Session, model, names: List[str]) -> Dict[str, int]:
+    """
+    Memetakan nama penulis/kategori ke id: dari cache, lalu sisanya dengan satu query IN.
+    Nama yang belum ada disisipkan sekaligus (INSERT ... ON CONFLICT DO NOTHING) lalu dibaca ulang.
+    """
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+    cache = _name_id_caches[model]
+    ids = {}
+    for name in names:
+        name_id = cache.get(name)
+        if name_id is not None:
+            ids[name] = name_id
+    unknown = [name for name in names if name not in ids]
+    if unknown:
+        found = dict(db.query(model.name, model.id).filter(model.name.in_(unknown)).all())
+        for name, name_id in found.items():
+            cache.set(name, name_id)
+        ids.update(found)
+    missing = [name for name in names if name not in ids]
+    if missing:
+        stmt = dialect_insert(db.get_bind(), model.__table__).on_conflict_do_nothing(index_elements=["name"])
+        db.execute(stmt, [{"name": name} for name in missing])
+        for name in missing:
+            cache.invalidate(name)
+        ids.update(db.query(model.name, model.id).filter(model.name.in_(missing)).all())
+    return ids
+
+def _resolve_related(db: Session, model, names: List[str]) -> list:
+    """
+    Objek Author/Category untuk daftar nama tanpa SELECT per nama. Objek dibuat dari
+    (id, name) hasil _resolve_names lalu ditempelkan ke session dengan merge(load=False).
+    """
+    ids = _resolve_names(db, model, names)
+    objects = []
+    for name in dict.fromkeys(names):
+        obj = model(id=ids[name], name=name)
+        make_transient_to_detached(obj)
+        objects.append(db.merge(obj, load=False))
+    return objects
+
+def _same_names(current: list, names: List[str]) -> bool:
+    return sorted(obj.name for obj in current) == sorted(dict.fromkeys(names))
+
+def bulk_create_books(db: Session, books: List[schemas.BookCreate]) -> List[int]:
+    """
+    Menyimpan banyak buku dalam satu transaksi: nama penulis/kategori di-resolve per batch,
+    buku dan baris relasi ditulis dengan executemany. Mengembalikan id buku sesuai urutan input.
+    """
+    if not books:
+        return []
+    author_ids = _resolve_names(db, models.Author, [name for book in books for name in book.authors])
+    category_ids = _resolve_names(db, models.Category, [name for book in books for name in book.categories])
+
+    version = counters.bump_catalog_version(db)
+    updated_at = datetime.utcnow()
+    rows = [
+        {**book.dict(exclude={"authors", "categories"}), "version": version, "updated_at": updated_at}
+        for book in books
+    ]
+    # sort_by_parameter_order menjamin id yang dikembalikan sesuai urutan baris input
+    # (PostgreSQL memakai INSERT multi-baris dengan kolom penanda, SQLite per baris)
+    book_ids = list(db.execute(
+        insert(models.Book.__table__).returning(models.Book.id, sort_by_parameter_order=True), rows
+    ).scalars())
+
+    author_rows, category_rows, documents = [], [], []
+    for book_id, book in zip(book_ids, books):
+        authors = list(dict.fromkeys(book.authors))
+        categories = list(dict.fromkeys(book.categories))
+        author_rows += [{"book_id": book_id, "author_id": author_ids[name]} for name in authors]
+        category_rows += [{"book_id": book_id, "category_id": category_ids[name]} for name in categories]
+        documents.append({
+            "book_id": book_id,
+            "title": book.title,
+            "authors": " ".join(authors),
+            "categories": " ".join(categories),
+            "description": book.description or "",
+        })
+    if author_rows:
+        db.execute(insert(models.book_authors_table), author_rows)
+    if category_rows:
+        db.execute(insert(models.book_categories_table), category_rows)
+    search.index_documents(db, documents)
+    counters.bump(db, "total_books", len(book_ids))
+    db.commit()
+    return book_ids
+
+def update_book(db: Session, db_book: models.Book, book_in: schemas.BookUpdate, image_variants: Optional[Dict[str, Tuple[bytes, int, int]]] = None) -> models.Book:
     update_data = book_in.dict(exclude_unset=True, exclude={"authors", "categories"})
     for key, value in update_data.items():
         setattr(db_book, key, value)
 
-    # Update authors jika ada
-    if book_in.authors is not None:
-        author_objects = []
-        for name in book_in.authors:
-            db_author = db.query(models.Author).filter(models.Author.name == name).first()
-            if not db_author:
-                db_author = models.Author(name=name)
-                db.add(db_author)
-            author_objects.append(db_author)
-        db_book.authors = author_objects
-
-    # Update categories jika ada
-    if book_in.categories is not None:
-        category_objects = []
-        for name in book_in.categories:
-            db_category = db.query(models.Category).filter(models.Category.name == name).first()
-            if not db_category:
-                db_category = models.Category(name=name)
-                db.add(db_category)
-            category_objects.append(db_category)
-        db_book.categories = category_objects
-
-    if image_blob is not None:
-        db_book.image_blob = image_blob
+    # Update authors jika ada dan berbeda dari yang sekarang
+    if book_in.authors is not None and not _same_names(db_book.authors, book_in.authors):
+        db_book.authors = _resolve_related(db, models.Author, book_in.authors)
 
+    # Update categories jika ada dan berbeda dari yang sekarang
+    if book_in.categories is not None and not _same_names(db_book.categories, book_in.categories):
+        db_book.categories = _resolve_related(db, models.Category, book_in.categories)
+
+    if image_variants:
+        _set_book_image(db_book, image_variants)
+
+    _touch_book(db, db_book)
     db.add(db_book)
+    db.flush()
+    search.index_book(db, db_book)
     db.commit()
-    db.refresh(db_book)
     return db_book
 
 def delete_book(db: Session, book_id: int) -> Optional[models.Book]:
@@ -168,8 +412,11 @@ def delete_book(db: Session, book_id: int) -> Optional[models.Book]:
     if active_borrows:
         raise ValueError("Cannot delete book with active or pending borrows")
     
-    # Soft delete: set is_deleted = True
+    # Soft delete: set is_deleted = True dan keluarkan dari indeks pencarian
     db_book.is_deleted = True
+    _touch_book(db, db_book)
+    search.remove_book(db, book_id)
+    counters.bump(db, "total_books", -1)
     db.commit()
     db.refresh(db_book)
     return db_book
@@ -190,12 +437,74 @@ def create_review(db: Session, review: schemas.ReviewCreate, user_id: int, book_
         book_id=book_id
     )
     db.add(db_review)
+    ratings.apply(db, book_id, None, review.review_score)
+    db.commit()
+    return get_review(db, db_review.id)
+
+def get_review(db: Session, review_id: int) -> Optional[models.Review]:
+    return db.query(models.Review).options(joinedload(models.Review.owner))\
+        .populate_existing().filter(models.Review.id == review_id).first()
+
+def get_reviews_for_book(
+    db: Session,
+    book_id: int,
+    before: Optional[Tuple[datetime, int]] = None,
+    limit: int = 10,
+) -> List[models.Review]:
+    """
+    Satu halaman review buku (terbaru dulu), keyset pada (created_at, id).
+    before adalah (created_at, id) review terakhir dari halaman sebelumnya.
+    Owner dimuat dengan satu query IN berisi kolom schemas.UserInResponse saja.
+    """
+    query = db.query(models.Review).options(
+        selectinload(models.Review.owner).load_only(
+            models.User.id, models.User.email, models.User.nim, models.User.full_name
+        )
+    ).filter(models.Review.book_id == book_id)
+    if before is not None:
+        before_created_at, before_id = before
+        query = query.filter(or_(
+            models.Review.created_at < before_created_at,
+            and_(models.Review.created_at == before_created_at, models.Review.id < before_id)
+        ))
+    return query.order_by(models.Review.created_at.desc(), models.Review.id.desc()).limit(limit).all()
+
+def has_returned_book(db: Session, user_id: int, book_id: int) -> bool:
+    """User hanya bisa review setelah mengembalikan buku (status "dikembalikan")."""
+    return db.query(models.Borrow.id).filter(
+        models.Borrow.user_id == user_id,
+        models.Borrow.book_id == book_id,
+        models.Borrow.status == "dikembalikan"
+    ).first() is not None
+
+def get_user_review(db: Session, review_id: int, user_id: int) -> Optional[models.Review]:
+    return db.query(models.Review).options(joinedload(models.Review.owner)).filter(
+        models.Review.id == review_id,
+        models.Review.user_id == user_id
+    ).first()
+
+def get_user_review_for_book(db: Session, user_id: int, book_id: int) -> Optional[models.Review]:
+    """Review milik user untuk satu buku (paling banyak satu, lihat _user_book_uc)."""
+    return db.query(models.Review).options(joinedload(models.Review.owner)).filter(
+        models.Review.user_id == user_id,
+        models.Review.book_id == book_id
+    ).first()
+
+def update_review(db: Session, db_review: models.Review, review_in: schemas.ReviewCreate) -> models.Review:
+    ratings.apply(db, db_review.book_id, db_review.review_score, review_in.review_score)
+    db_review.review_score = review_in.review_score
+    db_review.review_text = review_in.review_text
     db.commit()
-    db.refresh(db_review)
     return db_review
 
-def get_reviews_for_book(db: Session, book_id: int, skip: int = 0, limit: int = 10):
-    return db.query(models.Review).filter(models.Review.book_id == book_id).offset(skip).limit(limit).all()
+def delete_review(db: Session, db_review: models.Review):
+    db.delete(db_review)
+    ratings.apply(db, db_review.book_id, db_review.review_score, None)
+    db.commit()
+
+# --- Category CRUD ---
+def get_categories(db: Session) -> List[models.Category]:
+    return db.query(models.Category).all()
 
 # --- Borrow CRUD ---
 def create_borrow(db: Session, book_id: int, user_id: int):
@@ -217,93 +526,134 @@ def create_borrow(db: Session, book_id: int, user_id: int):
     # Buat record peminjaman dengan status 'menunggu', stok belum dikurangi
     db_borrow = models.Borrow(book_id=book_id, user_id=user_id, status="menunggu")
     db.add(db_borrow)
+    counters.record_borrow_transition(db, None, "menunggu")
     db.commit()
-    db.refresh(db_borrow)
-    return db_borrow
+    return get_borrow(db, db_borrow.id)
 
 def return_book(db: Session, borrow_id: int, user_id: int):
-    db_borrow = db.query(models.Borrow).filter(
-        models.Borrow.id == borrow_id,
-        models.Borrow.status == 'dipinjam'
-    ).first()
-    
-    if not db_borrow or db_borrow.peminjam_id != user_id:
+    # Hanya pemilik peminjaman yang bisa mengembalikan; stok bertambah di borrow_state
+    if not borrow_state.transition(db, borrow_id, "dipinjam", "dikembalikan", user_id=user_id):
         return None
-
-    db_book = get_book(db, book_id=db_borrow.buku_id)
-    if db_book:
-        db_book.amount += 1
-
-    db_borrow.status = 'dikembalikan'
-    db_borrow.return_date = datetime.now()
-    
     db.commit() # Simpan perubahan stok dan status peminjaman
-    db.refresh(db_borrow)
-    return db_borrow
+    return get_borrow(db, borrow_id)
 
-def get_user_borrows(db: Session, user_id: int):
-    return db.query(models.Borrow).filter(models.Borrow.user_id == user_id).order_by(models.Borrow.id.desc()).all()
+def get_borrow(db: Session, borrow_id: int) -> Optional[models.Borrow]:
+    """Mengambil satu peminjaman beserta data yang dibutuhkan schemas.Borrow."""
+    return db.query(models.Borrow)\
+        .options(joinedload(models.Borrow.borrower), _book_in_list_option(models.Borrow.book))\
+        .populate_existing().filter(models.Borrow.id == borrow_id).first()
 
-def get_all_borrows(db: Session):
+def get_user_borrows(db: Session, user_id: int):
     return db.query(models.Borrow)\
-        .options(joinedload(models.Borrow.borrower), joinedload(models.Borrow.book))\
-        .order_by(models.Borrow.id.desc()).all()
+        .options(joinedload(models.Borrow.borrower), _book_in_list_option(models.Borrow.book))\
+        .filter(models.Borrow.user_id == user_id).order_by(models.Borrow.id.desc()).all()
+
+def _borrow_filters(status=None, user_id=None, book_id=None, date_from=None, date_to=None) -> list:
+    """
+    Kondisi WHERE untuk filter antrean dan ekspor peminjaman. Rentang tanggal (date_to eksklusif)
+    memakai waktu pengajuan, karena borrow_date masih kosong untuk status menunggu dan ditolak.
+    """
+    conditions = []
+    if status:
+        conditions.append(models.Borrow.status == status)
+    if user_id is not None:
+        conditions.append(models.Borrow.user_id == user_id)
+    if book_id is not None:
+        conditions.append(models.Borrow.book_id == book_id)
+    if date_from:
+        conditions.append(models.Borrow.created_at >= date_from)
+    if date_to:
+        conditions.append(models.Borrow.created_at < date_to)
+    return conditions
+
+def get_all_borrows(
+    db: Session,
+    status: Optional[str] = None,
+    user_id: Optional[int] = None,
+    book_id: Optional[int] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    before_id: Optional[int] = None,
+    limit: int = 50,
+) -> List[models.Borrow]:
+    """Satu halaman peminjaman (terbaru dulu) dengan filter opsional, keyset pada id."""
+    query = db.query(models.Borrow)\
+        .options(joinedload(models.Borrow.borrower), _book_in_list_option(models.Borrow.book))\
+        .filter(*_borrow_filters(status, user_id, book_id, date_from, date_to))
+    if before_id is not None:
+        query = query.filter(models.Borrow.id < before_id)
+    return query.order_by(models.Borrow.id.desc()).limit(limit).all()
+
+# Kolom ekspor riwayat peminjaman (urutan kolom CSV)
+BORROW_EXPORT_COLUMNS = [
+    models.Borrow.id.label("id"),
+    models.Borrow.status.label("status"),
+    models.Borrow.created_at.label("created_at"),
+    models.Borrow.borrow_date.label("borrow_date"),
+    models.Borrow.return_date.label("return_date"),
+    models.Borrow.book_id.label("book_id"),
+    models.Book.title.label("book_title"),
+    models.Borrow.user_id.label("user_id"),
+    models.User.nim.label("user_nim"),
+    models.User.full_name.label("user_name"),
+    models.User.email.label("user_email"),
+]
+
+def borrow_export_statement(status=None, user_id=None, book_id=None, date_from=None, date_to=None):
+    """
+    SELECT baris-baris ekspor (tanpa objek ORM), terurut berdasarkan id.
+    Dijalankan dengan stream/yield_per oleh router agar tidak dimuat sekaligus.
+    """
+    return select(*BORROW_EXPORT_COLUMNS)\
+        .join(models.Book, models.Book.id == models.Borrow.book_id)\
+        .join(models.User, models.User.id == models.Borrow.user_id)\
+        .where(*_borrow_filters(status, user_id, book_id, date_from, date_to))\
+        .order_by(models.Borrow.id)
 
 def approve_borrow(db: Session, borrow_id: int):
-    db_borrow = db.query(models.Borrow).filter(models.Borrow.id == borrow_id, models.Borrow.status == "menunggu").first()
-    if not db_borrow:
-        return None
-    db_book = get_book(db, book_id=db_borrow.book_id)
-    if not db_book or db_book.amount <= 0:
-        db_borrow.status = "ditolak"
-        db.commit()
-        db.refresh(db_borrow)
-        return db_borrow
-    db_book.amount -= 1
-    db_borrow.status = "dipinjam"
+    try:
+        if not borrow_state.transition(db, borrow_id, "menunggu", "dipinjam"):
+            return None
+    except borrow_state.OutOfStock:
+        # Stok habis (misal eksemplar terakhir baru disetujui admin lain): tolak peminjaman
+        db.rollback()
+        if not borrow_state.transition(db, borrow_id, "menunggu", "ditolak"):
+            return None
     db.commit()
-    db.refresh(db_borrow)
-    return db_borrow
+    return get_borrow(db, borrow_id)
 
 def decline_borrow(db: Session, borrow_id: int):
-    db_borrow = db.query(models.Borrow).filter(models.Borrow.id == borrow_id, models.Borrow.status == "menunggu").first()
-    if not db_borrow:
+    if not borrow_state.transition(db, borrow_id, "menunggu", "ditolak"):
         return None
-    db_borrow.status = "ditolak"
     db.commit()
-    db.refresh(db_borrow)
-    return db_borrow
+    return get_borrow(db, borrow_id)
+
+def decide_borrows(db: Session, decisions: Dict[int, str]) -> Dict[int, str]:
+    """Keputusan massal untuk antrean peminjaman dalam satu transaksi (lihat borrow_state.decide_many)."""
+    outcomes = borrow_state.decide_many(db, decisions)
+    db.commit()
+    return outcomes
 
 def admin_update_borrow(db: Session, borrow_id: int, update_data):
-    db_borrow = db.query(models.Borrow).filter(models.Borrow.id == borrow_id).first()
-    if not db_borrow:
+    old_status = db.query(models.Borrow.status).filter(models.Borrow.id == borrow_id).scalar()
+    if old_status is None:
         return None
-    
-    # Update status
-    old_status = db_borrow.status
-    db_borrow.status = update_data.status
-    
-    # Jika status berubah dari dipinjam ke dikembalikan, kembalikan stok buku
-    if old_status == "dipinjam" and update_data.status == "dikembalikan":
-        db_book = get_book(db, book_id=db_borrow.book_id)
-        if db_book:
-            db_book.amount += 1
-        # Gunakan tanggal dari admin jika ada, jika tidak pakai datetime.now()
-        if hasattr(update_data, "return_date") and update_data.return_date:
-            if isinstance(update_data.return_date, str):
-                db_borrow.return_date = datetime.fromisoformat(update_data.return_date)
-            else:
-                db_borrow.return_date = update_data.return_date
-        else:
-            db_borrow.return_date = datetime.now()
-    
-    # Jika status berubah dari menunggu ke dipinjam, kurangi stok buku
-    elif old_status == "menunggu" and update_data.status == "dipinjam":
-        db_book = get_book(db, book_id=db_borrow.book_id)
-        if db_book and db_book.amount > 0:
-            db_book.amount -= 1
-        db_borrow.borrow_date = datetime.now()
-    
+    if update_data.status == old_status:
+        return get_borrow(db, borrow_id)
+
+    # Gunakan tanggal kembali dari admin jika ada, jika tidak pakai datetime.now()
+    moment = None
+    if update_data.status == "dikembalikan" and getattr(update_data, "return_date", None):
+        moment = update_data.return_date
+        if isinstance(moment, str):
+            moment = datetime.fromisoformat(moment)
+
+    try:
+        changed = borrow_state.transition(db, borrow_id, old_status, update_data.status, moment=moment)
+    except borrow_state.OutOfStock:
+        db.rollback()
+        raise
+    if not changed:
+        raise ValueError("Status peminjaman sudah diubah oleh proses lain, muat ulang data.")
     db.commit()
-    db.refresh(db_borrow)
-    return db_borrow
\ No newline at end of file
+    return get_borrow(db, borrow_id)
@@ -1,15 +1,116 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+import asyncio
+import logging
 import os
 from dotenv import load_dotenv
+from app.core import query_stats
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(
-    DATABASE_URL, 
-    # connect_args diperlukan untuk SQLite agar bisa berjalan di multithread FastAPI
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+# Konfigurasi connection pool (PostgreSQL, dan SQLite berbasis file)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE_SECONDS", 1800))
+
+# Pragma SQLite yang dipasang di setiap koneksi baru.
+# WAL membuat pembaca tidak diblokir oleh penulis, sehingga beberapa worker uvicorn
+# bisa memakai satu file database tanpa "database is locked".
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+SQLITE_CACHE_SIZE_KIB = int(os.getenv("SQLITE_CACHE_SIZE_KIB", 64 * 1024))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+
+# Interval maintenance berkala (ANALYZE / PRAGMA optimize), 0 untuk mematikan
+DB_MAINTENANCE_INTERVAL_SECONDS = int(os.getenv("DB_MAINTENANCE_INTERVAL_SECONDS", 6 * 3600))
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def _to_async_url(url: str) -> str:
+    """Mengganti driver sync di DATABASE_URL dengan driver async (aiosqlite/asyncpg)."""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql+psycopg2:"):
+        return url.replace("postgresql+psycopg2:", "postgresql+asyncpg:", 1)
+    if url.startswith("postgresql:"):
+        return url.replace("postgresql:", "postgresql+asyncpg:", 1)
+    return url
+
+def _engine_options(url: str) -> dict:
+    if _is_sqlite(url):
+        # connect_args diperlukan untuk SQLite agar bisa berjalan di multithread FastAPI
+        options = {"connect_args": {"check_same_thread": False}}
+        if ":memory:" not in url and not url.rstrip("/").endswith(":"):
+            options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+        return options
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    # Nilai negatif berarti ukuran dalam KiB, bukan jumlah halaman
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KIB}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.close()
+
+def configure_engine(engine: Engine):
+    """
+    Memasang hook koneksi (pragma SQLite) dan hook statistik SQL per request
+    pada engine sync maupun engine.sync_engine dari engine async.
+    """
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _apply_sqlite_pragmas)
+    query_stats.instrument_engine(engine)
+
+def dialect_insert(bind, table):
+    """INSERT khusus dialek (SQLite/PostgreSQL) yang mendukung on_conflict_do_update untuk upsert."""
+    if bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _to_async_url(DATABASE_URL)
+
+# Engine sync: dipakai saat startup (create_all) dan oleh script seperti scripts/seed_database.py
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+configure_engine(engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Engine async: dipakai oleh semua router lewat dependencies.get_db
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL))
+configure_engine(async_engine.sync_engine)
+# expire_on_commit=False agar objek hasil commit masih bisa diserialisasi tanpa lazy load
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+
+async def run_maintenance():
+    """Memperbarui statistik query planner (PRAGMA optimize di SQLite, ANALYZE di PostgreSQL)."""
+    statement = "PRAGMA optimize" if async_engine.dialect.name == "sqlite" else "ANALYZE"
+    async with async_engine.begin() as conn:
+        await conn.exec_driver_sql(statement)
+
+async def maintenance_loop(interval: int = DB_MAINTENANCE_INTERVAL_SECONDS):
+    """Menjalankan run_maintenance() secara berkala; dijalankan sebagai task di lifespan aplikasi."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_maintenance()
+        except Exception:
+            logger.exception("Database maintenance failed")
@@ -1,25 +1,29 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
 
-from app import crud, models, schemas
+from app import crud, schemas
 from app.core.security import SECRET_KEY, ALGORITHM
-from app.database import SessionLocal
+from app.database import AsyncSessionLocal
 
 # Skema untuk memberitahu FastAPI endpoint mana yang butuh token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
 
-def get_db():
-    """Dependency untuk mendapatkan sesi database."""
-    db = SessionLocal()
-    try:
+async def get_db():
+    """
+    Dependency untuk mendapatkan sesi database async.
+    Fungsi di app/crud.py dijalankan lewat `await db.run_sync(crud.fungsi, ...)`,
+    sehingga I/O database tidak memblokir event loop maupun threadpool.
+    """
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> models.User:
-    """Dependency untuk mendapatkan user yang sedang login dari token JWT."""
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> schemas.User:
+    """
+    Dependency untuk mendapatkan user yang sedang login dari token JWT.
+    User diambil dari principal cache berdasarkan id di token, jadi biasanya tanpa query database.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -30,16 +34,24 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
-        token_data = schemas.TokenData(email=email)
-    except JWTError:
+        token_data = schemas.TokenData(email=email, user_id=payload.get("uid"))
+    except (JWTError, ValueError):
         raise credentials_exception
     
-    user = crud.get_user_by_email(db, email=token_data.email)
-    if user is None:
+    if token_data.user_id is None:
+        # Token lama (sebelum ada klaim uid) masih dicari berdasarkan email
+        db_user = await db.run_sync(crud.get_user_by_email, email=token_data.email)
+        if db_user is None:
+            raise credentials_exception
+        token_data.user_id = db_user.id
+
+    user = await db.run_sync(crud.get_principal, user_id=token_data.user_id)
+    # Cocokkan email juga agar token milik user yang sudah dihapus tidak berlaku untuk id yang dipakai ulang
+    if user is None or user.email != token_data.email:
         raise credentials_exception
     return user
 
-def require_admin_role(current_user: models.User = Depends(get_current_user)) -> models.User:
+async def require_admin_role(current_user: schemas.User = Depends(get_current_user)) -> schemas.User:
     """Dependency untuk memastikan user yang mengakses adalah admin."""
     if current_user.role != "admin":
         raise HTTPException(
@@ -0,0 +1,125 @@
+# Leaderboard buku yang paling sering dipinjam.
+# Setiap peminjaman yang disetujui (status menjadi "dipinjam") menambah counter buku itu
+# untuk periode "all" dan untuk bulan borrow_date-nya. Top-N dibaca lewat indeks
+# (period, count) sehingga tidak ada GROUP BY atas seluruh riwayat peminjaman.
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import delete, func, literal, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app import models, counters
+from app.core.cache import LRUCache
+from app.core.query_stats import REPEATED_BY_DESIGN
+from app.database import dialect_insert
+
+ALL_TIME = "all"
+LEADERBOARD_STATUSES = ("dipinjam", "dikembalikan")
+# Hasil top-N per (versi katalog, periode, limit). Setiap perubahan yang memengaruhi ranking
+# (peminjaman disetujui, buku diubah/dihapus, rebuild) menaikkan versi katalog, jadi entri lama
+# otomatis tidak terpakai lagi di semua worker tanpa perlu invalidasi atau TTL.
+leaderboard_cache = LRUCache("leaderboard", maxsize=64)
+
+def month_period(moment: datetime) -> str:
+    return moment.strftime("%Y-%m")
+
+def _increment(db: Session, increments: Counter):
+    """Upsert: INSERT ... ON CONFLICT DO UPDATE SET count = count + excluded.count."""
+    if not increments:
+        return
+    rows = [
+        {"book_id": book_id, "period": period, "count": count}
+        for (book_id, period), count in increments.items()
+    ]
+    stmt = dialect_insert(db.get_bind(), models.BookBorrowCount.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["book_id", "period"],
+        set_={"count": models.BookBorrowCount.__table__.c.count + stmt.excluded["count"]},
+    )
+    db.execute(stmt, rows, execution_options=REPEATED_BY_DESIGN)
+
+def record_borrow(db: Session, book_id: int, moment: Optional[datetime]):
+    """Mencatat satu peminjaman yang disetujui (belum commit)."""
+    record_borrows(db, {book_id: 1}, moment)
+
+def record_borrows(db: Session, book_counts: Dict[int, int], moment: Optional[datetime]):
+    """Mencatat beberapa peminjaman yang disetujui bersamaan ({book_id: jumlah}) dalam satu upsert."""
+    increments = Counter()
+    for book_id, count in book_counts.items():
+        increments[(book_id, ALL_TIME)] += count
+        if moment:
+            increments[(book_id, month_period(moment))] += count
+    _increment(db, increments)
+
+def top_books(
+    db: Session, period: str = ALL_TIME, limit: int = 5, version: Optional[int] = None
+) -> List[Tuple[int, str, int]]:
+    """
+    Mengembalikan [(book_id, title, borrow_count)] untuk buku yang belum dihapus.
+    version adalah versi katalog yang sudah dibaca pemanggil (misal untuk ETag); jika kosong dibaca di sini.
+    """
+    if version is None:
+        version = counters.read_catalog_version(db)
+    key = (version, period, limit)
+    cached = leaderboard_cache.get(key)
+    if cached is not None:
+        return cached
+    rows = db.query(
+        models.BookBorrowCount.book_id, models.Book.title, models.BookBorrowCount.count
+    ).join(
+        models.Book, models.Book.id == models.BookBorrowCount.book_id
+    ).filter(
+        models.BookBorrowCount.period == period,
+        models.BookBorrowCount.count > 0,
+        models.Book.is_deleted == False
+    ).order_by(
+        models.BookBorrowCount.count.desc(), models.BookBorrowCount.book_id
+    ).limit(limit).all()
+    result = [(row.book_id, row.title, row.count) for row in rows]
+    leaderboard_cache.set(key, result)
+    return result
+
+def month_expression(dialect: str, column):
+    """Ekspresi SQL untuk month_period(), dipakai saat rebuild."""
+    if dialect == "postgresql":
+        return func.to_char(column, "YYYY-MM")
+    return func.strftime("%Y-%m", column)
+
+def rebuild(db: Session, batch_size: int = 100000, progress=None) -> int:
+    """
+    Menghitung ulang seluruh leaderboard dari tabel borrows dengan INSERT ... SELECT ... GROUP BY
+    per rentang id. Aturannya sama dengan app/rollups.py: peminjaman dihitung jika punya borrow_date.
+    Mengembalikan id peminjaman terbesar yang diproses. Belum commit.
+    """
+    db.execute(delete(models.BookBorrowCount))
+    dialect = db.get_bind().dialect.name
+    table = models.BookBorrowCount.__table__
+    max_id = db.query(func.max(models.Borrow.id)).scalar() or 0
+    for start in range(0, max_id, batch_size):
+        for period in (literal(ALL_TIME), month_expression(dialect, models.Borrow.borrow_date)):
+            source = select(models.Borrow.book_id, period, func.count()).where(
+                models.Borrow.id.between(start + 1, start + batch_size),
+                models.Borrow.status.in_(LEADERBOARD_STATUSES),
+                models.Borrow.borrow_date.isnot(None)
+            ).group_by(models.Borrow.book_id, period)
+            stmt = dialect_insert(db.get_bind(), table).from_select(["book_id", "period", "count"], source)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["book_id", "period"],
+                set_={"count": table.c.count + stmt.excluded["count"]},
+            )
+            db.execute(stmt)
+        if progress:
+            progress(min(start + batch_size, max_id))
+    # Versi katalog baru agar cache leaderboard di semua worker dibaca ulang
+    counters.bump_catalog_version(db)
+    return max_id
+
+def ensure_leaderboard(engine: Engine):
+    """Dipanggil saat startup: membangun leaderboard jika masih kosong padahal sudah ada peminjaman."""
+    with Session(bind=engine) as db:
+        if db.query(models.BookBorrowCount.book_id).first() is not None:
+            return
+        if db.query(models.Borrow.id).filter(models.Borrow.borrow_date.isnot(None)).first() is None:
+            return
+        rebuild(db)
+        db.commit()
@@ -1,17 +1,53 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app import models
-from app.database import engine
-from app.routers import auth, books, reviews, borrows, statistics, categories
+from app import models, search, counters, rollups, leaderboard, ratings, schema_upgrade
+from app.core import images, security
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.metrics import MetricsMiddleware
+from app.database import engine, async_engine, maintenance_loop, DB_MAINTENANCE_INTERVAL_SECONDS
+from app.routers import auth, books, reviews, borrows, statistics, categories, metrics
 
 models.Base.metadata.create_all(bind=engine)
+# Kolom/indeks baru untuk database yang dibuat dengan skema lama
+schema_upgrade.upgrade(engine)
+search.create_search_index(engine)
+counters.ensure_counters(engine)
+rollups.ensure_rollups(engine)
+leaderboard.ensure_leaderboard(engine)
+ratings.ensure_ratings(engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    maintenance_task = None
+    if DB_MAINTENANCE_INTERVAL_SECONDS > 0:
+        maintenance_task = asyncio.create_task(maintenance_loop())
+    yield
+    if maintenance_task:
+        maintenance_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await maintenance_task
+    # Menutup pool pemrosesan gambar, bcrypt, dan koneksi database saat server berhenti
+    images.shutdown_image_executor()
+    security.shutdown_password_executor()
+    await async_engine.dispose()
 
 app = FastAPI(
     title="API E-PERSMIP",
     description="API untuk manajemen buku, peminjaman, dan review.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjson untuk semua response JSON; endpoint list memakai app.core.serialization
+    default_response_class=ORJSONResponse
 )
 
+# Statistik SQL per request (header Server-Timing dan log), dipasang di dalam CORS
+app.add_middleware(QueryStatsMiddleware)
+# Histogram latency per route untuk GET /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Konfigurasi CORS (Cross-Origin Resource Sharing)
 # Mengizinkan frontend React untuk mengakses API ini
 app.add_middleware(
@@ -29,6 +65,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["X-Borrow-Counts", "Server-Timing"],
 )
 
 # Memasukkan semua router
@@ -38,6 +75,7 @@ app.include_router(reviews.router_reviews)
 app.include_router(borrows.router_borrows)
 app.include_router(statistics.router)
 app.include_router(categories.router_categories)
+app.include_router(metrics.router_metrics)
 
 
 @app.get("/", tags=["Root"])
@@ -1,8 +1,8 @@
 import enum
 from datetime import datetime
-from sqlalchemy import (Column, Integer, String, ForeignKey, Text, Enum, DateTime,
+from sqlalchemy import (Column, Integer, String, ForeignKey, Text, Enum, DateTime, Date,
                         Float, Table, UniqueConstraint, Index, LargeBinary, Boolean)
-from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy.orm import relationship, declarative_base, deferred
 
 Base = declarative_base()
 
@@ -48,15 +48,49 @@ class Book(Base):
     amount = Column(Integer, nullable=False, default=1)
     description = Column(Text, nullable=True)
     image = Column(String, nullable=True)
-    image_blob = Column(LargeBinary, nullable=True)
+    # BLOB gambar tidak pernah ikut dimuat pada query buku biasa. Akses tanpa undefer()
+    # akan melempar error alih-alih diam-diam memuat megabyte data per baris.
+    image_blob = deferred(Column(LargeBinary, nullable=True), raiseload=True)
+    image_content_type = Column(String, nullable=True)
+    image_etag = Column(String, nullable=True)  # SHA-256 dari image_blob
     publisher = Column(String, nullable=True)
     published_date = Column(String, nullable=True)
     rating = Column(Float, nullable=True)
+    # Agregat dari tabel reviews, diperbarui app/ratings.py setiap review berubah
+    rating_sum = Column(Float, nullable=False, default=0.0)
+    rating_count = Column(Integer, nullable=False, default=0)
+    rating_avg = Column(Float, nullable=False, default=0.0)
     is_deleted = Column(Boolean, default=False, nullable=False)  # Soft delete
+    # Versi baris untuk ETag GET /books/{id}; diisi dari versi katalog setiap kali buku berubah
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=True)
     authors = relationship("Author", secondary=book_authors_table, back_populates="books")
     categories = relationship("Category", secondary=book_categories_table, back_populates="books")
     reviews = relationship("Review", back_populates="book")
     borrows = relationship("Borrow", back_populates="book")
+    # Varian gambar yang lebih kecil (thumb/medium); varian full disimpan di image_blob
+    image_variants = relationship("BookImage", back_populates="book", cascade="all, delete-orphan")
+
+    # Mendukung keyset pagination katalog (WHERE is_deleted = 0 ORDER BY id DESC)
+    # dan katalog urut rating (ORDER BY rating_avg DESC, id DESC, filter rating minimum)
+    __table_args__ = (
+        Index('ix_books_is_deleted_id', 'is_deleted', 'id'),
+        Index('ix_books_is_deleted_rating_avg_id', 'is_deleted', 'rating_avg', 'id'),
+    )
+
+class BookImage(Base):
+    __tablename__ = "book_images"
+    id = Column(Integer, primary_key=True)
+    book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
+    variant = Column(String, nullable=False)
+    content_type = Column(String, nullable=False)
+    etag = Column(String, nullable=False)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    data = deferred(Column(LargeBinary, nullable=False), raiseload=True)
+    book = relationship("Book", back_populates="image_variants")
+
+    __table_args__ = (UniqueConstraint('book_id', 'variant', name='_book_image_variant_uc'),)
 
 class Review(Base):
     __tablename__ = "reviews"
@@ -70,7 +104,11 @@ class Review(Base):
     book = relationship("Book", back_populates="reviews")
 
     # ATURAN: Satu user hanya bisa mereview satu buku sekali.
-    __table_args__ = (UniqueConstraint('user_id', 'book_id', name='_user_book_uc'),)
+    __table_args__ = (
+        UniqueConstraint('user_id', 'book_id', name='_user_book_uc'),
+        # Daftar review per buku (terbaru dulu) dengan keyset pagination
+        Index('ix_reviews_book_id_created_at', 'book_id', 'created_at', 'id'),
+    )
 
 class Borrow(Base):
     __tablename__ = "borrows"
@@ -79,6 +117,8 @@ class Borrow(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     borrow_date = Column(DateTime, nullable=True)
     return_date = Column(DateTime, nullable=True)  # Tanggal kembali
+    # Waktu pengajuan; borrow_date baru terisi saat disetujui (jam lokal, sama seperti borrow_date)
+    created_at = Column(DateTime, default=datetime.now, nullable=False)
     status = Column(Enum("menunggu", "disetujui", "dipinjam", "dikembalikan", "ditolak", name="status_peminjaman_enum"), default="menunggu", nullable=False)
     book = relationship("Book", back_populates="borrows")
     borrower = relationship("User", back_populates="borrows")
@@ -91,4 +131,43 @@ class Borrow(Base):
             unique=True,
             sqlite_where=(status == 'dipinjam')
         ),
-    )
\ No newline at end of file
+        # Mendukung antrean admin dengan filter + keyset pagination (ORDER BY id DESC)
+        Index('ix_borrows_status_id', status, id),
+        Index('ix_borrows_user_id_id', user_id, id),
+        Index('ix_borrows_book_id_id', book_id, id),
+        # Filter rentang tanggal pengajuan di antrean admin dan ekspor
+        Index('ix_borrows_created_at', created_at),
+    )
+
+# Counter statistik (jumlah buku, user, peminjaman per status) yang diperbarui
+# di transaksi yang sama dengan perubahan datanya, lihat app/counters.py
+class StatCounter(Base):
+    __tablename__ = "stat_counters"
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+# Rollup jumlah peminjaman per periode (hari/minggu/bulan) dan status, lihat app/rollups.py
+class BorrowRollup(Base):
+    __tablename__ = "borrow_rollups"
+    granularity = Column(String, primary_key=True)  # "day", "week", atau "month"
+    status = Column(String, primary_key=True)
+    period_start = Column(Date, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+# Jumlah peminjaman per buku, sepanjang waktu ("all") dan per bulan ("YYYY-MM"),
+# untuk leaderboard buku terpopuler, lihat app/leaderboard.py
+class BookBorrowCount(Base):
+    __tablename__ = "book_borrow_counts"
+    book_id = Column(Integer, ForeignKey("books.id"), primary_key=True)
+    period = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    # Top-N per periode dibaca langsung dari indeks ini tanpa agregasi
+    __table_args__ = (Index('ix_book_borrow_counts_period_count', 'period', 'count'),)
+
+# Jumlah review per skor bintang (1-5) untuk setiap buku, lihat app/ratings.py
+class BookRatingBucket(Base):
+    __tablename__ = "book_rating_buckets"
+    book_id = Column(Integer, ForeignKey("books.id"), primary_key=True)
+    score = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,130 @@
+# Agregat rating buku: rating_sum, rating_count, rating_avg di tabel books dan jumlah review
+# per skor bintang di tabel book_rating_buckets. Setiap create/update/delete review memanggil
+# apply() dalam transaksi yang sama, sehingga katalog dan daftar review bisa menampilkan
+# rating tanpa agregasi tabel reviews.
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app import models, counters
+from app.core.query_stats import REPEATED_BY_DESIGN
+from app.database import dialect_insert
+
+HISTOGRAM_SCORES = (1, 2, 3, 4, 5)
+
+def score_bucket(score: float) -> int:
+    """Skor review (boleh pecahan) dibulatkan ke bintang terdekat; .5 dibulatkan ke atas."""
+    for bucket in reversed(HISTOGRAM_SCORES[1:]):
+        if score >= bucket - 0.5:
+            return bucket
+    return HISTOGRAM_SCORES[0]
+
+def bucket_expression(column):
+    """Ekspresi SQL untuk score_bucket(), dipakai saat rebuild."""
+    return case(
+        *[(column >= bucket - 0.5, bucket) for bucket in reversed(HISTOGRAM_SCORES[1:])],
+        else_=HISTOGRAM_SCORES[0],
+    )
+
+def _increment_buckets(db: Session, book_id: int, increments: Counter):
+    """Upsert: INSERT ... ON CONFLICT DO UPDATE SET count = count + excluded.count."""
+    rows = [{"book_id": book_id, "score": score, "count": count} for score, count in increments.items() if count]
+    if not rows:
+        return
+    table = models.BookRatingBucket.__table__
+    stmt = dialect_insert(db.get_bind(), table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["book_id", "score"],
+        set_={"count": table.c.count + stmt.excluded["count"]},
+    )
+    db.execute(stmt, rows, execution_options=REPEATED_BY_DESIGN)
+
+def apply(db: Session, book_id: int, old_score: Optional[float], new_score: Optional[float]):
+    """
+    Mencatat perubahan satu review ke agregat buku (belum commit): old_score None untuk review
+    baru, new_score None untuk review yang dihapus. Agregat di books diperbarui dalam satu UPDATE;
+    ruas kanan SET membaca nilai lama, jadi rata-rata dihitung dari jumlah yang sudah diperbarui.
+    """
+    score_delta = (new_score or 0.0) - (old_score or 0.0)
+    count_delta = (new_score is not None) - (old_score is not None)
+    book = models.Book
+    new_count = book.rating_count + count_delta
+    new_sum = book.rating_sum + score_delta
+    db.execute(
+        update(book).where(book.id == book_id).values(
+            rating_sum=case((new_count > 0, new_sum), else_=0.0),
+            rating_count=new_count,
+            rating_avg=case((new_count > 0, new_sum / new_count), else_=0.0),
+            version=counters.bump_catalog_version(db),
+            updated_at=datetime.utcnow(),
+        ),
+        execution_options={"synchronize_session": False},
+    )
+
+    increments = Counter()
+    if old_score is not None:
+        increments[score_bucket(old_score)] -= 1
+    if new_score is not None:
+        increments[score_bucket(new_score)] += 1
+    _increment_buckets(db, book_id, increments)
+
+def summary(db: Session, book_id: int) -> Optional[Tuple[float, int, Dict[str, int]]]:
+    """(rating_avg, rating_count, histogram {"1".."5": jumlah}) untuk buku yang belum dihapus, atau None."""
+    book = db.query(models.Book.rating_avg, models.Book.rating_count)\
+        .filter(models.Book.id == book_id, models.Book.is_deleted == False).first()
+    if book is None:
+        return None
+    histogram = {str(score): 0 for score in HISTOGRAM_SCORES}
+    buckets = db.query(models.BookRatingBucket.score, models.BookRatingBucket.count)\
+        .filter(models.BookRatingBucket.book_id == book_id)
+    for score, count in buckets:
+        histogram[str(score)] = count
+    return book.rating_avg, book.rating_count, histogram
+
+def rebuild(db: Session) -> int:
+    """
+    Menghitung ulang seluruh agregat rating dan histogram dari tabel reviews.
+    Mengembalikan jumlah buku yang punya review. Belum commit.
+    """
+    book = models.Book
+    totals = select(
+        models.Review.book_id,
+        func.sum(models.Review.review_score).label("score_sum"),
+        func.count(models.Review.id).label("review_count"),
+    ).group_by(models.Review.book_id).subquery()
+    db.execute(
+        update(book).values(rating_sum=0.0, rating_count=0, rating_avg=0.0),
+        execution_options={"synchronize_session": False},
+    )
+    result = db.execute(
+        update(book).where(book.id == totals.c.book_id).values(
+            rating_sum=totals.c.score_sum,
+            rating_count=totals.c.review_count,
+            rating_avg=totals.c.score_sum / totals.c.review_count,
+        ),
+        execution_options={"synchronize_session": False},
+    )
+
+    db.execute(delete(models.BookRatingBucket))
+    bucket = bucket_expression(models.Review.review_score)
+    db.execute(
+        models.BookRatingBucket.__table__.insert().from_select(
+            ["book_id", "score", "count"],
+            select(models.Review.book_id, bucket, func.count()).group_by(models.Review.book_id, bucket),
+        )
+    )
+    # Rating tampil di katalog, jadi ETag katalog harus berubah
+    counters.bump_catalog_version(db)
+    return result.rowcount
+
+def ensure_ratings(engine: Engine):
+    """Dipanggil saat startup: rebuild jika sudah ada review tapi belum ada agregat (misal setelah seeding)."""
+    with Session(bind=engine) as db:
+        if db.query(models.Review.id).first() is None:
+            return
+        if db.query(models.BookRatingBucket.book_id).first() is not None:
+            return
+        rebuild(db)
+        db.commit()
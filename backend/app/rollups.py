@@ -0,0 +1,133 @@
+# Rollup peminjaman per periode (hari/minggu/bulan) dan status.
+# Pencatatan per transisi menghitung periode di Python; backfill memakai ekspresi tanggal
+# SQL per dialek (SQLite/PostgreSQL) dengan aturan yang sama (minggu dimulai hari Senin).
+# Rollup hanya mencatat transisi yang punya tanggal di tabel borrows: "dipinjam" (borrow_date)
+# dan "dikembalikan" (return_date), agar backfill dari data lama menghasilkan angka yang sama.
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import Date, cast, delete, func, literal, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app import models
+from app.core.query_stats import REPEATED_BY_DESIGN
+from app.database import dialect_insert
+
+GRANULARITIES = ("day", "week", "month")
+ROLLUP_STATUSES = ("dipinjam", "dikembalikan")
+
+RollupKey = Tuple[str, str, date]
+
+def period_start(granularity: str, moment: datetime) -> date:
+    """Tanggal awal periode: hari itu sendiri, Senin di minggu itu, atau tanggal 1 di bulan itu."""
+    day = moment.date() if isinstance(moment, datetime) else moment
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+def period_label(granularity: str, start: date) -> str:
+    return start.strftime("%Y-%m") if granularity == "month" else start.isoformat()
+
+def _increment(db: Session, increments: Dict[RollupKey, int]):
+    """Upsert: INSERT ... ON CONFLICT DO UPDATE SET count = count + excluded.count."""
+    if not increments:
+        return
+    rows = [
+        {"granularity": granularity, "status": status, "period_start": start, "count": count}
+        for (granularity, status, start), count in increments.items()
+    ]
+    stmt = dialect_insert(db.get_bind(), models.BorrowRollup.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["granularity", "status", "period_start"],
+        set_={"count": models.BorrowRollup.__table__.c.count + stmt.excluded["count"]},
+    )
+    db.execute(stmt, rows, execution_options=REPEATED_BY_DESIGN)
+
+def _keys(status: str, moment: datetime) -> Iterable[RollupKey]:
+    return ((granularity, status, period_start(granularity, moment)) for granularity in GRANULARITIES)
+
+def record_transition(db: Session, status: str, moment: Optional[datetime], count: int = 1):
+    """Mencatat transisi peminjaman (count peminjaman pada waktu yang sama) ke rollup (belum commit)."""
+    if status not in ROLLUP_STATUSES or moment is None or count <= 0:
+        return
+    _increment(db, {key: count for key in _keys(status, moment)})
+
+def period_expression(dialect: str, granularity: str, column):
+    """Ekspresi SQL untuk period_start(), dipakai saat backfill."""
+    if dialect == "postgresql":
+        return cast(func.date_trunc(granularity, column), Date)
+    if granularity == "week":
+        return func.date(column, "-6 days", "weekday 1")
+    if granularity == "month":
+        return func.date(column, "start of month")
+    return func.date(column)
+
+def _backfill_sources():
+    # Peminjaman yang sudah dikembalikan juga pernah berstatus "dipinjam"
+    return [
+        ("dipinjam", models.Borrow.borrow_date, models.Borrow.status.in_(ROLLUP_STATUSES)),
+        ("dikembalikan", models.Borrow.return_date, models.Borrow.status == "dikembalikan"),
+    ]
+
+def backfill(db: Session, batch_size: int = 100000, progress=None) -> int:
+    """
+    Membangun ulang seluruh rollup dari tabel borrows. Agregasi dilakukan di database
+    (INSERT ... SELECT ... GROUP BY dengan upsert) per rentang id sebesar batch_size.
+    Mengembalikan id peminjaman terbesar yang diproses. Belum commit.
+    """
+    db.execute(delete(models.BorrowRollup))
+    dialect = db.get_bind().dialect.name
+    table = models.BorrowRollup.__table__
+    max_id = db.query(func.max(models.Borrow.id)).scalar() or 0
+    for start in range(0, max_id, batch_size):
+        in_batch = models.Borrow.id.between(start + 1, start + batch_size)
+        for status, column, condition in _backfill_sources():
+            for granularity in GRANULARITIES:
+                period = period_expression(dialect, granularity, column)
+                source = select(literal(granularity), literal(status), period, func.count())\
+                    .where(in_batch, condition, column.isnot(None))\
+                    .group_by(period)
+                stmt = dialect_insert(db.get_bind(), table).from_select(
+                    ["granularity", "status", "period_start", "count"], source
+                )
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["granularity", "status", "period_start"],
+                    set_={"count": table.c.count + stmt.excluded["count"]},
+                )
+                db.execute(stmt)
+        if progress:
+            progress(min(start + batch_size, max_id))
+    return max_id
+
+def ensure_rollups(engine: Engine):
+    """Dipanggil saat startup: backfill jika rollup masih kosong padahal sudah ada peminjaman."""
+    with Session(bind=engine) as db:
+        if db.query(models.BorrowRollup.granularity).first() is not None:
+            return
+        if db.query(models.Borrow.id).filter(models.Borrow.borrow_date.isnot(None)).first() is None:
+            return
+        backfill(db)
+        db.commit()
+
+def query_rollup(
+    db: Session,
+    granularity: str,
+    status: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> List[dict]:
+    """Mengambil jumlah peminjaman per periode dalam rentang [start, end]."""
+    query = db.query(models.BorrowRollup.period_start, models.BorrowRollup.count).filter(
+        models.BorrowRollup.granularity == granularity,
+        models.BorrowRollup.status == status,
+        models.BorrowRollup.count > 0
+    )
+    if start:
+        query = query.filter(models.BorrowRollup.period_start >= period_start(granularity, start))
+    if end:
+        query = query.filter(models.BorrowRollup.period_start <= end)
+    return [
+        {"period": period_label(granularity, row.period_start), "count": row.count}
+        for row in query.order_by(models.BorrowRollup.period_start)
+    ]
@@ -1,36 +1,58 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Form
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from app import crud, schemas, dependencies
-from app.core import security
+from app.core import security, serialization
 
 router = APIRouter(prefix="/api/v1/auth", tags=["Authentication"])
 
+def password_pool_busy_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server sedang sibuk, silakan coba beberapa saat lagi.",
+        headers={"Retry-After": "1"},
+    )
+
+# bcrypt pada login dan register berjalan di pool khusus (security)
 @router.post("/token", response_model=schemas.Token)
-def login_for_access_token(db: Session = Depends(dependencies.get_db), email: str = Form(...), password: str = Form(...) ):
-    user = crud.get_user_by_email(db, email=email)
-    if not user or not security.verify_password(password, user.hashed_password):
+async def login_for_access_token(db: AsyncSession = Depends(dependencies.get_db), email: str = Form(...), password: str = Form(...) ):
+    user = await db.run_sync(crud.get_user_by_email, email=email)
+    valid, new_hash = False, None
+    if user:
+        try:
+            valid, new_hash = await security.verify_password_async(password, user.hashed_password)
+        except security.PasswordHasherBusy:
+            raise password_pool_busy_exception()
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = security.create_access_token(data={"sub": user.email})
+    if new_hash:
+        # Work factor berubah: simpan hash baru tanpa perlu migrasi
+        await db.run_sync(crud.update_user_password_hash, user, new_hash)
+    access_token = security.create_access_token(data={"sub": user.email, "uid": user.id})
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/register", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
-def register_user(user: schemas.UserCreate, db: Session = Depends(dependencies.get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(dependencies.get_db)):
+    db_user = await db.run_sync(crud.get_user_by_email, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     if user.nim:
-        db_nim = crud.get_user_by_nim(db, nim=user.nim)
+        db_nim = await db.run_sync(crud.get_user_by_nim, nim=user.nim)
         if db_nim:
             raise HTTPException(status_code=400, detail="NIM sudah digunakan oleh user lain")
     
     try:
-        return crud.create_user(db=db, user=user)
+        hashed_password = await security.get_password_hash_async(user.password)
+    except security.PasswordHasherBusy:
+        raise password_pool_busy_exception()
+
+    try:
+        return await db.run_sync(crud.create_user, user=user, hashed_password=hashed_password)
     except Exception as e:
         if "UNIQUE constraint failed: users.nim" in str(e):
             raise HTTPException(status_code=400, detail="NIM sudah digunakan oleh user lain")
@@ -40,32 +62,33 @@ def register_user(user: schemas.UserCreate, db: Session = Depends(dependencies.g
             raise HTTPException(status_code=500, detail=f"Error creating user: {str(e)}")
 
 @router.get("/users/me", response_model=schemas.User)
-def read_users_me(current_user: schemas.User = Depends(dependencies.get_current_user)):
+async def read_users_me(current_user: schemas.User = Depends(dependencies.get_current_user)):
     return current_user
 
 # Admin only endpoints
 @router.get("/users", response_model=List[schemas.User])
-def get_all_users(
+async def get_all_users(
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(dependencies.get_db),
+    db: AsyncSession = Depends(dependencies.get_db),
     current_user: schemas.User = Depends(dependencies.get_current_admin_user)
 ):
-    return crud.get_users(db, skip=skip, limit=limit)
+    users = await db.run_sync(crud.get_users, skip=skip, limit=limit)
+    return serialization.model_response(List[schemas.User], users)
 
 @router.put("/users/{user_id}", response_model=schemas.User)
-def update_user(
+async def update_user(
     user_id: int,
     user_update: schemas.UserUpdate,
-    db: Session = Depends(dependencies.get_db),
+    db: AsyncSession = Depends(dependencies.get_db),
     current_user: schemas.User = Depends(dependencies.get_current_admin_user)
 ):
-    db_user = crud.get_user_by_id(db, user_id=user_id)
+    db_user = await db.run_sync(crud.get_user_by_id, user_id=user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
     try:
-        return crud.update_user(db=db, db_user=db_user, user_in=user_update)
+        return await db.run_sync(crud.update_user, db_user=db_user, user_in=user_update)
     except ValueError as e:
         if "minimal 1 admin" in str(e):
             raise HTTPException(status_code=400, detail=str(e))
@@ -79,17 +102,17 @@ def update_user(
             raise HTTPException(status_code=500, detail=f"Error updating user: {str(e)}")
 
 @router.delete("/users/{user_id}")
-def delete_user(
+async def delete_user(
     user_id: int,
-    db: Session = Depends(dependencies.get_db),
+    db: AsyncSession = Depends(dependencies.get_db),
     current_user: schemas.User = Depends(dependencies.get_current_admin_user)
 ):
-    db_user = crud.get_user_by_id(db, user_id=user_id)
+    db_user = await db.run_sync(crud.get_user_by_id, user_id=user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
     try:
-        crud.delete_user(db=db, user_id=user_id)
+        await db.run_sync(crud.delete_user, user_id=user_id)
         return {"message": "User deleted successfully"}
     except ValueError as e:
         if "minimal 1 admin" in str(e):
@@ -97,21 +120,21 @@ def delete_user(
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get('/users/check-email/{email}')
-def check_email_exists(
+async def check_email_exists(
     email: str,
-    db: Session = Depends(dependencies.get_db)
+    db: AsyncSession = Depends(dependencies.get_db)
 ):
-    user = crud.get_user_by_email(db, email=email)
+    user = await db.run_sync(crud.get_user_by_email, email=email)
     if user:
         return {"exists": True}
     return {"exists": False}
 
 @router.get('/users/check-nim/{nim}')
-def check_nim_exists(
+async def check_nim_exists(
     nim: str,
-    db: Session = Depends(dependencies.get_db)
+    db: AsyncSession = Depends(dependencies.get_db)
 ):
-    user = crud.get_user_by_nim(db, nim=nim)
+    user = await db.run_sync(crud.get_user_by_nim, nim=nim)
     if user:
         return {"exists": True}
     return {"exists": False}
\ No newline at end of file
@@ -1,39 +1,242 @@
-from fastapi import APIRouter, Depends, Form, File, UploadFile, HTTPException
-from typing import List, Optional
-import base64
+from fastapi import APIRouter, Depends, Form, File, UploadFile, HTTPException, Request, Response, Query
+from fastapi.responses import ORJSONResponse
+from typing import List, Literal, Optional
+from datetime import datetime
+import hashlib
 import json
-from sqlalchemy.orm import Session
-from app import crud, schemas, dependencies, models
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import crud, schemas, dependencies, models, search, leaderboard, counters
+from app.core import images, pagination, serialization, streaming
+from app.core.http_cache import quote_etag, etag_matches, parse_range, not_modified_response
 
 router_books = APIRouter(prefix="/api/v1/books", tags=["Books"])
 
+# Cover dengan parameter versi (?v=) tidak pernah berubah isinya, jadi boleh di-cache selamanya.
+# Tanpa versi, browser wajib revalidasi memakai ETag.
+COVER_CACHE_IMMUTABLE = "public, max-age=31536000, immutable"
+COVER_CACHE_REVALIDATE = "public, no-cache"
+COVER_VERSION_LENGTH = 16
+
+# Jumlah baris yang disimpan per transaksi saat import massal
+BULK_IMPORT_BATCH_SIZE = 500
+
+def attach_cover_url(request: Request, book: models.Book, size: images.ImageSize = "full") -> models.Book:
+    """Mengganti field image dengan URL endpoint cover jika buku punya gambar upload."""
+    if book.image_etag:
+        cover_url = request.url_for("read_book_cover", book_id=book.id)
+        params = {"v": book.image_etag[:COVER_VERSION_LENGTH]}
+        if size != "full":
+            params["size"] = size
+        book.image = str(cover_url.include_query_params(**params))
+    return book
+
+async def catalog_etag(db: AsyncSession, *parts) -> str:
+    """ETag untuk data katalog: versi katalog ditambah parameter yang memengaruhi isi response."""
+    return catalog_etag_for(await db.run_sync(counters.read_catalog_version), *parts)
+
+def catalog_etag_for(version: int, *parts) -> str:
+    """Seperti catalog_etag, untuk endpoint yang juga memakai versi yang sama untuk membangun body."""
+    value = f"catalog-{version}"
+    if parts:
+        # Parameter di-hash agar kata kunci/cursor bebas karakter apa pun dan panjang ETag tetap
+        digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+        value += "-" + digest[:16]
+    return quote_etag(value)
+
+async def read_image_upload(image: Optional[UploadFile]):
+    """Membaca file gambar upload lalu memprosesnya menjadi varian-varian WebP."""
+    if not image:
+        return None
+    data = await image.read(images.MAX_UPLOAD_BYTES + 1)
+    if not data:
+        return None
+    if len(data) > images.MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Image must not exceed {images.MAX_UPLOAD_BYTES} bytes")
+    try:
+        return await images.process_upload(data)
+    except images.InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # Endpoint GET (publik)
-@router_books.get("/", response_model=List[schemas.Book])
-def read_books(skip: int = 0, limit: Optional[int] = None, db: Session = Depends(dependencies.get_db)):
-    books = crud.get_books(db, skip=skip, limit=limit)
+@router_books.get("/", response_model=schemas.BookPage)
+async def read_books(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1),
+    sort: Literal["newest", "rating"] = "newest",
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    image_size: images.ImageSize = "thumb",
+    db: AsyncSession = Depends(dependencies.get_db)
+):
+    """
+    Daftar buku per halaman (terbaru dulu, atau rating tertinggi dulu dengan sort=rating),
+    bisa difilter rating minimum. Kirim next_cursor dari response sebelumnya sebagai
+    parameter cursor untuk halaman berikutnya.
+    """
+    limit = pagination.clamp_page_size(limit)
+    # Setiap kombinasi halaman/urutan/filter punya isi berbeda, jadi ikut menentukan ETag
+    etag = await catalog_etag(db, "books", cursor or "", limit, sort, min_rating, image_size)
+    not_modified = not_modified_response(request, response, etag)
+    if not_modified:
+        return not_modified
+    before_id = before_rating = None
+    if cursor:
+        try:
+            position = pagination.decode_cursor(cursor)
+            before_id = int(position["id"])
+            if sort == "rating":
+                before_rating = float(position["rating"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Ambil satu baris ekstra untuk mengetahui apakah masih ada halaman berikutnya
+    books = await db.run_sync(
+        crud.get_books,
+        before_id=before_id,
+        limit=limit + 1,
+        sort=sort,
+        min_rating=min_rating,
+        before_rating=before_rating,
+    )
+    next_cursor = None
+    if len(books) > limit:
+        books = books[:limit]
+        position = {"id": books[-1].id}
+        if sort == "rating":
+            position["rating"] = books[-1].rating_avg
+        next_cursor = pagination.encode_cursor(position)
+    for book in books:
+        attach_cover_url(request, book, image_size)
+    return serialization.model_response(
+        schemas.BookPage, {"items": books, "next_cursor": next_cursor}, headers=response.headers
+    )
+
+@router_books.get("/search", response_model=schemas.BookPage)
+async def search_books(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: Optional[str] = None,
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1),
+    image_size: images.ImageSize = "thumb",
+    db: AsyncSession = Depends(dependencies.get_db)
+):
+    """
+    Pencarian full-text pada judul, penulis, kategori, dan deskripsi buku.
+    Hasil diurutkan berdasarkan relevansi.
+    """
+    limit = pagination.clamp_page_size(limit)
+    etag = await catalog_etag(db, "search", q, cursor or "", limit, image_size)
+    not_modified = not_modified_response(request, response, etag)
+    if not_modified:
+        return not_modified
+    offset = 0
+    if cursor:
+        try:
+            offset = int(pagination.decode_cursor(cursor)["offset"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    hits = await db.run_sync(search.search_book_ids, q, offset=offset, limit=limit + 1)
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_cursor = pagination.encode_cursor({"offset": offset + limit})
+
+    books = await db.run_sync(crud.get_books_by_ids, [book_id for book_id, _ in hits])
+    for book in books:
+        attach_cover_url(request, book, image_size)
+    return serialization.model_response(
+        schemas.BookPage, {"items": books, "next_cursor": next_cursor}, headers=response.headers
+    )
+
+@router_books.get("/popular", response_model=List[schemas.PopularBook])
+async def read_popular_books(
+    request: Request,
+    response: Response,
+    period: Literal["month", "all"] = "month",
+    limit: int = Query(10, ge=1, le=50),
+    image_size: images.ImageSize = "thumb",
+    db: AsyncSession = Depends(dependencies.get_db)
+):
+    """Buku yang paling sering dipinjam bulan ini (period=month) atau sepanjang waktu (period=all)."""
+    key = leaderboard.month_period(datetime.now()) if period == "month" else leaderboard.ALL_TIME
+    # Leaderboard hanya berubah bersama versi katalog; ETag dan ranking memakai versi yang sama
+    version = await db.run_sync(counters.read_catalog_version)
+    etag = catalog_etag_for(version, "popular", key, limit, image_size)
+    not_modified = not_modified_response(request, response, etag)
+    if not_modified:
+        return not_modified
+    ranking = await db.run_sync(leaderboard.top_books, key, limit, version)
+    books = await db.run_sync(crud.get_books_by_ids, [book_id for book_id, _, _ in ranking])
+    counts = {book_id: count for book_id, _, count in ranking}
     for book in books:
-        # Jika ada image_blob, konversi BLOB-nya ke base64
-        if book.image_blob:
-            encoded = base64.b64encode(book.image_blob).decode("utf-8")
-            book.image = f"data:image/jpeg;base64,{encoded}"
-    return books
+        attach_cover_url(request, book, image_size)
+        book.borrow_count = counts[book.id]
+    return serialization.model_response(List[schemas.PopularBook], books, headers=response.headers)
 
 @router_books.get("/{book_id}", response_model=schemas.Book)
-def read_book(book_id: int, db: Session = Depends(dependencies.get_db)):
-    db_book = crud.get_book(db, book_id=book_id)
-    # Jika ada image_blob, konversi BLOB-nya ke base64
-    if db_book and db_book.image_blob:
-        encoded = base64.b64encode(db_book.image_blob).decode("utf-8")
-        db_book.image = f"data:image/jpeg;base64,{encoded}"
+async def read_book(book_id: int, request: Request, response: Response, image_size: images.ImageSize = "full", db: AsyncSession = Depends(dependencies.get_db)):
+    version = await db.run_sync(crud.get_book_version, book_id=book_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Book not found")
+    etag = quote_etag(f"book-{book_id}-{version.version}")
+    not_modified = not_modified_response(request, response, etag, version.updated_at)
+    if not_modified:
+        return not_modified
+
+    db_book = await db.run_sync(crud.get_book, book_id=book_id)
     if db_book is None:
         raise HTTPException(status_code=404, detail="Book not found")
-    return db_book
+    return attach_cover_url(request, db_book, image_size)
+
+@router_books.get("/{book_id}/cover", name="read_book_cover")
+async def read_book_cover(book_id: int, request: Request, size: images.ImageSize = "full", db: AsyncSession = Depends(dependencies.get_db)):
+    """
+    Mengirim gambar cover buku sebagai byte mentah dalam ukuran thumb, medium, atau full.
+    Mendukung ETag/If-None-Match (304) dan header Range (206).
+    """
+    cover = await db.run_sync(crud.get_book_cover_meta, book_id=book_id, size=size)
+    if not cover or not cover.etag:
+        raise HTTPException(status_code=404, detail="Cover not found")
+
+    etag = quote_etag(cover.etag)
+    versioned = request.query_params.get("v") == cover.version[:COVER_VERSION_LENGTH]
+    headers = {
+        "ETag": etag,
+        "Cache-Control": COVER_CACHE_IMMUTABLE if versioned else COVER_CACHE_REVALIDATE,
+        "Accept-Ranges": "bytes",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    data = await db.run_sync(crud.get_book_cover_blob, book_id=book_id, variant=cover.variant)
+    media_type = cover.content_type or "application/octet-stream"
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range == etag):
+        try:
+            byte_range = parse_range(range_header, len(data))
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{len(data)}"
+            return Response(status_code=416, headers=headers)
+        if byte_range:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+            return Response(content=data[start:end + 1], status_code=206, media_type=media_type, headers=headers)
+
+    return Response(content=data, media_type=media_type, headers=headers)
 
 # Endpoint untuk menambah buku - HANYA ADMIN
 @router_books.post("/", response_model=schemas.Book, status_code=201)
 async def create_book(
-    db: Session = Depends(dependencies.get_db),
-    current_user: models.User = Depends(dependencies.require_admin_role),
+    request: Request,
+    db: AsyncSession = Depends(dependencies.get_db),
+    current_user: schemas.User = Depends(dependencies.require_admin_role),
     # Data buku dikirim sebagai Form, bukan JSON
     title: str = Form(...),
     description: Optional[str] = Form(None),
@@ -49,7 +252,7 @@ async def create_book(
     Membuat buku baru dengan upload gambar (opsional).
     Data dikirim sebagai multipart/form-data.
     """
-    image_bytes = await image.read() if image else None
+    image_variants = await read_image_upload(image)
     # Parse authors & categories JSON string
     authors_list = json.loads(authors) if authors else []
     categories_list = json.loads(categories) if categories else []
@@ -64,14 +267,93 @@ async def create_book(
         categories=categories_list
     )
     
-    return crud.create_book(db=db, book=book_in, image_blob=image_bytes)
+    db_book = await db.run_sync(crud.create_book, book=book_in, image_variants=image_variants)
+    return attach_cover_url(request, db_book)
+
+def bulk_book_row(record) -> schemas.BookCreate:
+    """Mengubah satu record CSV/NDJSON menjadi BookCreate. Penulis/kategori di CSV dipisah ';'."""
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError("Row must be an object")
+    data = {key: (value if value != "" else None) for key, value in record.items()}
+    for key in ("authors", "categories"):
+        names = data.get(key) or []
+        if isinstance(names, str):
+            names = names.split(";")
+        if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            raise ValueError(f"{key} must be a list of names")
+        data[key] = [name.strip() for name in names if name.strip()]
+    data.setdefault("description", None)
+    data.setdefault("publisher", None)
+    return schemas.BookCreate(**data)
+
+def bulk_row_error(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors()
+        )
+    return str(error)
+
+# Import banyak buku sekaligus - HANYA ADMIN
+@router_books.post("/bulk", response_model=schemas.BulkImportReport)
+async def bulk_import_books(
+    request: Request,
+    import_format: Optional[Literal["csv", "ndjson"]] = Query(None, alias="format"),
+    db: AsyncSession = Depends(dependencies.get_db),
+    current_user: schemas.User = Depends(dependencies.require_admin_role)
+):
+    """
+    Import buku dari body CSV (header: title,description,amount,publisher,published_date,authors,categories)
+    atau NDJSON (UTF-8). Body dibaca bertahap dan disimpan per batch; baris yang gagal dilaporkan per nomor baris.
+    Body yang bukan UTF-8 dijawab 400 dengan lokasi byte yang rusak dan laporan batch yang sudah tersimpan.
+    """
+    if import_format is None:
+        import_format = "ndjson" if "ndjson" in request.headers.get("content-type", "") else "csv"
+    records = streaming.iter_ndjson(request.stream()) if import_format == "ndjson" else streaming.iter_csv(request.stream())
+
+    book_ids, errors = [], []
+    batch = []
+
+    async def save_batch():
+        try:
+            book_ids.extend(await db.run_sync(crud.bulk_create_books, [book for _, book in batch]))
+        except SQLAlchemyError as e:
+            await db.rollback()
+            errors.extend({"row": row, "error": f"Database error: {e.__class__.__name__}"} for row, _ in batch)
+        except (ValidationError, ValueError) as e:
+            # Misal nama penulis/kategori yang tidak bisa di-resolve; batch lain tetap diproses
+            await db.rollback()
+            errors.extend({"row": row, "error": bulk_row_error(e)} for row, _ in batch)
+        batch.clear()
+
+    encoding_error = None
+    try:
+        async for row, record in records:
+            try:
+                batch.append((row, bulk_book_row(record)))
+            except (ValidationError, ValueError) as e:
+                errors.append({"row": row, "error": bulk_row_error(e)})
+            if len(batch) >= BULK_IMPORT_BATCH_SIZE:
+                await save_batch()
+    except streaming.InvalidEncodingError as e:
+        # Sisa body tidak bisa dibaca; baris sebelum byte yang rusak tetap disimpan dan dilaporkan
+        encoding_error = e
+    if batch:
+        await save_batch()
+
+    report = {"created": len(book_ids), "failed": len(errors), "book_ids": book_ids, "errors": errors}
+    if encoding_error is not None:
+        return ORJSONResponse(status_code=400, content={"detail": str(encoding_error), **report})
+    return report
 
 # Endpoint untuk mengedit buku - HANYA ADMIN
 @router_books.put("/{book_id}", response_model=schemas.Book)
 async def update_book(
     book_id: int,
-    db: Session = Depends(dependencies.get_db),
-    current_user: models.User = Depends(dependencies.require_admin_role),
+    request: Request,
+    db: AsyncSession = Depends(dependencies.get_db),
+    current_user: schemas.User = Depends(dependencies.require_admin_role),
     # Data juga dikirim sebagai Form
     title: Optional[str] = Form(None),
     description: Optional[str] = Form(None),
@@ -82,11 +364,11 @@ async def update_book(
     categories: Optional[str] = Form('[]'),
     image: Optional[UploadFile] = File(None)
 ):
-    db_book = crud.get_book(db, book_id=book_id)
+    db_book = await db.run_sync(crud.get_book, book_id=book_id)
     if not db_book:
         raise HTTPException(status_code=404, detail="Book not found")
     
-    image_bytes = await image.read() if image else None
+    image_variants = await read_image_upload(image)
     authors_list = json.loads(authors) if authors else []
     categories_list = json.loads(categories) if categories else []
     book_in = schemas.BookUpdate(
@@ -98,17 +380,18 @@ async def update_book(
         authors=authors_list,
         categories=categories_list
     )
-    return crud.update_book(db, db_book=db_book, book_in=book_in, image_blob=image_bytes)
+    db_book = await db.run_sync(crud.update_book, db_book=db_book, book_in=book_in, image_variants=image_variants)
+    return attach_cover_url(request, db_book)
 
 # Endpoint untuk menghapus buku - HANYA ADMIN
 @router_books.delete("/{book_id}", status_code=204)
-async def delete_book(book_id: int, db: Session = Depends(dependencies.get_db), current_user: models.User = Depends(dependencies.require_admin_role)):
+async def delete_book(book_id: int, db: AsyncSession = Depends(dependencies.get_db), current_user: schemas.User = Depends(dependencies.require_admin_role)):
     """
     Menghapus buku berdasarkan ID (soft delete).
     Buku tidak dapat dihapus jika masih ada peminjaman aktif atau pending.
     """
     try:
-        db_book = crud.delete_book(db, book_id=book_id)
+        db_book = await db.run_sync(crud.delete_book, book_id=book_id)
         if db_book is None:
             raise HTTPException(status_code=404, detail="Book not found")
         return # Response 204 No Content akan otomatis dikirim
@@ -1,17 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
-from sqlalchemy.orm import Session
-from app import crud, schemas, models, dependencies
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
+from datetime import date, datetime, time, timedelta
+import csv
+import io
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal
+from app import crud, schemas, dependencies, counters
+from app.core import pagination, serialization
 
 router_borrows = APIRouter(prefix="/api/v1/borrows", tags=["Borrows"])
 
+def borrow_date_range(from_date: Optional[date], to_date: Optional[date]):
+    """Mengubah rentang tanggal inklusif dari query menjadi [date_from, date_to) datetime."""
+    date_from = datetime.combine(from_date, time.min) if from_date else None
+    date_to = datetime.combine(to_date + timedelta(days=1), time.min) if to_date else None
+    return date_from, date_to
+
+# Status yang benar-benar dipakai alur peminjaman (lihat app/borrow_state.py). "disetujui" masih ada
+# di enum database untuk data lama tetapi tidak pernah ditulis, jadi filternya ditolak (422).
+BorrowStatus = Literal["menunggu", "dipinjam", "dikembalikan", "ditolak"]
+BORROW_PAGE_SIZE = 50
+EXPORT_BATCH_SIZE = 1000
+EXPORT_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
 @router_borrows.post("/", response_model=schemas.Borrow, status_code=status.HTTP_201_CREATED)
-def borrow_book(borrow: schemas.BorrowCreate, db: Session = Depends(dependencies.get_db), current_user: models.User = Depends(dependencies.get_current_user)):
+async def borrow_book(borrow: schemas.BorrowCreate, db: AsyncSession = Depends(dependencies.get_db), current_user: schemas.User = Depends(dependencies.get_current_user)):
     # Check if user is active
     if not current_user.is_active:
         raise HTTPException(status_code=403, detail="Akun Anda tidak aktif. Silakan hubungi administrator untuk mengaktifkan akun Anda.")
     
-    result = crud.create_borrow(db=db, book_id=borrow.book_id, user_id=current_user.id)
+    result = await db.run_sync(crud.create_borrow, book_id=borrow.book_id, user_id=current_user.id)
     if isinstance(result, dict) and "error" in result:
         if result["error"] == "user_has_active_borrow":
             raise HTTPException(status_code=400, detail="Anda masih memiliki peminjaman aktif atau yang sedang menunggu persetujuan. Selesaikan peminjaman tersebut terlebih dahulu.")
@@ -22,37 +42,164 @@ def borrow_book(borrow: schemas.BorrowCreate, db: Session = Depends(dependencies
     return result
 
 @router_borrows.put("/{borrow_id}/return", response_model=schemas.Borrow)
-def return_borrowed_book(borrow_id: int, db: Session = Depends(dependencies.get_db), current_user: models.User = Depends(dependencies.get_current_user)):
-    returned_borrow = crud.return_book(db, borrow_id=borrow_id, user_id=current_user.id)
+async def return_borrowed_book(borrow_id: int, db: AsyncSession = Depends(dependencies.get_db), current_user: schemas.User = Depends(dependencies.get_current_user)):
+    returned_borrow = await db.run_sync(crud.return_book, borrow_id=borrow_id, user_id=current_user.id)
     if not returned_borrow:
         raise HTTPException(status_code=404, detail="Active borrow record not found or you don't have permission to return it.")
     return returned_borrow
 
 @router_borrows.get("/me", response_model=List[schemas.Borrow])
-def read_my_borrows(db: Session = Depends(dependencies.get_db), current_user: models.User = Depends(dependencies.get_current_user)):
-    return crud.get_user_borrows(db, user_id=current_user.id)
+async def read_my_borrows(db: AsyncSession = Depends(dependencies.get_db), current_user: schemas.User = Depends(dependencies.get_current_user)):
+    borrows = await db.run_sync(crud.get_user_borrows, user_id=current_user.id)
+    return serialization.model_response(List[schemas.Borrow], borrows)
+
+@router_borrows.get("/all", response_model=schemas.BorrowPage)
+async def read_all_borrows(
+    borrow_status: Optional[BorrowStatus] = Query(None, alias="status"),
+    user_id: Optional[int] = None,
+    book_id: Optional[int] = None,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    cursor: Optional[str] = None,
+    limit: int = Query(BORROW_PAGE_SIZE, ge=1),
+    db: AsyncSession = Depends(dependencies.get_db),
+    current_user: schemas.User = Depends(dependencies.require_admin_role)
+):
+    """
+    Antrean peminjaman untuk admin (terbaru dulu), bisa difilter per status, user, buku,
+    dan rentang tanggal pengajuan (inklusif). Header X-Borrow-Counts berisi jumlah per status.
+    """
+    limit = pagination.clamp_page_size(limit)
+    before_id = None
+    if cursor:
+        try:
+            before_id = int(pagination.decode_cursor(cursor)["id"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    date_from, date_to = borrow_date_range(from_date, to_date)
+    borrows = await db.run_sync(
+        crud.get_all_borrows,
+        status=borrow_status,
+        user_id=user_id,
+        book_id=book_id,
+        date_from=date_from,
+        date_to=date_to,
+        before_id=before_id,
+        limit=limit + 1,
+    )
+    next_cursor = None
+    if len(borrows) > limit:
+        borrows = borrows[:limit]
+        next_cursor = pagination.encode_cursor({"id": borrows[-1].id})
+
+    # Dibaca dari stat_counters, bukan COUNT(*) per status
+    values = await db.run_sync(counters.read_counters)
+    borrow_counts = ", ".join(
+        f"{name}={values[counters.borrow_status_counter(name)]}" for name in counters.BORROW_STATUSES
+    )
+    return serialization.model_response(
+        schemas.BorrowPage,
+        {"items": borrows, "next_cursor": next_cursor},
+        headers={"X-Borrow-Counts": borrow_counts},
+    )
+
+@router_borrows.get("/export")
+async def export_borrows(
+    export_format: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+    borrow_status: Optional[BorrowStatus] = Query(None, alias="status"),
+    user_id: Optional[int] = None,
+    book_id: Optional[int] = None,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    current_user: schemas.User = Depends(dependencies.require_admin_role)
+):
+    """
+    Ekspor riwayat peminjaman sebagai CSV atau NDJSON. Baris dibaca per batch dari
+    server-side cursor dan langsung dikirim, jadi memori tetap kecil berapa pun jumlah barisnya.
+    """
+    date_from, date_to = borrow_date_range(from_date, to_date)
+    statement = crud.borrow_export_statement(
+        status=borrow_status, user_id=user_id, book_id=book_id, date_from=date_from, date_to=date_to
+    ).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    columns = [column.name for column in crud.BORROW_EXPORT_COLUMNS]
+
+    async def generate_rows():
+        # Session dibuka di dalam generator karena dependency get_db sudah ditutup
+        # sebelum StreamingResponse mulai mengirim body
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(statement)
+            if export_format == "csv":
+                yield _csv_lines([columns])
+            async for rows in result.partitions():
+                if export_format == "csv":
+                    yield _csv_lines(rows)
+                else:
+                    yield b"".join(orjson.dumps(dict(row._mapping)) + b"\n" for row in rows)
+
+    filename = f"peminjaman-{datetime.now():%Y%m%d-%H%M%S}.{export_format}"
+    return StreamingResponse(
+        generate_rows(),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+def _csv_lines(rows) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+@router_borrows.post("/bulk-decision", response_model=schemas.BorrowBulkDecisionReport)
+async def bulk_decide_borrows(
+    payload: schemas.BorrowBulkDecision,
+    db: AsyncSession = Depends(dependencies.get_db),
+    current_user: schemas.User = Depends(dependencies.require_admin_role)
+):
+    """
+    Menyetujui/menolak banyak peminjaman "menunggu" dalam satu transaksi.
+    Jika stok buku tidak cukup, permintaan yang lebih dulu diajukan yang disetujui.
+    Hasil per item: approved, declined, out_of_stock, not_pending, atau duplicate.
+    """
+    decisions = {}
+    for decision in payload.decisions:
+        decisions.setdefault(decision.borrow_id, decision.action)
+    outcomes = await db.run_sync(crud.decide_borrows, decisions=decisions)
 
-@router_borrows.get("/all", response_model=List[schemas.Borrow])
-def read_all_borrows(db: Session = Depends(dependencies.get_db), current_user: models.User = Depends(dependencies.require_admin_role)):
-    return crud.get_all_borrows(db)
+    items = []
+    seen = set()
+    for decision in payload.decisions:
+        if decision.borrow_id in seen:
+            outcome = "duplicate"
+        else:
+            outcome = outcomes.get(decision.borrow_id, "not_pending")
+        seen.add(decision.borrow_id)
+        items.append({"borrow_id": decision.borrow_id, "action": decision.action, "outcome": outcome})
+    totals = {name: 0 for name in ("approved", "declined", "out_of_stock")}
+    for outcome in outcomes.values():
+        totals[outcome] += 1
+    return {**totals, "skipped": len(items) - len(outcomes), "items": items}
 
 @router_borrows.put("/{borrow_id}/approve", response_model=schemas.Borrow)
-def approve_borrow_request(borrow_id: int, db: Session = Depends(dependencies.get_db), current_user: models.User = Depends(dependencies.require_admin_role)):
-    approved = crud.approve_borrow(db, borrow_id=borrow_id)
+async def approve_borrow_request(borrow_id: int, db: AsyncSession = Depends(dependencies.get_db), current_user: schemas.User = Depends(dependencies.require_admin_role)):
+    approved = await db.run_sync(crud.approve_borrow, borrow_id=borrow_id)
     if not approved:
         raise HTTPException(status_code=404, detail="Borrow request not found or already processed.")
     return approved
 
 @router_borrows.put("/{borrow_id}/decline", response_model=schemas.Borrow)
-def decline_borrow_request(borrow_id: int, db: Session = Depends(dependencies.get_db), current_user: models.User = Depends(dependencies.require_admin_role)):
-    declined = crud.decline_borrow(db, borrow_id=borrow_id)
+async def decline_borrow_request(borrow_id: int, db: AsyncSession = Depends(dependencies.get_db), current_user: schemas.User = Depends(dependencies.require_admin_role)):
+    declined = await db.run_sync(crud.decline_borrow, borrow_id=borrow_id)
     if not declined:
         raise HTTPException(status_code=404, detail="Borrow request not found or already processed.")
     return declined
 
 @router_borrows.put("/{borrow_id}/admin-update", response_model=schemas.Borrow)
-def admin_update_borrow(borrow_id: int, update_data: schemas.BorrowAdminUpdate, db: Session = Depends(dependencies.get_db), current_user: models.User = Depends(dependencies.require_admin_role)):
-    updated_borrow = crud.admin_update_borrow(db, borrow_id=borrow_id, update_data=update_data)
+async def admin_update_borrow(borrow_id: int, update_data: schemas.BorrowAdminUpdate, db: AsyncSession = Depends(dependencies.get_db), current_user: schemas.User = Depends(dependencies.require_admin_role)):
+    try:
+        updated_borrow = await db.run_sync(crud.admin_update_borrow, borrow_id=borrow_id, update_data=update_data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not updated_borrow:
         raise HTTPException(status_code=404, detail="Borrow record not found.")
     return updated_borrow
\ No newline at end of file
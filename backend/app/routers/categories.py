@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app import models, schemas, dependencies
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import crud, schemas, dependencies, counters
+from app.core.http_cache import quote_etag, not_modified_response
 from typing import List
 
 router_categories = APIRouter(prefix="/api/v1/categories", tags=["Categories"])
 
 @router_categories.get("/", response_model=List[schemas.Category])
-def get_categories(db: Session = Depends(dependencies.get_db)):
-    return db.query(models.Category).all()
+async def get_categories(request: Request, response: Response, db: AsyncSession = Depends(dependencies.get_db)):
+    # Kategori hanya bertambah lewat create/update buku, yang selalu menaikkan versi katalog
+    version = await db.run_sync(counters.read_catalog_version)
+    not_modified = not_modified_response(request, response, quote_etag(f"categories-{version}"))
+    if not_modified:
+        return not_modified
+    return await db.run_sync(crud.get_categories)
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Response
+import anyio
+from app.core import security
+from app.core.metrics import registry, CONTENT_TYPE
+from app.database import engine, async_engine
+
+router_metrics = APIRouter(tags=["Metrics"])
+
+def _pool_stats(stat: str):
+    """Nilai statistik QueuePool untuk engine async (router) dan sync (startup/script)."""
+    values = []
+    for name, pool in (("async", async_engine.pool), ("sync", engine.pool)):
+        read = getattr(pool, stat, None)
+        if read is not None:
+            # overflow() bernilai negatif selama koneksi yang dipakai belum melebihi pool_size
+            values.append(({"engine": name}, max(read(), 0)))
+    return values
+
+def _threadpool_stats(attribute: str):
+    """Threadpool anyio yang dipakai FastAPI untuk dependency/endpoint sync dan run_in_threadpool."""
+    try:
+        limiter = anyio.to_thread.current_default_thread_limiter()
+    except RuntimeError:
+        return []
+    return [({}, getattr(limiter, attribute))]
+
+registry.gauge("db_pool_size", "Ukuran connection pool database.", lambda: _pool_stats("size"))
+registry.gauge("db_pool_checked_out", "Koneksi database yang sedang dipakai.", lambda: _pool_stats("checkedout"))
+registry.gauge("db_pool_overflow", "Koneksi database di atas pool_size (overflow).", lambda: _pool_stats("overflow"))
+registry.gauge("threadpool_in_use", "Thread worker yang sedang dipakai.", lambda: _threadpool_stats("borrowed_tokens"))
+registry.gauge("threadpool_size", "Batas thread worker.", lambda: _threadpool_stats("total_tokens"))
+registry.gauge(
+    "password_hash_pending", "Pekerjaan bcrypt (login/registrasi) yang sedang berjalan atau mengantri.",
+    lambda: [({}, security.password_hash_pending())],
+)
+registry.gauge(
+    "password_hash_queue_depth", "Pekerjaan bcrypt yang menunggu worker kosong.",
+    lambda: [({}, max(security.password_hash_pending() - security.PASSWORD_HASH_WORKERS, 0))],
+)
+registry.gauge(
+    "password_hash_max_pending", "Batas antrian bcrypt sebelum request ditolak 503.",
+    lambda: [({}, security.PASSWORD_HASH_MAX_PENDING)],
+)
+
+@router_metrics.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    """Metrik dalam format teks Prometheus dari registry in-process."""
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
@@ -1,77 +1,106 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
-from sqlalchemy.orm import Session
-from app import crud, schemas, models, dependencies
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Optional
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import crud, schemas, dependencies, ratings
+from app.core import pagination, serialization
 
 router_reviews = APIRouter(prefix="/api/v1", tags=["Reviews"])
 
+REVIEW_PAGE_SIZE = 10
+
 @router_reviews.post("/books/{book_id}/reviews", response_model=schemas.Review, status_code=status.HTTP_201_CREATED)
-def create_review_for_book(book_id: int, review: schemas.ReviewCreate, db: Session = Depends(dependencies.get_db), current_user: models.User = Depends(dependencies.get_current_user)):
-    book = crud.get_book(db, book_id=book_id)
+async def create_review_for_book(book_id: int, review: schemas.ReviewCreate, db: AsyncSession = Depends(dependencies.get_db), current_user: schemas.User = Depends(dependencies.get_current_user)):
+    book = await db.run_sync(crud.get_book, book_id=book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     
     # Validasi: User hanya bisa review setelah mengembalikan buku (status "dikembalikan")
-    user_borrow_history = db.query(models.Borrow).filter(
-        models.Borrow.user_id == current_user.id,
-        models.Borrow.book_id == book_id,
-        models.Borrow.status == "dikembalikan"  # Hanya status dikembalikan yang bisa review
-    ).first()
+    has_returned = await db.run_sync(crud.has_returned_book, user_id=current_user.id, book_id=book_id)
     
-    if not user_borrow_history:
+    if not has_returned:
         raise HTTPException(
             status_code=400, 
             detail="You can only review books that you have returned"
         )
     
-    db_review = crud.create_review(db=db, review=review, user_id=current_user.id, book_id=book_id)
+    db_review = await db.run_sync(crud.create_review, review=review, user_id=current_user.id, book_id=book_id)
     if db_review is None:
         raise HTTPException(status_code=400, detail="You have already reviewed this book")
     return db_review
 
-@router_reviews.get("/books/{book_id}/reviews", response_model=List[schemas.Review])
-def get_reviews_for_book(book_id: int, db: Session = Depends(dependencies.get_db)):
-    return crud.get_reviews_for_book(db, book_id=book_id)
+@router_reviews.get("/books/{book_id}/reviews", response_model=schemas.ReviewPage)
+async def get_reviews_for_book(
+    book_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(REVIEW_PAGE_SIZE, ge=1),
+    db: AsyncSession = Depends(dependencies.get_db)
+):
+    """
+    Review buku per halaman (terbaru dulu) dengan cursor, ditambah total, rata-rata,
+    dan histogram skor yang dibaca dari agregat rating buku.
+    """
+    limit = pagination.clamp_page_size(limit)
+    summary = await db.run_sync(ratings.summary, book_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Book not found")
+    before = None
+    if cursor:
+        try:
+            position = pagination.decode_cursor(cursor)
+            before = (datetime.fromisoformat(position["created_at"]), int(position["id"]))
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    reviews = await db.run_sync(crud.get_reviews_for_book, book_id=book_id, before=before, limit=limit + 1)
+    next_cursor = None
+    if len(reviews) > limit:
+        reviews = reviews[:limit]
+        next_cursor = pagination.encode_cursor(
+            {"created_at": reviews[-1].created_at.isoformat(), "id": reviews[-1].id}
+        )
+    average, total, histogram = summary
+    return serialization.model_response(schemas.ReviewPage, {
+        "items": reviews,
+        "next_cursor": next_cursor,
+        "total": total,
+        "average": average,
+        "histogram": histogram,
+    })
+
+@router_reviews.get("/books/{book_id}/reviews/me", response_model=Optional[schemas.Review])
+async def get_my_review_for_book(book_id: int, db: AsyncSession = Depends(dependencies.get_db), current_user: schemas.User = Depends(dependencies.get_current_user)):
+    """Review user yang login untuk buku ini (null jika belum ada), terlepas dari halaman review."""
+    return await db.run_sync(crud.get_user_review_for_book, user_id=current_user.id, book_id=book_id)
 
 @router_reviews.put("/reviews/{review_id}", response_model=schemas.Review)
-def update_review(
+async def update_review(
     review_id: int, 
     review: schemas.ReviewCreate, 
-    db: Session = Depends(dependencies.get_db), 
-    current_user: models.User = Depends(dependencies.get_current_user)
+    db: AsyncSession = Depends(dependencies.get_db), 
+    current_user: schemas.User = Depends(dependencies.get_current_user)
 ):
     # Cek apakah review exists dan milik user yang login
-    db_review = db.query(models.Review).filter(
-        models.Review.id == review_id,
-        models.Review.user_id == current_user.id
-    ).first()
+    db_review = await db.run_sync(crud.get_user_review, review_id=review_id, user_id=current_user.id)
     
     if not db_review:
         raise HTTPException(status_code=404, detail="Review not found or you don't have permission to edit this review")
     
     # Update review
-    db_review.review_score = review.review_score
-    db_review.review_text = review.review_text
-    db.commit()
-    db.refresh(db_review)
-    return db_review
+    return await db.run_sync(crud.update_review, db_review=db_review, review_in=review)
 
 @router_reviews.delete("/reviews/{review_id}")
-def delete_review(
+async def delete_review(
     review_id: int, 
-    db: Session = Depends(dependencies.get_db), 
-    current_user: models.User = Depends(dependencies.get_current_user)
+    db: AsyncSession = Depends(dependencies.get_db), 
+    current_user: schemas.User = Depends(dependencies.get_current_user)
 ):
     # Cek apakah review exists dan milik user yang login
-    db_review = db.query(models.Review).filter(
-        models.Review.id == review_id,
-        models.Review.user_id == current_user.id
-    ).first()
+    db_review = await db.run_sync(crud.get_user_review, review_id=review_id, user_id=current_user.id)
     
     if not db_review:
         raise HTTPException(status_code=404, detail="Review not found or you don't have permission to delete this review")
     
     # Delete review
-    db.delete(db_review)
-    db.commit()
-    return {"message": "Review deleted successfully"}
\ No newline at end of file
+    await db.run_sync(crud.delete_review, db_review=db_review)
+    return {"message": "Review deleted successfully"}
@@ -1,99 +1,71 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from datetime import date
+from typing import Literal, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from .. import models, schemas, dependencies
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import schemas, dependencies, counters, rollups, leaderboard
+from ..core.cache import cache_stats
 
 router = APIRouter(prefix="/api/v1/statistics", tags=["Statistics"])
 
 @router.get("/summary")
-def get_statistics_summary(
-    db: Session = Depends(dependencies.get_db),
+async def get_statistics_summary(
+    db: AsyncSession = Depends(dependencies.get_db),
     current_user: schemas.User = Depends(dependencies.get_current_admin_user)
 ):
     """Get basic statistics summary for admin dashboard"""
-    
-    total_books = db.query(func.count(models.Book.id)).filter(models.Book.is_deleted == False).scalar()
-    
-    total_users = db.query(func.count(models.User.id)).scalar()
-    
-    total_borrows = db.query(func.count(models.Borrow.id)).scalar()
-    
-    pending_borrows = db.query(func.count(models.Borrow.id)).filter(
-        models.Borrow.status == "menunggu"
-    ).scalar()
-    
-    active_borrows = db.query(func.count(models.Borrow.id)).filter(
-        models.Borrow.status == "dipinjam"
-    ).scalar()
-    
-    returned_borrows = db.query(func.count(models.Borrow.id)).filter(
-        models.Borrow.status == "dikembalikan"
-    ).scalar()
-    
-    rejected_borrows = db.query(func.count(models.Borrow.id)).filter(
-        models.Borrow.status == "ditolak"
-    ).scalar()
-    
+    return await db.run_sync(_statistics_summary)
+
+def _statistics_summary(db: Session):
+    # Dibaca dari counter yang dijaga oleh app/crud.py, bukan COUNT(*) per request
+    values = counters.read_counters(db)
     return {
-        "total_books": total_books,
-        "total_users": total_users,
-        "total_borrows": total_borrows,
-        "pending_borrows": pending_borrows,
-        "active_borrows": active_borrows,
-        "returned_borrows": returned_borrows,
-        "rejected_borrows": rejected_borrows
+        "total_books": values["total_books"],
+        "total_users": values["total_users"],
+        "total_borrows": values["total_borrows"],
+        "pending_borrows": values[counters.borrow_status_counter("menunggu")],
+        "active_borrows": values[counters.borrow_status_counter("dipinjam")],
+        "returned_borrows": values[counters.borrow_status_counter("dikembalikan")],
+        "rejected_borrows": values[counters.borrow_status_counter("ditolak")]
     }
 
 @router.get("/borrows-by-month")
-def get_borrows_by_month(
-    db: Session = Depends(dependencies.get_db),
+async def get_borrows_by_month(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    granularity: Literal["day", "week", "month"] = "month",
+    status: Literal["dipinjam", "dikembalikan"] = "dipinjam",
+    db: AsyncSession = Depends(dependencies.get_db),
     current_user: schemas.User = Depends(dependencies.get_current_admin_user)
 ):
-    """Get borrow statistics grouped by month"""
-    
-    result = db.query(
-        func.strftime('%Y-%m', models.Borrow.borrow_date).label('month'),
-        func.count(models.Borrow.id).label('count')
-    ).filter(
-        (models.Borrow.status == "dipinjam") | (models.Borrow.status == "dikembalikan")
-    ).group_by(
-        func.strftime('%Y-%m', models.Borrow.borrow_date)
-    ).order_by('month').all()
-    
-    monthly_data = [{"month": row.month, "count": row.count} for row in result]
-    
-    return {"monthly_borrows": monthly_data}
+    """Get borrow statistics grouped by day, week, or month (answered from borrow_rollups)"""
+    periods = await db.run_sync(rollups.query_rollup, granularity, status, from_date, to_date)
+    result = {"granularity": granularity, "status": status, "periods": periods}
+    if granularity == "month":
+        # Format lama yang dipakai dashboard admin
+        result["monthly_borrows"] = [{"month": row["period"], "count": row["count"]} for row in periods]
+    return result
 
 @router.get("/popular-books")
-def get_popular_books(
-    limit: int = 5,
-    db: Session = Depends(dependencies.get_db),
+async def get_popular_books(
+    limit: int = Query(5, ge=1, le=50),
+    db: AsyncSession = Depends(dependencies.get_db),
     current_user: schemas.User = Depends(dependencies.get_current_admin_user)
 ):
     """Get most borrowed books"""
-    
-    result = db.query(
-        models.Book.id,
-        models.Book.title,
-        func.count(models.Borrow.id).label('borrow_count')
-    ).filter(
-        models.Book.is_deleted == False,
-        (models.Borrow.status == "dipinjam") | (models.Borrow.status == "dikembalikan")
-    ).join(
-        models.Borrow, models.Book.id == models.Borrow.book_id
-    ).group_by(
-        models.Book.id, models.Book.title
-    ).order_by(
-        func.count(models.Borrow.id).desc()
-    ).limit(limit).all()
-    
+    return await db.run_sync(_popular_books, limit)
+
+def _popular_books(db: Session, limit: int):
     popular_books = [
-        {
-            "book_id": row.id,
-            "title": row.title,
-            "borrow_count": row.borrow_count
-        }
-        for row in result
+        {"book_id": book_id, "title": title, "borrow_count": count}
+        for book_id, title, count in leaderboard.top_books(db, leaderboard.ALL_TIME, limit)
     ]
-    
     return {"popular_books": popular_books}
+
+
+@router.get("/caches")
+async def get_cache_statistics(
+    current_user: schemas.User = Depends(dependencies.get_current_admin_user)
+):
+    """Get hit/miss counters of the in-process caches (per worker)"""
+    return {"caches": cache_stats()}
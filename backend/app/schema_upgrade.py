@@ -0,0 +1,102 @@
+# Upgrade skema untuk database yang dibuat sebelum kolom/indeks baru ditambahkan ke app/models.py.
+# create_all hanya membuat tabel yang belum ada, jadi kolom baru pada tabel lama ditambahkan di sini
+# dengan ALTER TABLE ... ADD COLUMN, lalu nilai untuk baris lama (metadata cover, waktu pengajuan
+# peminjaman) diisi ulang.
+# Dipanggil saat startup (app/main.py) dan bisa dijalankan manual lewat scripts/upgrade_database.py.
+import logging
+from datetime import datetime
+from typing import List
+from sqlalchemy import func, inspect, literal, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app import models
+from app.core.images import compute_etag, detect_content_type
+
+logger = logging.getLogger(__name__)
+
+def _column_ddl(engine: Engine, column) -> str:
+    ddl = f"{column.name} {column.type.compile(dialect=engine.dialect)}"
+    default = column.default
+    if default is not None and default.is_scalar:
+        value = literal(default.arg, column.type).compile(
+            dialect=engine.dialect, compile_kwargs={"literal_binds": True}
+        )
+        ddl += f" DEFAULT {value}"
+        # NOT NULL hanya aman jika baris lama langsung terisi nilai default
+        if not column.nullable:
+            ddl += " NOT NULL"
+    return ddl
+
+def add_missing_columns(engine: Engine) -> List[str]:
+    """Menambahkan kolom model yang belum ada di tabel lama. Mengembalikan daftar "tabel.kolom"."""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    with engine.begin() as conn:
+        for table in models.Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or column.primary_key:
+                    continue
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {_column_ddl(engine, column)}")
+                added.append(f"{table.name}.{column.name}")
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    return added
+
+def backfill_cover_metadata(engine: Engine, batch_size: int = 100) -> int:
+    """
+    Mengisi image_etag dan image_content_type untuk cover yang diupload sebelum kolom itu ada,
+    agar cover lama tetap tampil dan bisa dilayani GET /books/{id}/cover. Mengembalikan jumlah buku.
+    """
+    book = models.Book
+    total = 0
+    with Session(bind=engine) as db:
+        while True:
+            rows = db.execute(
+                select(book.id, book.image_blob)
+                .where(book.image_blob.isnot(None), book.image_etag.is_(None))
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            for book_id, data in rows:
+                db.execute(
+                    update(book).where(book.id == book_id).values(
+                        image_etag=compute_etag(data), image_content_type=detect_content_type(data)
+                    ),
+                    execution_options={"synchronize_session": False},
+                )
+            db.commit()
+            total += len(rows)
+    return total
+
+def backfill_borrow_created_at(engine: Engine) -> int:
+    """
+    Kolom created_at peminjaman ditambahkan tanpa NOT NULL pada tabel lama; baris lama diisi
+    dengan tanggal pinjam/kembali jika ada, selain itu waktu upgrade. Mengembalikan jumlah baris.
+    """
+    borrow = models.Borrow
+    with engine.begin() as conn:
+        result = conn.execute(
+            update(borrow.__table__)
+            .where(borrow.created_at.is_(None))
+            .values(created_at=func.coalesce(borrow.borrow_date, borrow.return_date, datetime.now()))
+        )
+    return result.rowcount
+
+def upgrade(engine: Engine):
+    """Menjalankan seluruh langkah upgrade; aman dipanggil berulang kali."""
+    added = add_missing_columns(engine)
+    if added:
+        logger.warning("Kolom baru ditambahkan ke database lama: %s", ", ".join(added))
+    backfilled = backfill_cover_metadata(engine)
+    if backfilled:
+        logger.warning("Metadata cover diisi untuk %d buku lama", backfilled)
+    borrows = backfill_borrow_created_at(engine)
+    if borrows:
+        logger.warning("Waktu pengajuan diisi untuk %d peminjaman lama", borrows)
+    return added, backfilled
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Literal, Dict
 from datetime import datetime
 
 # --- Skema untuk Token ---
@@ -9,6 +9,7 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+    user_id: Optional[int] = None
 
 # --- Skema untuk User ---
 class UserBase(BaseModel):
@@ -59,6 +60,14 @@ class Review(ReviewBase):
     class Config:
         from_attributes = True 
 
+# Satu halaman review buku beserta ringkasan rating dari agregat yang dipelihara
+class ReviewPage(BaseModel):
+    items: List[Review]
+    next_cursor: Optional[str] = None
+    total: int
+    average: float
+    histogram: Dict[str, int]  # skor bintang "1".."5" -> jumlah review
+
 # --- Skema untuk Book ---
 # Skema ini tidak akan digunakan langsung sebagai JSON body untuk endpoint create/update
 # tapi sebagai struktur data di dalam endpoint.
@@ -75,16 +84,33 @@ class BookInList(BaseModel):
     title: str
     image: Optional[str] = None
     amount: int = 0
+    rating_avg: float = 0.0
+    rating_count: int = 0
     authors: List["Author"] = []
     categories: List["Category"] = []
     class Config:
         from_attributes = True 
 
+# Buku di leaderboard peminjaman beserta jumlah peminjamannya
+class PopularBook(BookInList):
+    borrow_count: int
+
 class BookCreate(BookBase):
     # Tidak lagi butuh ID di sini, karena akan dibuat otomatis
     authors: List[str] = []
     categories: List[str] = []
 
+# Laporan POST /books/bulk: satu entri error per baris yang gagal
+class BulkImportError(BaseModel):
+    row: int
+    error: str
+
+class BulkImportReport(BaseModel):
+    created: int
+    failed: int
+    book_ids: List[int] = []
+    errors: List[BulkImportError] = []
+
 class BookUpdate(BaseModel):
     # Semua field opsional saat update
     title: Optional[str] = None
@@ -99,11 +125,18 @@ class BookUpdate(BaseModel):
 class Book(BookBase):
     id: int
     image: Optional[str] # URL gambar
+    rating_avg: float = 0.0
+    rating_count: int = 0
     authors: List["Author"] = []
     categories: List["Category"] = []
     class Config:
         from_attributes = True 
 
+# Satu halaman katalog buku dengan cursor untuk halaman berikutnya
+class BookPage(BaseModel):
+    items: List[Book]
+    next_cursor: Optional[str] = None
+
 class Author(BaseModel):
     name: str
     class Config:
@@ -125,6 +158,7 @@ class Borrow(BorrowBase):
     id: int
     user_id: int
     borrow_date: Optional[datetime] = None # Tanggal pinjam
+    created_at: Optional[datetime] = None  # Tanggal pengajuan
     return_date: Optional[datetime] = None  # Tanggal kembali
     status: str
     book: BookInList
@@ -132,6 +166,34 @@ class Borrow(BorrowBase):
     class Config:
         from_attributes = True 
 
+# Satu halaman antrean peminjaman admin dengan cursor untuk halaman berikutnya
+class BorrowPage(BaseModel):
+    items: List[Borrow]
+    next_cursor: Optional[str] = None
+
 class BorrowAdminUpdate(BaseModel):
     status: str
-    return_date: Optional[str] = None
\ No newline at end of file
+    return_date: Optional[str] = None
+
+# Batas jumlah keputusan dalam satu request bulk-decision
+BULK_DECISION_LIMIT = 1000
+
+class BorrowDecision(BaseModel):
+    borrow_id: int
+    action: Literal["approve", "decline"]
+
+class BorrowBulkDecision(BaseModel):
+    decisions: List[BorrowDecision] = Field(..., min_length=1, max_length=BULK_DECISION_LIMIT)
+
+class BorrowDecisionResult(BaseModel):
+    borrow_id: int
+    action: str
+    # approved, declined, out_of_stock (ditolak karena stok habis), not_pending, atau duplicate
+    outcome: str
+
+class BorrowBulkDecisionReport(BaseModel):
+    approved: int
+    declined: int
+    out_of_stock: int
+    skipped: int
+    items: List[BorrowDecisionResult]
@@ -0,0 +1,143 @@
+# Indeks full-text untuk pencarian buku.
+# SQLite memakai tabel virtual FTS5, PostgreSQL memakai kolom tsvector dengan indeks GIN.
+# Indeks diperbarui per buku oleh crud (create/update/delete) dalam transaksi yang sama.
+import re
+from typing import List, Tuple
+from sqlalchemy import text, func, literal
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, selectinload
+from app import models
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def _dialect(bind) -> str:
+    return bind.dialect.name
+
+def create_search_index(engine: Engine):
+    """Membuat tabel indeks pencarian jika belum ada, lalu mengisinya jika belum sinkron."""
+    dialect = _dialect(engine)
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS book_search USING fts5("
+                "title, authors, categories, description, "
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            ))
+        elif dialect == "postgresql":
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS book_search ("
+                "book_id INTEGER PRIMARY KEY REFERENCES books(id), "
+                "document TSVECTOR NOT NULL)"
+            ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_book_search_document ON book_search USING GIN (document)"
+            ))
+        else:
+            return
+
+    with Session(bind=engine) as db:
+        indexed = db.execute(text("SELECT COUNT(*) FROM book_search")).scalar()
+        books = db.query(func.count(models.Book.id)).filter(models.Book.is_deleted == False).scalar()
+        if indexed != books:
+            rebuild_search_index(db)
+            db.commit()
+
+def _document(book: models.Book) -> dict:
+    return {
+        "book_id": book.id,
+        "title": book.title or "",
+        "authors": " ".join(author.name for author in book.authors),
+        "categories": " ".join(category.name for category in book.categories),
+        "description": book.description or "",
+    }
+
+def index_book(db: Session, book: models.Book):
+    """Menambah atau memperbarui dokumen satu buku di indeks (belum commit)."""
+    if book.is_deleted:
+        remove_book(db, book.id)
+        return
+    index_documents(db, [_document(book)])
+
+def index_documents(db: Session, documents: List[dict]):
+    """
+    Menulis banyak dokumen sekaligus (executemany). Setiap dokumen berisi book_id, title,
+    authors, categories, dan description dalam bentuk teks (belum commit).
+    """
+    if not documents:
+        return
+    dialect = _dialect(db.get_bind())
+    if dialect == "sqlite":
+        db.execute(text("DELETE FROM book_search WHERE rowid = :book_id"), documents)
+        db.execute(text(
+            "INSERT INTO book_search (rowid, title, authors, categories, description) "
+            "VALUES (:book_id, :title, :authors, :categories, :description)"
+        ), documents)
+    elif dialect == "postgresql":
+        db.execute(text(
+            "INSERT INTO book_search (book_id, document) VALUES (:book_id, "
+            "setweight(to_tsvector('simple', :title), 'A') || "
+            "setweight(to_tsvector('simple', :authors), 'B') || "
+            "setweight(to_tsvector('simple', :categories), 'C') || "
+            "setweight(to_tsvector('simple', :description), 'D')) "
+            "ON CONFLICT (book_id) DO UPDATE SET document = EXCLUDED.document"
+        ), documents)
+
+def remove_book(db: Session, book_id: int):
+    """Menghapus buku dari indeks, dipakai juga untuk soft delete."""
+    dialect = _dialect(db.get_bind())
+    if dialect == "sqlite":
+        db.execute(text("DELETE FROM book_search WHERE rowid = :book_id"), {"book_id": book_id})
+    elif dialect == "postgresql":
+        db.execute(text("DELETE FROM book_search WHERE book_id = :book_id"), {"book_id": book_id})
+
+def rebuild_search_index(db: Session, batch_size: int = 500):
+    """Membangun ulang seluruh indeks dari tabel books (belum commit)."""
+    if _dialect(db.get_bind()) not in ("sqlite", "postgresql"):
+        return
+    db.execute(text("DELETE FROM book_search"))
+    last_id = 0
+    while True:
+        books = db.query(models.Book).options(
+            selectinload(models.Book.authors),
+            selectinload(models.Book.categories)
+        ).filter(
+            models.Book.is_deleted == False, models.Book.id > last_id
+        ).order_by(models.Book.id).limit(batch_size).all()
+        if not books:
+            break
+        index_documents(db, [_document(book) for book in books])
+        last_id = books[-1].id
+
+def search_book_ids(db: Session, query: str, offset: int = 0, limit: int = 24) -> List[Tuple[int, float]]:
+    """
+    Mencari buku dan mengembalikan [(book_id, skor)] terurut dari yang paling relevan.
+    Setiap kata diperlakukan sebagai prefix sehingga cocok untuk pencarian sambil mengetik.
+    """
+    tokens = _TOKEN_RE.findall(query.lower())
+    if not tokens:
+        return []
+    dialect = _dialect(db.get_bind())
+    params = {"limit": limit, "offset": offset}
+    if dialect == "sqlite":
+        params["query"] = " AND ".join(f'"{token}"*' for token in tokens)
+        # bm25 bernilai lebih kecil untuk hasil yang lebih relevan; bobot per kolom
+        rows = db.execute(text(
+            "SELECT rowid AS book_id, -bm25(book_search, 10.0, 5.0, 3.0, 1.0) AS score "
+            "FROM book_search WHERE book_search MATCH :query "
+            "ORDER BY score DESC, rowid DESC LIMIT :limit OFFSET :offset"
+        ), params).all()
+    elif dialect == "postgresql":
+        params["query"] = " & ".join(f"{token}:*" for token in tokens)
+        rows = db.execute(text(
+            "SELECT book_id, ts_rank(document, to_tsquery('simple', :query)) AS score "
+            "FROM book_search WHERE document @@ to_tsquery('simple', :query) "
+            "ORDER BY score DESC, book_id DESC LIMIT :limit OFFSET :offset"
+        ), params).all()
+    else:
+        # Fallback tanpa indeks untuk database lain
+        pattern = f"%{query}%"
+        rows = db.query(models.Book.id.label("book_id"), literal(0.0).label("score")).filter(
+            models.Book.is_deleted == False,
+            models.Book.title.ilike(pattern) | models.Book.description.ilike(pattern)
+        ).order_by(models.Book.id.desc()).offset(offset).limit(limit).all()
+    return [(row.book_id, float(row.score)) for row in rows]
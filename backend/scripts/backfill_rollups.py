@@ -0,0 +1,31 @@
+import sys
+import os
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Menambahkan path root proyek agar bisa mengimpor dari 'app'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database import SessionLocal
+from app import rollups
+
+def backfill_rollups(batch_size: int):
+    """Membangun ulang tabel borrow_rollups dari tabel borrows secara bertahap."""
+    db = SessionLocal()
+    try:
+        last_id = rollups.backfill(
+            db, batch_size=batch_size,
+            progress=lambda last_id: print(f"Peminjaman sampai id {last_id} diproses...")
+        )
+        db.commit()
+        print(f"Rollup peminjaman selesai dibangun (id peminjaman terakhir: {last_id}).")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill rollup peminjaman per hari/minggu/bulan.")
+    parser.add_argument("--batch-size", type=int, default=100000)
+    args = parser.parse_args()
+    backfill_rollups(args.batch_size)
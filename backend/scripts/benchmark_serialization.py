@@ -0,0 +1,70 @@
+import sys
+import os
+import json
+import time
+import argparse
+from typing import List
+
+# Menambahkan path root proyek agar bisa mengimpor dari 'app'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from app import models, schemas
+from app.core import serialization
+
+def make_books(count: int) -> List[models.Book]:
+    """Membuat objek Book (tanpa database) lengkap dengan penulis dan kategori."""
+    authors = [models.Author(name=f"Penulis {i}") for i in range(50)]
+    categories = [models.Category(name=f"Kategori {i}") for i in range(20)]
+    return [
+        models.Book(
+            id=i, title=f"Buku {i}", amount=i % 7, description="Deskripsi buku " * 10,
+            image=f"/api/v1/books/{i}/cover?v=0123456789abcdef&size=thumb",
+            publisher="Penerbit", published_date="2024-01-01",
+            authors=[authors[i % 50], authors[(i + 1) % 50]], categories=[categories[i % 20]],
+        )
+        for i in range(count)
+    ]
+
+def default_path(books) -> bytes:
+    # Seperti jalur bawaan: validasi response_model, jsonable_encoder, lalu json.dumps
+    validated = [schemas.Book.model_validate(book) for book in books]
+    return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+def orjson_path(books) -> bytes:
+    # Jalur bawaan dengan ORJSONResponse sebagai default_response_class
+    validated = [schemas.Book.model_validate(book) for book in books]
+    return orjson.dumps(jsonable_encoder(validated))
+
+def fast_path(books) -> bytes:
+    # app.core.serialization: validasi sekali lalu dump langsung ke bytes
+    return serialization.dump_json(List[schemas.Book], books)
+
+def measure(fn, books, repeat: int) -> float:
+    fn(books)  # pemanasan
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(books)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark biaya serialisasi response daftar buku.")
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    books = make_books(args.count)
+    assert json.loads(default_path(books)) == json.loads(fast_path(books))
+
+    print(f"Serialisasi {args.count} buku (terbaik dari {args.repeat} kali):")
+    baseline = None
+    for name, fn in [("jsonable_encoder + json", default_path),
+                     ("jsonable_encoder + orjson", orjson_path),
+                     ("model_validate + dump_json", fast_path)]:
+        elapsed = measure(fn, books, args.repeat)
+        baseline = baseline or elapsed
+        per_item = elapsed / args.count * 1_000_000
+        print(f"  {name:<28} {elapsed * 1000:8.1f} ms  {per_item:6.2f} us/buku  x{baseline / elapsed:.1f}")
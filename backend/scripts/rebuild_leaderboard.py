@@ -0,0 +1,31 @@
+import sys
+import os
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Menambahkan path root proyek agar bisa mengimpor dari 'app'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database import SessionLocal
+from app import leaderboard
+
+def rebuild_leaderboard(batch_size: int):
+    """Menghitung ulang tabel book_borrow_counts dari tabel borrows secara bertahap."""
+    db = SessionLocal()
+    try:
+        last_id = leaderboard.rebuild(
+            db, batch_size=batch_size,
+            progress=lambda last_id: print(f"Peminjaman sampai id {last_id} diproses...")
+        )
+        db.commit()
+        print(f"Leaderboard buku selesai dibangun (id peminjaman terakhir: {last_id}).")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hitung ulang leaderboard buku terpopuler.")
+    parser.add_argument("--batch-size", type=int, default=100000)
+    args = parser.parse_args()
+    rebuild_leaderboard(args.batch_size)
@@ -0,0 +1,24 @@
+import sys
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Menambahkan path root proyek agar bisa mengimpor dari 'app'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database import SessionLocal
+from app import ratings
+
+def rebuild_ratings():
+    """Menghitung ulang rating_avg dan rating_count semua buku dari tabel reviews."""
+    db = SessionLocal()
+    try:
+        rated_books = ratings.rebuild(db)
+        db.commit()
+        print(f"Rating {rated_books} buku berhasil dihitung ulang.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild_ratings()
@@ -0,0 +1,26 @@
+import sys
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Menambahkan path root proyek agar bisa mengimpor dari 'app'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database import SessionLocal
+from app import counters
+
+def reconcile_counters():
+    """Membangun ulang tabel stat_counters dari tabel books, users, dan borrows."""
+    db = SessionLocal()
+    try:
+        values = counters.reconcile(db)
+        db.commit()
+        for name, value in values.items():
+            print(f"{name}: {value}")
+        print("Counter statistik berhasil disinkronkan.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    reconcile_counters()
@@ -1,9 +1,11 @@
 import sys
 import os
+import time
+import argparse
+from datetime import date, datetime, time as dt_time
+import numpy as np
 import pandas as pd
-import ast
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import insert, text
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,99 +13,234 @@ load_dotenv()
 # Menambahkan path root proyek agar bisa mengimpor dari 'app'
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app.models import Base, User, Book, Author, Category
+from app.models import Base, User, Book, Author, Category, Borrow, Review, book_authors_table, book_categories_table
 from app.core.security import get_password_hash
+from app.database import engine
+from app import search, counters, rollups, leaderboard, ratings
 
 # --- Konfigurasi ---
-DATABASE_URL = os.getenv("DATABASE_URL")
 BOOKS_CSV_PATH = "data/books.csv"
+BATCH_SIZE = 10000
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+DEFAULT_USERS = [
+    {"email": "admin@perpustakaan.com", "full_name": "Admin Utama", "password": "adminpassword", "role": "admin"},
+    {"email": "budi.pekerti@email.com", "full_name": "Budi Pekerti", "password": "userpassword", "role": "user", "nim": "H071191044"},
+]
 
-def seed_data():
-    print("Menghapus database lama (jika ada) dan membuat tabel baru...")
-    if os.path.exists("epersmip.db"):
-        os.remove("epersmip.db")
-    
+# Nama dalam literal list Python, misalnya "['Andrea Hirata', "O'Brien"]"
+NAME_PATTERN = r"""'((?:[^'\\]|\\.)*)'|"((?:[^"\\]|\\.)*)\""""
+
+def reset_database():
+    print("Menghapus tabel lama (jika ada) dan membuat tabel baru...")
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS book_search"))
+    Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
     print("Tabel berhasil dibuat.")
 
-    db = SessionLocal()
-
-    try:
-        # --- 1. Seed Users ---
-        print("Memasukkan data Users dummy...")
-        users_to_create = [
-            {"email": "admin@perpustakaan.com", "full_name": "Admin Utama", "password": "adminpassword", "role": "admin"},
-            {"email": "budi.pekerti@email.com", "full_name": "Budi Pekerti", "password": "userpassword", "role": "user", "nim": "H071191044"},
-        ]
-        for user_data in users_to_create:
-            user = User(
-                email=user_data["email"],
-                full_name=user_data["full_name"],
-                hashed_password=get_password_hash(user_data["password"]),
-                role=user_data["role"],
-                nim=user_data.get("nim")
-            )
-            db.add(user)
-        db.commit()
-        print("Data Users berhasil dimasukkan.")
-
-        # --- 2. Seed Books, Authors, dan Categories ---
-        print(f"Membaca dan memproses {BOOKS_CSV_PATH}...")
-        if not os.path.exists(BOOKS_CSV_PATH):
-            print(f"Error: File {BOOKS_CSV_PATH} tidak ditemukan. Melewati seeding buku.")
-            return
-
-        books_df = pd.read_csv(BOOKS_CSV_PATH).where(pd.notnull, None)
-        
-        authors_cache = {}
-        categories_cache = {}
-
-        for _, row in books_df.iterrows():
-            author_objects = []
-            try:
-                author_names = ast.literal_eval(row['authors']) if row['authors'] else []
-                for name in author_names:
-                    if name not in authors_cache:
-                        author = Author(name=name)
-                        db.add(author)
-                        db.flush()
-                        authors_cache[name] = author
-                    author_objects.append(authors_cache[name])
-            except (ValueError, SyntaxError):
-                pass
-
-            category_objects = []
-            try:
-                category_names = ast.literal_eval(row['categories']) if row['categories'] else []
-                for name in category_names:
-                    if name not in categories_cache:
-                        category = Category(name=name)
-                        db.add(category)
-                        db.flush()
-                        categories_cache[name] = category
-                    category_objects.append(categories_cache[name])
-            except (ValueError, SyntaxError):
-                pass
-            
-            book = Book(
-                title=row.get('title'), amount=row.get('amount'), description=row.get('description'),
-                image=row.get('image'), publisher=row.get('publisher'), published_date=row.get('published_date'),
-                rating=row.get('rating'),authors=author_objects, categories=category_objects
-            )
-            db.merge(book)
-        
-        db.commit()
-        print("Data Books, Authors, dan Categories berhasil dimasukkan.")
-
-    except Exception as e:
-        print(f"Terjadi error: {e}")
-        db.rollback()
-    finally:
-        db.close()
-        print("\nProses seeding selesai.")
+def bulk_insert(table, frame: pd.DataFrame, batch_size: int, label: str):
+    """Menyisipkan DataFrame dengan executemany per batch; setiap batch di-commit sendiri."""
+    total = len(frame)
+    started = time.perf_counter()
+    for start in range(0, total, batch_size):
+        chunk = frame.iloc[start:start + batch_size].astype(object)
+        rows = chunk.where(chunk.notna(), None).to_dict("records")
+        with engine.begin() as conn:
+            conn.execute(insert(table), rows)
+        done = min(start + batch_size, total)
+        print(f"  {label}: {done}/{total} ({done / (time.perf_counter() - started):,.0f} baris/detik)", end="\r")
+    print(f"  {label}: {total} baris selesai dalam {time.perf_counter() - started:.1f} detik.")
+
+def sync_sequences():
+    """Id ditulis eksplisit, jadi sequence PostgreSQL harus disesuaikan setelah seeding."""
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        for table in ("users", "authors", "categories", "books", "borrows", "reviews"):
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 1)) FROM {table}"
+            ))
+
+def seed_users(extra: pd.DataFrame = None, batch_size: int = BATCH_SIZE) -> int:
+    print("Memasukkan data Users...")
+    users = pd.DataFrame([
+        {
+            "email": user["email"], "full_name": user["full_name"], "role": user["role"], "nim": user.get("nim"),
+            "hashed_password": get_password_hash(user["password"]), "is_active": 1,
+        }
+        for user in DEFAULT_USERS
+    ])
+    if extra is not None:
+        users = pd.concat([users, extra], ignore_index=True)
+    users.insert(0, "id", np.arange(1, len(users) + 1))
+    bulk_insert(User.__table__, users, batch_size, "users")
+    return len(users)
+
+def name_links(names: pd.Series, id_column: str):
+    """
+    Mengurai kolom berisi literal list nama secara vektor (str.extractall), lalu
+    mengembalikan (tabel nama dengan id, pasangan book_id-id nama).
+    """
+    matches = names.fillna("").astype(str).str.extractall(NAME_PATTERN)
+    links = pd.DataFrame({
+        "book_id": matches.index.get_level_values(0),
+        "name": matches[0].fillna(matches[1]).str.replace(r"\\(.)", r"\1", regex=True).str.strip(),
+    })
+    links = links[links["name"] != ""].drop_duplicates()
+    table = pd.DataFrame({"name": links["name"].drop_duplicates().to_numpy()})
+    table.insert(0, "id", np.arange(1, len(table) + 1))
+    links = links.merge(table, on="name").rename(columns={"id": id_column})
+    return table, links[["book_id", id_column]]
+
+def insert_books(books: pd.DataFrame, authors: pd.Series, categories: pd.Series, batch_size: int):
+    """books harus punya kolom id; authors/categories berisi literal list nama per buku."""
+    author_table, author_links = name_links(authors.set_axis(books["id"]), "author_id")
+    category_table, category_links = name_links(categories.set_axis(books["id"]), "category_id")
+    bulk_insert(Author.__table__, author_table, batch_size, "authors")
+    bulk_insert(Category.__table__, category_table, batch_size, "categories")
+    bulk_insert(Book.__table__, books, batch_size, "books")
+    bulk_insert(book_authors_table, author_links, batch_size, "book_authors")
+    bulk_insert(book_categories_table, category_links, batch_size, "book_categories")
+
+def seed_books_from_csv(path: str, batch_size: int):
+    print(f"Membaca dan memproses {path}...")
+    if not os.path.exists(path):
+        print(f"Error: File {path} tidak ditemukan. Melewati seeding buku.")
+        return
+    frame = pd.read_csv(path, dtype={"published_date": "string"})
+    columns = ["title", "amount", "description", "image", "publisher", "published_date", "rating"]
+    books = frame.reindex(columns=columns)
+    books["amount"] = pd.to_numeric(books["amount"], errors="coerce").fillna(1).astype(int)
+    books.insert(0, "id", np.arange(1, len(books) + 1))
+    books["is_deleted"] = False
+    books["version"] = int(time.time())
+    books["updated_at"] = datetime.utcnow()
+    insert_books(books, frame.get("authors", pd.Series(index=frame.index, dtype=object)),
+                 frame.get("categories", pd.Series(index=frame.index, dtype=object)), batch_size)
+
+def generate(n_books: int, n_users: int, n_borrows: int, n_reviews: int, seed: int, batch_size: int):
+    """Membuat dataset sintetis yang bisa diulang (seed sama = data sama untuk tanggal yang sama)."""
+    rng = np.random.default_rng(seed)
+    end = datetime.combine(date.today(), dt_time.min)
+    history_seconds = 2 * 365 * 24 * 3600
+
+    # --- Users: satu hash password dipakai bersama agar tidak menunggu bcrypt per user ---
+    shared_hash = get_password_hash("userpassword")
+    numbers = np.arange(1, n_users + 1)
+    users = pd.DataFrame({
+        "email": [f"user{i}@example.com" for i in numbers],
+        "full_name": [f"Pengguna {i}" for i in numbers],
+        "role": "user",
+        "nim": [f"H07{i:07d}" for i in numbers],
+        "hashed_password": shared_hash,
+        "is_active": (rng.random(n_users) > 0.02).astype(int),
+    })
+    total_users = seed_users(users, batch_size)
+    user_ids = np.arange(len(DEFAULT_USERS) + 1, total_users + 1)
+
+    # --- Books: penulis dan kategori dengan popularitas tidak merata (Zipf) ---
+    print(f"Membuat {n_books} buku sintetis...")
+    book_ids = np.arange(1, n_books + 1)
+    n_authors = max(1, n_books // 4)
+    n_categories = 40
+    author_weights = 1 / np.arange(1, n_authors + 1) ** 0.8
+    category_weights = 1 / np.arange(1, n_categories + 1) ** 1.1
+    author_picks = rng.choice(n_authors, size=(n_books, 2), p=author_weights / author_weights.sum())
+    category_picks = rng.choice(n_categories, size=(n_books, 2), p=category_weights / category_weights.sum())
+    second_author = rng.random(n_books) < 0.25
+    second_category = rng.random(n_books) < 0.4
+    authors = pd.Series([
+        repr([f"Penulis {a}", f"Penulis {b}"] if two else [f"Penulis {a}"])
+        for (a, b), two in zip(author_picks, second_author)
+    ])
+    categories = pd.Series([
+        repr([f"Kategori {a}", f"Kategori {b}"] if two else [f"Kategori {a}"])
+        for (a, b), two in zip(category_picks, second_category)
+    ])
+
+    # --- Borrows: buku populer lebih sering dipinjam, tanggal tersebar dua tahun terakhir ---
+    print(f"Membuat {n_borrows} peminjaman sintetis...")
+    book_weights = 1 / np.arange(1, n_books + 1) ** 1.05
+    borrow_book = rng.permutation(book_ids)[rng.choice(n_books, size=n_borrows, p=book_weights / book_weights.sum())]
+    borrow_user = rng.choice(user_ids, size=n_borrows)
+    borrow_offset = np.sort(rng.integers(0, history_seconds, size=n_borrows))
+    borrow_date = pd.to_datetime(end) - pd.to_timedelta(history_seconds - borrow_offset, unit="s")
+    return_date = borrow_date + pd.to_timedelta(rng.exponential(7 * 24 * 3600, size=n_borrows) + 3600, unit="s")
+    return_date = return_date.where(return_date <= end, pd.Timestamp(end))
+    status = np.where(rng.random(n_borrows) < 0.05, "ditolak", "dikembalikan").astype(object)
+
+    # Peminjaman terakhir tiap user bisa masih aktif; maksimal satu dipinjam/menunggu per user
+    borrows = pd.DataFrame({"book_id": borrow_book, "user_id": borrow_user, "status": status,
+                            "borrow_date": borrow_date, "return_date": return_date})
+    latest = borrows.drop_duplicates("user_id", keep="last").index
+    active = rng.choice(["dikembalikan", "dipinjam", "menunggu"], size=len(latest), p=[0.6, 0.3, 0.1])
+    borrows.loc[latest, "status"] = active
+    # Waktu pengajuan selalu ada; tanggal pinjam hanya untuk peminjaman yang disetujui
+    borrows["created_at"] = borrows["borrow_date"]
+    borrows.loc[borrows["status"].isin(["dipinjam", "menunggu", "ditolak"]), "return_date"] = pd.NaT
+    borrows.loc[borrows["status"].isin(["menunggu", "ditolak"]), "borrow_date"] = pd.NaT
+    borrows.insert(0, "id", np.arange(1, n_borrows + 1))
+
+    # Stok tersedia = jumlah eksemplar dikurangi yang sedang dipinjam
+    on_loan = borrows.loc[borrows["status"] == "dipinjam"].groupby("book_id").size()
+    copies = np.maximum(rng.integers(1, 8, size=n_books), on_loan.reindex(book_ids, fill_value=0).to_numpy())
+    books = pd.DataFrame({
+        "id": book_ids,
+        "title": [f"Buku Sintetis {i}" for i in book_ids],
+        "amount": copies - on_loan.reindex(book_ids, fill_value=0).to_numpy(),
+        "description": [f"Deskripsi buku sintetis nomor {i}." for i in book_ids],
+        "publisher": rng.choice([f"Penerbit {i}" for i in range(1, 51)], size=n_books),
+        "published_date": rng.integers(1980, end.year + 1, size=n_books).astype(str),
+        "is_deleted": False,
+        "version": int(time.time()),
+        "updated_at": datetime.utcnow(),
+    })
+    insert_books(books, authors, categories, batch_size)
+    bulk_insert(Borrow.__table__, borrows, batch_size, "borrows")
+
+    # --- Reviews: hanya dari peminjaman yang sudah dikembalikan, satu per user per buku ---
+    returned = borrows.loc[borrows["status"] == "dikembalikan", ["user_id", "book_id", "return_date"]]
+    returned = returned.drop_duplicates(["user_id", "book_id"])
+    n_reviews = min(n_reviews, len(returned))
+    print(f"Membuat {n_reviews} review sintetis...")
+    reviews = returned.iloc[np.sort(rng.choice(len(returned), size=n_reviews, replace=False))].copy()
+    reviews["review_score"] = rng.choice([1.0, 2.0, 3.0, 4.0, 5.0], size=n_reviews, p=[0.04, 0.07, 0.19, 0.35, 0.35])
+    reviews["review_text"] = np.where(rng.random(n_reviews) < 0.6, "Buku yang bagus.", None)
+    reviews["created_at"] = reviews.pop("return_date") + pd.to_timedelta(rng.integers(0, 72 * 3600, size=n_reviews), unit="s")
+    reviews.insert(0, "id", np.arange(1, n_reviews + 1))
+    bulk_insert(Review.__table__, reviews, batch_size, "reviews")
+
+def build_derived_tables():
+    """Indeks pencarian, counter statistik, rollup, leaderboard, dan rating dibangun dari data yang baru dimasukkan."""
+    print("Membangun indeks pencarian, counter, rollup, leaderboard, dan rating...")
+    started = time.perf_counter()
+    search.create_search_index(engine)
+    counters.ensure_counters(engine)
+    rollups.ensure_rollups(engine)
+    leaderboard.ensure_leaderboard(engine)
+    ratings.ensure_ratings(engine)
+    print(f"Selesai dalam {time.perf_counter() - started:.1f} detik.")
+
+def seed_data(args):
+    started = time.perf_counter()
+    reset_database()
+    if args.generate:
+        generate(args.books, args.users, args.borrows, args.reviews, args.seed, args.batch_size)
+    else:
+        seed_users(batch_size=args.batch_size)
+        seed_books_from_csv(args.csv, args.batch_size)
+    sync_sequences()
+    build_derived_tables()
+    print(f"\nProses seeding selesai dalam {time.perf_counter() - started:.1f} detik.")
 
 if __name__ == "__main__":
-    seed_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Mengisi database dari data/books.csv atau dengan data sintetis.")
+    parser.add_argument("--csv", default=BOOKS_CSV_PATH, help="File CSV buku (mode default)")
+    parser.add_argument("--generate", action="store_true", help="Buat data sintetis alih-alih membaca CSV")
+    parser.add_argument("--books", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--borrows", type=int, default=10000)
+    parser.add_argument("--reviews", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42, help="Seed random agar data bisa diulang")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    seed_data(parser.parse_args())
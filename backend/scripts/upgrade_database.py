@@ -0,0 +1,23 @@
+import sys
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Menambahkan path root proyek agar bisa mengimpor dari 'app'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database import engine
+from app import models, schema_upgrade
+
+def upgrade_database():
+    """Membuat tabel yang belum ada, menambahkan kolom baru, dan mengisi metadata cover lama."""
+    models.Base.metadata.create_all(bind=engine)
+    added, backfilled = schema_upgrade.upgrade(engine)
+    for column in added:
+        print(f"Kolom {column} ditambahkan.")
+    print(f"Metadata cover diisi untuk {backfilled} buku.")
+    print("Upgrade database selesai.")
+
+if __name__ == "__main__":
+    upgrade_database()
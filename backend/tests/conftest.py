@@ -0,0 +1,55 @@
+import sys
+import os
+import tempfile
+import pytest
+
+# Menambahkan path root backend agar test bisa mengimpor dari 'app'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Database SQLite sementara; harus diset sebelum app.database diimpor (load_dotenv tidak menimpa
+# environment yang sudah ada, jadi .env pengembang tidak ikut terpakai)
+TEST_DB_DIR = tempfile.mkdtemp(prefix="perpus-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DB_DIR, 'test.db')}"
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+
+@pytest.fixture(scope="session")
+def client():
+    """TestClient untuk app lengkap; startup membuat tabel dan counter di database sementara."""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture(scope="session")
+def make_user(client):
+    """Membuat user langsung lewat crud dan mengembalikan header Authorization untuknya."""
+    from app import crud, schemas
+    from app.core import security
+    from app.database import SessionLocal
+    created = []
+
+    def _make_user(role: str = "user") -> dict:
+        number = len(created) + 1
+        with SessionLocal() as db:
+            user = crud.create_user(
+                db,
+                schemas.UserCreate(
+                    email=f"{role}{number}@test.local",
+                    full_name=f"{role.title()} {number}",
+                    nim=None if role == "admin" else f"T{number:04d}",
+                    password="password123",
+                    role=role,
+                ),
+                hashed_password="x",
+            )
+            created.append(user.id)
+            token = security.create_access_token(data={"sub": user.email, "uid": user.id})
+        return {"Authorization": f"Bearer {token}"}
+
+    return _make_user
+
+@pytest.fixture(scope="session")
+def admin_headers(make_user):
+    return make_user("admin")
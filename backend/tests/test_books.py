@@ -0,0 +1,65 @@
+import json
+
+def bulk_create(client, admin_headers, titles):
+    body = "\n".join(json.dumps({"title": title, "amount": 1, "authors": ["Penulis"], "categories": ["Tes"]}) for title in titles)
+    response = client.post("/api/v1/books/bulk", params={"format": "ndjson"}, headers=admin_headers, content=body.encode())
+    assert response.status_code == 200, response.text
+    return response.json()["book_ids"]
+
+def test_book_list_returns_304_for_matching_etag(client, admin_headers):
+    bulk_create(client, admin_headers, ["Etag A", "Etag B"])
+    first = client.get("/api/v1/books/", params={"limit": 2})
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+
+    cached = client.get("/api/v1/books/", params={"limit": 2}, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    # Parameter lain menghasilkan isi lain, jadi ETag lama tidak boleh cocok
+    other_page = client.get("/api/v1/books/", params={"limit": 1}, headers={"If-None-Match": etag})
+    assert other_page.status_code == 200
+
+    # Perubahan katalog membuat ETag lama basi
+    bulk_create(client, admin_headers, ["Etag C"])
+    changed = client.get("/api/v1/books/", params={"limit": 2}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+def test_next_cursor_visits_every_book_once(client, admin_headers):
+    created = bulk_create(client, admin_headers, [f"Halaman {i}" for i in range(7)])
+    seen = []
+    params = {"limit": 3}
+    while True:
+        response = client.get("/api/v1/books/", params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) <= 3
+        seen.extend(book["id"] for book in page["items"])
+        if page["next_cursor"] is None:
+            break
+        params = {"limit": 3, "cursor": page["next_cursor"]}
+
+    assert len(seen) == len(set(seen))
+    assert seen == sorted(seen, reverse=True)
+    assert set(created) <= set(seen)
+
+def test_invalid_cursor_rejected(client):
+    response = client.get("/api/v1/books/", params={"cursor": "bukan-cursor"})
+    assert response.status_code == 400
+
+def test_bulk_import_rejects_non_utf8(client, admin_headers):
+    rows = "title,amount,authors,categories\nValid Satu,1,Ani,Fiksi\nValid Dua,1,Ani,Fiksi\nCafé,1,Ani,Fiksi\n"
+    response = client.post(
+        "/api/v1/books/bulk",
+        params={"format": "csv"},
+        headers={**admin_headers, "Content-Type": "text/csv"},
+        content=rows.encode("cp1252"),
+    )
+    assert response.status_code == 400
+    report = response.json()
+    assert "UTF-8" in report["detail"]
+    assert "line 4" in report["detail"]
+    # Baris valid sebelum byte yang rusak tetap tersimpan dan dilaporkan
+    assert report["created"] == 2
+    assert len(report["book_ids"]) == 2
@@ -0,0 +1,52 @@
+import json
+
+def create_book(client, admin_headers, title: str, amount: int) -> int:
+    body = json.dumps({"title": title, "amount": amount, "authors": ["Penulis"], "categories": ["Tes"]})
+    response = client.post("/api/v1/books/bulk", params={"format": "ndjson"}, headers=admin_headers, content=body.encode())
+    assert response.status_code == 200, response.text
+    return response.json()["book_ids"][0]
+
+def request_borrow(client, headers, book_id: int) -> int:
+    response = client.post("/api/v1/borrows/", headers=headers, json={"book_id": book_id})
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+def test_bulk_decision_out_of_stock_is_first_come_first_served(client, admin_headers, make_user):
+    book_id = create_book(client, admin_headers, "Stok Satu", amount=1)
+    first = request_borrow(client, make_user(), book_id)
+    second = request_borrow(client, make_user(), book_id)
+
+    # Urutan di payload sengaja dibalik; yang diajukan lebih dulu tetap didahulukan
+    response = client.post(
+        "/api/v1/borrows/bulk-decision",
+        headers=admin_headers,
+        json={"decisions": [
+            {"borrow_id": second, "action": "approve"},
+            {"borrow_id": first, "action": "approve"},
+            {"borrow_id": first, "action": "approve"},
+        ]},
+    )
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert (report["approved"], report["declined"], report["out_of_stock"], report["skipped"]) == (1, 0, 1, 1)
+    outcomes = [(item["borrow_id"], item["outcome"]) for item in report["items"]]
+    assert outcomes == [(second, "out_of_stock"), (first, "approved"), (first, "duplicate")]
+
+    assert client.get(f"/api/v1/books/{book_id}").json()["amount"] == 0
+    borrows = {
+        borrow["id"]: borrow["status"]
+        for borrow in client.get("/api/v1/borrows/all", headers=admin_headers, params={"limit": 100}).json()["items"]
+    }
+    assert borrows[first] == "dipinjam"
+    assert borrows[second] == "ditolak"
+
+def test_bulk_decision_skips_already_decided(client, admin_headers, make_user):
+    book_id = create_book(client, admin_headers, "Stok Dua", amount=2)
+    borrow_id = request_borrow(client, make_user(), book_id)
+    decision = {"decisions": [{"borrow_id": borrow_id, "action": "decline"}]}
+    assert client.post("/api/v1/borrows/bulk-decision", headers=admin_headers, json=decision).json()["declined"] == 1
+
+    again = client.post("/api/v1/borrows/bulk-decision", headers=admin_headers, json=decision).json()
+    assert again["declined"] == 0
+    assert again["items"][0]["outcome"] == "not_pending"
+    assert client.get(f"/api/v1/books/{book_id}").json()["amount"] == 2
@@ -0,0 +1,79 @@
+import logging
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+from app.core import query_stats
+
+LOGGER_NAME = query_stats.logger.name
+
+def make_client(**middleware_options) -> TestClient:
+    """App kecil dengan engine SQLite in-memory yang diinstrumentasi seperti app/database.py."""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    query_stats.instrument_engine(engine)
+    app = FastAPI()
+    app.add_middleware(query_stats.QueryStatsMiddleware, **middleware_options)
+
+    @app.get("/items")
+    async def read_items(count: int = 1, repeated: bool = False):
+        # Query yang sama per item, pola N+1 yang ingin dideteksi; repeated=true menandai
+        # statement sebagai pengulangan yang disengaja (seperti counter statistik)
+        options = query_stats.REPEATED_BY_DESIGN if repeated else {}
+        with engine.connect() as conn:
+            return [
+                conn.execute(text("SELECT :item"), {"item": item}, execution_options=options).scalar()
+                for item in range(count)
+            ]
+
+    return TestClient(app)
+
+def records(caplog, message: str):
+    return [record for record in caplog.records if record.name == LOGGER_NAME and record.getMessage().startswith(message)]
+
+def test_server_timing_header_counts_queries():
+    response = make_client(slow_request_ms=0).get("/items", params={"count": 3})
+    assert response.status_code == 200
+    assert 'db;desc="3 queries"' in response.headers["Server-Timing"]
+
+def test_n_plus_one_warning_fires(caplog):
+    client = make_client(n_plus_one_threshold=3, slow_request_ms=0)
+    with caplog.at_level(logging.WARNING, logger=LOGGER_NAME):
+        client.get("/items", params={"count": 5})
+    warnings = records(caplog, "sql_n_plus_one")
+    assert len(warnings) == 1
+    assert warnings[0].levelno == logging.WARNING
+    assert warnings[0].sql_n_plus_one["count"] == 5
+    assert warnings[0].sql_n_plus_one["route"] == "/items"
+
+def test_no_n_plus_one_warning_below_threshold(caplog):
+    client = make_client(n_plus_one_threshold=3, slow_request_ms=0)
+    with caplog.at_level(logging.WARNING, logger=LOGGER_NAME):
+        client.get("/items", params={"count": 2})
+    assert records(caplog, "sql_n_plus_one") == []
+
+def test_repeated_by_design_statements_skip_n_plus_one(caplog):
+    client = make_client(n_plus_one_threshold=3, slow_request_ms=0)
+    with caplog.at_level(logging.WARNING, logger=LOGGER_NAME):
+        response = client.get("/items", params={"count": 5, "repeated": True})
+    assert records(caplog, "sql_n_plus_one") == []
+    # Tetap dihitung pada statistik request
+    assert 'db;desc="5 queries"' in response.headers["Server-Timing"]
+
+def test_slow_request_logged_as_warning(caplog):
+    # Ambang sangat kecil sehingga request apa pun dianggap lambat
+    client = make_client(slow_request_ms=0.001)
+    with caplog.at_level(logging.INFO, logger=LOGGER_NAME):
+        client.get("/items")
+    slow = records(caplog, "sql_slow_request")
+    assert len(slow) == 1
+    assert slow[0].levelno == logging.WARNING
+    assert slow[0].sql_stats["queries"] == 1
+    assert records(caplog, "sql_stats") == []
+
+def test_request_summary_logged_at_info(caplog):
+    client = make_client(slow_request_ms=0)
+    with caplog.at_level(logging.INFO, logger=LOGGER_NAME):
+        client.get("/items", params={"count": 2})
+    summary = records(caplog, "sql_stats")
+    assert len(summary) == 1
+    assert summary[0].sql_stats["queries"] == 2
@@ -7,6 +7,9 @@ import { showNotification } from '../utils/notification'
 
 function BookReviews({ bookId, canAddReview = true }) {
   const [reviews, setReviews] = useState([])
+  const [reviewSummary, setReviewSummary] = useState({ total: 0, average: 0, histogram: {} })
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [book, setBook] = useState(null)
   const [currentUser, setCurrentUser] = useState(null)
   const [userReview, setUserReview] = useState(null)
@@ -31,14 +34,17 @@ function BookReviews({ bookId, canAddReview = true }) {
     try {
       setLoading(true)
       setFetchError(null)
-      const [bookData, reviewsData, userData, borrowsData] = await Promise.all([
+      const [bookData, reviewPage, myReview, userData, borrowsData] = await Promise.all([
         booksAPI.getBook(bookId),
         reviewsAPI.getReviewsForBook(bookId),
+        reviewsAPI.getMyReviewForBook(bookId),
         authAPI.getCurrentUser(),
         borrowsAPI.getMyBorrows()
       ])
       setBook(bookData)
-      setReviews(reviewsData)
+      setReviews(reviewPage.items)
+      setNextCursor(reviewPage.next_cursor)
+      setReviewSummary({ total: reviewPage.total, average: reviewPage.average, histogram: reviewPage.histogram })
       setCurrentUser(userData)
       setUserBorrowHistory(borrowsData)
       
@@ -61,8 +67,8 @@ function BookReviews({ bookId, canAddReview = true }) {
       const isUserNotAdmin = userData.role !== 'admin'
       setCanUserReview(!!eligibleBorrow && isUserNotAdmin)
       
-      // Find user's existing review
-      const existingReview = reviewsData.find(review => review.owner.id === userData.id)
+      // Review user sendiri diambil terpisah karena belum tentu ada di halaman pertama
+      const existingReview = myReview
       setUserReview(existingReview)
       
       if (existingReview) {
@@ -86,6 +92,20 @@ function BookReviews({ bookId, canAddReview = true }) {
     }
   }
 
+  // Halaman review berikutnya hanya dimuat saat diminta
+  const handleLoadMoreReviews = async () => {
+    setLoadingMore(true)
+    try {
+      const page = await reviewsAPI.getReviewsForBook(bookId, nextCursor)
+      setReviews(prev => [...prev, ...page.items])
+      setNextCursor(page.next_cursor)
+    } catch (error) {
+      showNotification('Gagal memuat review berikutnya: ' + error.message, 'error')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const showNotification = (message, type = 'success') => {
     setNotification({ message, type })
     const duration = type === 'error' ? 5000 : 3000 // Error messages stay longer
@@ -211,9 +231,8 @@ function BookReviews({ bookId, canAddReview = true }) {
     )
   }
 
-  const averageRating = reviews.length > 0 
-    ? (reviews.reduce((sum, review) => sum + review.review_score, 0) / reviews.length).toFixed(1)
-    : 0
+  // Rata-rata, total, dan histogram dari server (semua review, bukan hanya yang sudah dimuat)
+  const averageRating = reviewSummary.total > 0 ? reviewSummary.average.toFixed(1) : 0
 
   if (loading) {
     return (
@@ -270,7 +289,7 @@ function BookReviews({ bookId, canAddReview = true }) {
             <div className="flex items-center gap-3">
               {renderStars(Math.round(averageRating))}
               <span className="text-sm font-medium text-gray-600">
-                {reviews.length} ulasan
+                {reviewSummary.total} ulasan
               </span>
             </div>
             
@@ -324,6 +343,27 @@ function BookReviews({ bookId, canAddReview = true }) {
               </div>
             )}
           </div>
+          {/* Distribusi skor */}
+          {reviewSummary.total > 0 && (
+            <div className="space-y-1 mb-4">
+              {['5', '4', '3', '2', '1'].map((score) => {
+                const count = reviewSummary.histogram[score] || 0
+                return (
+                  <div key={score} className="flex items-center gap-2 text-sm text-gray-600">
+                    <span className="w-6 text-right">{score}</span>
+                    <StarIcon className="h-4 w-4 text-yellow-400" />
+                    <div className="flex-1 h-2 bg-gray-100 rounded-full overflow-hidden">
+                      <div
+                        className="h-full bg-yellow-400"
+                        style={{ width: `${(count / reviewSummary.total) * 100}%` }}
+                      ></div>
+                    </div>
+                    <span className="w-10 text-right">{count}</span>
+                  </div>
+                )
+              })}
+            </div>
+          )}
           {/* Review Form (only if canAddReview and user can review) */}
           {canAddReview && showForm && canUserReview && (
             <div className="border-t border-gray-100 pt-6 mt-4">
@@ -373,7 +413,7 @@ function BookReviews({ bookId, canAddReview = true }) {
         <div className="bg-gray-50 px-6 py-4 border-b border-gray-200">
           <h3 className="text-lg font-bold text-gray-900 flex items-center gap-2">
             <span className="w-1 h-6 bg-red-600 rounded-full"></span>
-            Semua Review ({reviews.length})
+            Semua Review ({reviewSummary.total})
           </h3>
         </div>
         
@@ -430,6 +470,17 @@ function BookReviews({ bookId, canAddReview = true }) {
                   </div>
                 </div>
               ))}
+              {nextCursor && (
+                <div className="flex justify-center">
+                  <button
+                    onClick={handleLoadMoreReviews}
+                    disabled={loadingMore}
+                    className="px-6 py-2.5 rounded-lg font-medium text-red-600 bg-red-50 hover:bg-red-100 transition-all duration-200 disabled:opacity-50"
+                  >
+                    {loadingMore ? 'Memuat...' : 'Tampilkan review lainnya'}
+                  </button>
+                </div>
+              )}
             </div>
           )}
         </div>
@@ -8,6 +8,9 @@ import { booksAPI } from '../../services/api'
 import { categoriesAPI } from '../../services/api'
 import { showNotification } from '../../utils/notification'
 
+// Jumlah buku yang diambil per request ke server
+const BOOKS_PAGE_SIZE = 50
+
 function BookManagement({ onLogout }) {
   const navigate = useNavigate()
   const [books, setBooks] = useState([])
@@ -26,6 +29,8 @@ function BookManagement({ onLogout }) {
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState(null)
   const [submitting, setSubmitting] = useState(false)
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   
   // Search and filter states
   const [searchTerm, setSearchTerm] = useState('')
@@ -52,25 +57,18 @@ function BookManagement({ onLogout }) {
   const [authorList, setAuthorList] = useState([])
 
   useEffect(() => {
-    fetchBooks()
     fetchCategories()
   }, [])
 
-  // Filter dan search effect
+  // Kata kunci dicari di server; jeda singkat agar tidak mengirim request untuk setiap ketikan
   useEffect(() => {
-    let filtered = books
+    const timer = setTimeout(() => fetchBooks(), searchTerm ? 300 : 0)
+    return () => clearTimeout(timer)
+  }, [searchTerm])
 
-    // Filter by search term
-    if (searchTerm) {
-      filtered = filtered.filter(
-        (book) =>
-          book.title?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-          book.publisher?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-          (book.authors && book.authors.some(author => 
-            author.name?.toLowerCase().includes(searchTerm.toLowerCase())
-          ))
-      )
-    }
+  // Filter stok untuk buku yang sudah dimuat
+  useEffect(() => {
+    let filtered = books
 
     // Filter by stock
     if (stockFilter !== 'semua') {
@@ -95,12 +93,21 @@ function BookManagement({ onLogout }) {
     setCurrentPage(page)
   }
 
+  // Satu halaman dari server: hasil pencarian jika ada kata kunci, selain itu katalog terbaru
+  const fetchPage = (cursor = null) => {
+    const keyword = searchTerm.trim()
+    return keyword
+      ? booksAPI.searchBooks(keyword, { cursor, limit: BOOKS_PAGE_SIZE })
+      : booksAPI.getBooks({ cursor, limit: BOOKS_PAGE_SIZE })
+  }
+
   const fetchBooks = async () => {
     setLoading(true)
     setError(null)
     try {
-      const data = await booksAPI.getAllBooks()
-      setBooks(data)
+      const page = await fetchPage()
+      setBooks(page.items)
+      setNextCursor(page.next_cursor)
     } catch (err) {
       setError('Gagal memuat data buku')
       showNotification('Gagal memuat data buku: ' + err.message, 'error')
@@ -109,6 +116,19 @@ function BookManagement({ onLogout }) {
     }
   }
 
+  const handleLoadMore = async () => {
+    setLoadingMore(true)
+    try {
+      const page = await fetchPage(nextCursor)
+      setBooks(prev => [...prev, ...page.items])
+      setNextCursor(page.next_cursor)
+    } catch (err) {
+      showNotification('Gagal memuat data buku: ' + err.message, 'error')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const fetchCategories = async () => {
     try {
       const data = await categoriesAPI.getAllCategories()
@@ -360,7 +380,7 @@ function BookManagement({ onLogout }) {
               <MagnifyingGlassIcon className="absolute left-3 top-1/2 transform -translate-y-1/2 h-5 w-5 text-gray-400" />
               <input
                 type="text"
-                placeholder="Cari berdasarkan judul, penulis, atau penerbit..."
+                placeholder="Cari berdasarkan judul, penulis, atau kategori..."
                 value={searchTerm}
                 onChange={(e) => setSearchTerm(e.target.value)}
                 className="w-full pl-10 pr-4 py-3 border border-gray-300 rounded-xl focus:ring-2 focus:ring-red-500 focus:border-red-500 transition-all"
@@ -392,7 +412,7 @@ function BookManagement({ onLogout }) {
           
           {/* Results Count */}
           <div className="mt-4 text-sm text-gray-600">
-            Menampilkan {filteredBooks.length} dari {books.length} buku
+            Menampilkan {filteredBooks.length} dari {books.length} buku yang dimuat
           </div>
         </div>
 
@@ -606,6 +626,18 @@ function BookManagement({ onLogout }) {
               </div>
             )}
             
+            {nextCursor && (
+              <div className="flex justify-center bg-white px-6 py-4 border-t border-gray-200">
+                <button
+                  onClick={handleLoadMore}
+                  disabled={loadingMore}
+                  className="px-4 py-2 rounded-lg text-sm font-medium transition-colors bg-white text-gray-700 border border-gray-300 hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed"
+                >
+                  {loadingMore ? 'Memuat...' : 'Muat lebih banyak buku'}
+                </button>
+              </div>
+            )}
+
             {filteredBooks.length === 0 && (
               <div className="text-center py-12">
                 <div className="text-gray-400 text-lg mb-2">📚</div>
@@ -12,16 +12,21 @@ function BorrowManagement({ onLogout }) {
   
   // Search and filter states
   const [searchTerm, setSearchTerm] = useState('');
-  const [statusFilter, setStatusFilter] = useState('semua');
+  const [statusFilter, setStatusFilter] = useState('menunggu');
+  const [fromDate, setFromDate] = useState('');
+  const [toDate, setToDate] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   
   // Pagination states
   const [currentPage, setCurrentPage] = useState(1);
   const [itemsPerPage] = useState(10); // 10 peminjaman per halaman
+  // Status dan tanggal pengajuan difilter di server; halaman pertama dimuat ulang saat filter berubah
   useEffect(() => {
     fetchBorrows();
-  }, []);
+  }, [statusFilter, fromDate, toDate]);
 
-  // Filter dan search effect
+  // Pencarian nama/judul/ID pada peminjaman yang sudah dimuat
   useEffect(() => {
     let filtered = borrows;
 
@@ -35,14 +40,9 @@ function BorrowManagement({ onLogout }) {
       );
     }
 
-    // Filter by status
-    if (statusFilter !== 'semua') {
-      filtered = filtered.filter((borrow) => borrow.status === statusFilter);
-    }
-
     setFilteredBorrows(filtered);
     setCurrentPage(1); // Reset ke halaman pertama saat filter berubah
-  }, [borrows, searchTerm, statusFilter]);
+  }, [borrows, searchTerm]);
 
   // Calculate pagination
   const totalPages = Math.ceil(filteredBorrows.length / itemsPerPage);
@@ -54,11 +54,20 @@ function BorrowManagement({ onLogout }) {
     setCurrentPage(page);
   };
 
+  const fetchPage = (cursor = null) =>
+    borrowsAPI.getBorrows({
+      status: statusFilter === 'semua' ? null : statusFilter,
+      ...(fromDate ? { from: fromDate } : {}),
+      ...(toDate ? { to: toDate } : {}),
+      cursor,
+    });
+
   const fetchBorrows = async () => {
     setLoading(true);
     try {
-      const data = await borrowsAPI.getAllBorrows();
-      setBorrows(data);
+      const page = await fetchPage();
+      setBorrows(page.items);
+      setNextCursor(page.next_cursor);
     } catch (error) {
       showNotification('Gagal memuat data peminjaman', 'error');
     } finally {
@@ -66,6 +75,20 @@ function BorrowManagement({ onLogout }) {
     }
   };
 
+  // Halaman berikutnya dari server hanya diambil saat admin memintanya
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage(nextCursor);
+      setBorrows((prev) => [...prev, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (error) {
+      showNotification('Gagal memuat data peminjaman', 'error');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
 
   // Modal edit
   const openEditModal = (borrow) => {
@@ -134,11 +157,30 @@ function BorrowManagement({ onLogout }) {
                 <option value="ditolak">Ditolak</option>
               </select>
             </div>
+
+            {/* Rentang tanggal pengajuan */}
+            <div className="flex items-center gap-2">
+              <input
+                type="date"
+                value={fromDate}
+                onChange={(e) => setFromDate(e.target.value)}
+                title="Diajukan sejak"
+                className="px-4 py-3 border border-gray-300 rounded-xl focus:ring-2 focus:ring-red-500 focus:border-red-500 transition-all bg-white"
+              />
+              <span className="text-gray-500">-</span>
+              <input
+                type="date"
+                value={toDate}
+                onChange={(e) => setToDate(e.target.value)}
+                title="Diajukan sampai"
+                className="px-4 py-3 border border-gray-300 rounded-xl focus:ring-2 focus:ring-red-500 focus:border-red-500 transition-all bg-white"
+              />
+            </div>
           </div>
           
           {/* Results Count */}
           <div className="mt-4 text-sm text-gray-600">
-            Menampilkan {currentBorrows.length > 0 ? startIndex + 1 : 0} - {Math.min(endIndex, filteredBorrows.length)} dari {filteredBorrows.length} peminjaman
+            Menampilkan {currentBorrows.length > 0 ? startIndex + 1 : 0} - {Math.min(endIndex, filteredBorrows.length)} dari {filteredBorrows.length} peminjaman yang dimuat
           </div>
         </div>        {loading ? (
           <div className="text-center py-12">
@@ -339,6 +381,18 @@ function BorrowManagement({ onLogout }) {
               </div>
             )}
             
+            {nextCursor && (
+              <div className="flex justify-center bg-white px-6 py-4 border-t border-gray-200">
+                <button
+                  onClick={handleLoadMore}
+                  disabled={loadingMore}
+                  className="px-4 py-2 rounded-lg text-sm font-medium transition-colors bg-white text-gray-700 border border-gray-300 hover:bg-gray-50 disabled:opacity-50 disabled:cursor-not-allowed"
+                >
+                  {loadingMore ? 'Memuat...' : 'Muat lebih banyak peminjaman'}
+                </button>
+              </div>
+            )}
+
             {filteredBorrows.length === 0 && (
               <div className="text-center py-12">
                 <div className="text-gray-400 text-lg mb-2">📚</div>
@@ -7,6 +7,8 @@ import { booksAPI, borrowsAPI } from '../../services/api'
 import bookImg from '../../assets/react.svg'
 import { showNotification } from '../../utils/notification'
 
+const BOOKS_PAGE_SIZE = 16
+
 function BorrowBook({ onLogout }) {
   const navigate = useNavigate()
   const [books, setBooks] = useState([])
@@ -15,34 +17,54 @@ function BorrowBook({ onLogout }) {
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState(null)
   const [borrowing, setBorrowing] = useState(null)
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
+
+  // Kata kunci dicari di server (full-text); tanpa kata kunci tampilkan katalog terbaru
+  const fetchPage = (cursor = null) => {
+    const keyword = search.trim()
+    return keyword
+      ? booksAPI.searchBooks(keyword, { cursor, limit: BOOKS_PAGE_SIZE })
+      : booksAPI.getBooks({ cursor, limit: BOOKS_PAGE_SIZE })
+  }
 
   useEffect(() => {
     const fetchBooks = async () => {
       setLoading(true)
       setError(null)
       try {
-        const data = await booksAPI.getAllBooks()
-        setBooks(data)
+        const page = await fetchPage()
+        setBooks(page.items)
+        setNextCursor(page.next_cursor)
       } catch (err) {
         setError('Tidak dapat memuat koleksi buku. Silakan refresh halaman atau hubungi petugas perpustakaan.')
       } finally {
         setLoading(false)
       }
     }
-    fetchBooks()
-  }, [])
+    // Jeda singkat agar tidak mengirim request untuk setiap ketikan
+    const timer = setTimeout(fetchBooks, search ? 300 : 0)
+    return () => clearTimeout(timer)
+  }, [search])
 
-  // Filter buku berdasarkan search dan filterType
+  const handleLoadMore = async () => {
+    setLoadingMore(true)
+    try {
+      const page = await fetchPage(nextCursor)
+      setBooks(prev => [...prev, ...page.items])
+      setNextCursor(page.next_cursor)
+    } catch (err) {
+      showNotification('Gagal memuat buku berikutnya. Silakan coba lagi.', 'warning')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
+  // Filter Kategori/Penulis/Judul mempersempit hasil yang sudah dimuat
   const filteredBooks = books.filter(b => {
     const searchValue = search.toLowerCase()
-    if (!searchValue) return true
-    if (filterType === 'Semua') {
-      return (
-        b.title.toLowerCase().includes(searchValue) ||
-        (b.authors?.some(a => a.name.toLowerCase().includes(searchValue))) ||
-        (b.categories?.some(c => c.name.toLowerCase().includes(searchValue)))
-      )
-    } else if (filterType === 'Kategori') {
+    if (!searchValue || filterType === 'Semua') return true
+    if (filterType === 'Kategori') {
       return (b.categories?.some(c => c.name.toLowerCase().includes(searchValue)))
     } else if (filterType === 'Penulis') {
       return (b.authors?.some(a => a.name.toLowerCase().includes(searchValue)))
@@ -52,14 +74,6 @@ function BorrowBook({ onLogout }) {
     return true
   })
 
-  // Pagination state
-  const [currentPage, setCurrentPage] = useState(1)
-  const booksPerPage = 16
-  const totalPages = Math.ceil(filteredBooks.length / booksPerPage)
-  const paginatedBooks = filteredBooks.slice((currentPage - 1) * booksPerPage, currentPage * booksPerPage)
-
-  // Reset to page 1 if filter/search changes
-  useEffect(() => { setCurrentPage(1) }, [search, filterType])
   const handlePinjamBuku = async (book) => {
     if (book.amount <= 0) {
       showNotification('Buku tidak tersedia!', 'warning')
@@ -70,9 +84,9 @@ function BorrowBook({ onLogout }) {
     try {
       await borrowsAPI.borrowBook(book.id)
       showNotification(`Berhasil meminjam: ${book.title}`, 'success')
-      // Refresh data buku
-      const updatedBooks = await booksAPI.getAllBooks()
-      setBooks(updatedBooks)
+      // Perbarui stok buku yang dipinjam saja
+      const updatedBook = await booksAPI.getBook(book.id)
+      setBooks(prev => prev.map(b => (b.id === book.id ? { ...b, amount: updatedBook.amount } : b)))
     } catch (error) {
       console.error('Error borrowing book:', error)
       // Ambil pesan error dari response backend jika ada
@@ -154,7 +168,7 @@ function BorrowBook({ onLogout }) {
             <div className="mt-6">
               <span className="inline-flex items-center px-4 py-2 rounded-full bg-gray-100 text-gray-700 font-medium">
                 <BookOpenIcon className="h-4 w-4 mr-2" />
-                {filteredBooks.length} buku ditemukan
+                {filteredBooks.length} buku ditampilkan
               </span>
             </div>
           </div>
@@ -193,7 +207,7 @@ function BorrowBook({ onLogout }) {
               </div>
             ) : (
               <>                <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 xl:grid-cols-4 gap-6">
-                  {paginatedBooks.map(book => (
+                  {filteredBooks.map(book => (
                     <div 
                       key={book.id} 
                       className="group bg-white rounded-lg shadow-md hover:shadow-lg transition-all duration-300 border border-gray-200 overflow-hidden"
@@ -299,95 +313,16 @@ function BorrowBook({ onLogout }) {
                       </div>
                     </div>
                   ))}
-                </div>{/* Enhanced Pagination Controls */}
-                {totalPages > 1 && (
-                  <div className="flex justify-center items-center gap-3 mt-12 flex-wrap">
-                    <button
-                      className="btn bg-white/80 backdrop-blur-md border-2 border-red-200 text-red-700 hover:bg-red-50 hover:border-red-300 rounded-xl px-6 py-3 font-semibold shadow-lg disabled:opacity-50 disabled:cursor-not-allowed"
-                      onClick={() => setCurrentPage(p => Math.max(1, p - 1))}
-                      disabled={currentPage === 1}
-                    >
-                      ← Sebelumnya
-                    </button>
-                    
-                    {/* Smart Pagination: show first, last, current, neighbors, and ellipsis */}
-                    <div className="flex items-center gap-2">
-                      {(() => {
-                        const pageButtons = [];
-                        const pageRange = 2; // show 2 before/after current
-                        let start = Math.max(2, currentPage - pageRange);
-                        let end = Math.min(totalPages - 1, currentPage + pageRange);
-                          // Always show first page
-                        pageButtons.push(
-                          <button
-                            key={1}
-                            className={`btn rounded-xl font-bold px-4 py-3 shadow-lg transition-all ${
-                              currentPage === 1 
-                                ? 'bg-red-600 text-white border-0' 
-                                : 'bg-white/80 backdrop-blur-md text-red-700 border-2 border-red-200 hover:bg-red-50'
-                            }`}
-                            onClick={() => setCurrentPage(1)}
-                          >
-                            1
-                          </button>
-                        );
-                        
-                        // Ellipsis before
-                        if (start > 2) {
-                          pageButtons.push(
-                            <span key="start-ellipsis" className="px-2 text-gray-400 font-bold">...</span>
-                          );
-                        }
-                          // Middle pages
-                        for (let i = start; i <= end; i++) {
-                          pageButtons.push(
-                            <button
-                              key={i}
-                              className={`btn rounded-xl font-bold px-4 py-3 shadow-lg transition-all ${
-                                currentPage === i 
-                                  ? 'bg-red-600 text-white border-0' 
-                                  : 'bg-white/80 backdrop-blur-md text-red-700 border-2 border-red-200 hover:bg-red-50'
-                              }`}
-                              onClick={() => setCurrentPage(i)}
-                            >
-                              {i}
-                            </button>
-                          );
-                        }
-                        
-                        // Ellipsis after
-                        if (end < totalPages - 1) {
-                          pageButtons.push(
-                            <span key="end-ellipsis" className="px-2 text-gray-400 font-bold">...</span>
-                          );
-                        }
-                          // Always show last page if more than 1
-                        if (totalPages > 1) {
-                          pageButtons.push(
-                            <button
-                              key={totalPages}
-                              className={`btn rounded-xl font-bold px-4 py-3 shadow-lg transition-all ${
-                                currentPage === totalPages 
-                                  ? 'bg-red-600 text-white border-0' 
-                                  : 'bg-white/80 backdrop-blur-md text-red-700 border-2 border-red-200 hover:bg-red-50'
-                              }`}
-                              onClick={() => setCurrentPage(totalPages)}
-                            >
-                              {totalPages}
-                            </button>
-                          );
-                        }
-                        
-                        return pageButtons;
-                      })()}
-                    </div>
-                    
+                </div>
+                {/* Halaman berikutnya hanya dimuat saat diminta */}
+                {nextCursor && (
+                  <div className="flex justify-center mt-12">
                     <button
                       className="btn bg-white/80 backdrop-blur-md border-2 border-red-200 text-red-700 hover:bg-red-50 hover:border-red-300 rounded-xl px-6 py-3 font-semibold shadow-lg disabled:opacity-50 disabled:cursor-not-allowed"
-                      onClick={() => setCurrentPage(p => Math.min(totalPages, p + 1))}
-                      disabled={currentPage === totalPages}
+                      onClick={handleLoadMore}
+                      disabled={loadingMore}
                     >
-                      Berikutnya →
+                      {loadingMore ? 'Memuat...' : 'Muat lebih banyak'}
                     </button>
                   </div>
                 )}
@@ -30,7 +30,7 @@ function HomeUser({ onLogout }) {
       setLoading(true);
       const [borrowsData, booksData, userData] = await Promise.all([
         borrowsAPI.getMyBorrows(),
-        booksAPI.getAllBooks(),
+        booksAPI.getBooks({ limit: 3 }),
         authAPI.getCurrentUser(),
       ]);
 
@@ -42,7 +42,7 @@ function HomeUser({ onLogout }) {
       setRecentBorrows(borrowsData.slice(0, 3));
 
       // Get recent books (first 3 from backend - already sorted by ID desc)
-      setRecentBooks(booksData.slice(0, 3));
+      setRecentBooks(booksData.items);
 
       // Set current user data
       setCurrentUser(userData);
@@ -155,9 +155,12 @@ export const authAPI = {
 
 // Books API functions
 export const booksAPI = {
-  getAllBooks: async () => {
+  // Satu halaman katalog ({ items, next_cursor }); kirim next_cursor sebagai cursor untuk halaman berikutnya
+  getBooks: async ({ cursor = null, limit = 20, sort } = {}) => {
     try {
-      const response = await api.get('/api/v1/books');
+      const response = await api.get('/api/v1/books', {
+        params: { limit, ...(cursor ? { cursor } : {}), ...(sort ? { sort } : {}) },
+      });
       return response.data;
     } catch (error) {
       console.error('Get books error:', error);
@@ -165,6 +168,19 @@ export const booksAPI = {
     }
   },
 
+  // Pencarian full-text (judul, penulis, kategori, deskripsi), satu halaman per panggilan
+  searchBooks: async (q, { cursor = null, limit = 20 } = {}) => {
+    try {
+      const response = await api.get('/api/v1/books/search', {
+        params: { q, limit, ...(cursor ? { cursor } : {}) },
+      });
+      return response.data;
+    } catch (error) {
+      console.error('Search books error:', error);
+      throw error;
+    }
+  },
+
   getBook: async (bookId) => {
     try {
       const response = await api.get(`/api/v1/books/${bookId}`);
@@ -252,9 +268,12 @@ export const reviewsAPI = {
     }
   },
 
-  getReviewsForBook: async (bookId) => {
+  // Satu halaman review (terbaru dulu) beserta total, average, dan histogram skor buku
+  getReviewsForBook: async (bookId, cursor = null) => {
     try {
-      const response = await api.get(`/api/v1/books/${bookId}/reviews`);
+      const response = await api.get(`/api/v1/books/${bookId}/reviews`, {
+        params: cursor ? { cursor } : {},
+      });
       return response.data;
     } catch (error) {
       console.error('Get reviews error:', error);
@@ -262,6 +281,17 @@ export const reviewsAPI = {
     }
   },
 
+  // Review milik user yang login untuk buku ini, null jika belum ada
+  getMyReviewForBook: async (bookId) => {
+    try {
+      const response = await api.get(`/api/v1/books/${bookId}/reviews/me`);
+      return response.data;
+    } catch (error) {
+      console.error('Get my review error:', error);
+      throw error;
+    }
+  },
+
   updateReview: async (reviewId, reviewData) => {
     try {
       const response = await api.put(`/api/v1/reviews/${reviewId}`, reviewData);
@@ -315,9 +345,13 @@ export const borrowsAPI = {
     }
   },
 
-  getAllBorrows: async () => {
+  // Satu halaman antrean peminjaman ({ items, next_cursor }), default hanya yang menunggu persetujuan.
+  // status null berarti semua status; filter lain: user_id, book_id, from, to (tanggal pengajuan)
+  getBorrows: async ({ status = 'menunggu', cursor = null, limit = 50, ...filters } = {}) => {
     try {
-      const response = await api.get('/api/v1/borrows/all');
+      const response = await api.get('/api/v1/borrows/all', {
+        params: { ...filters, limit, ...(status ? { status } : {}), ...(cursor ? { cursor } : {}) },
+      });
       return response.data;
     } catch (error) {
       console.error('Get all borrows error:', error);
@@ -346,6 +380,17 @@ export const borrowsAPI = {
     }
   },
 
+  // decisions: [{ borrow_id, action: 'approve' | 'decline' }]
+  bulkDecideBorrows: async (decisions) => {
+    try {
+      const response = await api.post('/api/v1/borrows/bulk-decision', { decisions });
+      return response.data;
+    } catch (error) {
+      console.error('Bulk borrow decision error:', error);
+      throw error;
+    }
+  },
+
   updateBorrowByAdmin: async (borrowId, data) => {
     try {
       const response = await api.put(`/api/v1/borrows/${borrowId}/admin-update`, data);